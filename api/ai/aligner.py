@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from difflib import SequenceMatcher
+from functools import cached_property
+from typing import NamedTuple
+
+import nltk.data
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+from api.ai import config
+from api.models.cache.sentence_index import SentenceIndex
+from api.models.note import Note
+
+word_pattern = re.compile(r"\w+")
+
+
+class Alignment(NamedTuple):
+    start: int
+    end: int
+    method: str  # exact, normalized, fuzzy or tfidf
+    score: float
+
+
+def split_sentences(text: str) -> list[tuple[int, int]]:
+    """Return the [start, end) of the sentences of each line of the text."""
+    tokenizer = nltk.data.load("tokenizers/punkt/english.pickle")
+    spans = []
+    line_start = 0
+    for line in text.split("\n"):
+        for start, end in tokenizer.span_tokenize(line):
+            while start < end and line[start].isspace():
+                start += 1
+            while end > start and line[end - 1].isspace():
+                end -= 1
+            if start < end:
+                spans.append((line_start + start, line_start + end))
+        line_start += len(line) + 1
+    return spans
+
+
+def get_words(text: str) -> list[str]:
+    return word_pattern.findall(text.lower())
+
+
+class WordIndex:
+    """
+    The lowercased words of a text joined with single spaces, to look up quotes
+    regardless of case and punctuation, with the span of each word in the text.
+    """
+
+    def __init__(self, text: str):
+        lowered = text.lower()
+        if len(lowered) != len(text):  # A few characters expand when lowered
+            lowered = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        words = word_pattern.findall(lowered)
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        self.starts = np.fromiter(
+            (match.start() for match in word_pattern.finditer(lowered)),
+            dtype=np.int64,
+            count=len(words),
+        )
+        self.ends = self.starts + lengths
+        # The offsets of the words in the joined text
+        self.offsets = np.cumsum(lengths + 1) - (lengths + 1)
+        self.text = " ".join(words)
+
+    def get_words(self, first: int, last: int) -> list[str]:
+        """Return the words from first to last included."""
+        if first > last:
+            return []
+        end = self.offsets[last] + self.ends[last] - self.starts[last]
+        return self.text[self.offsets[first] : end].split(" ")
+
+    def find(self, words: list[str]) -> range | None:
+        """Return the indices of the first run of the words."""
+        if not words:
+            return None
+        joined = " ".join(words)
+        position = self.text.find(joined)
+        while position != -1:
+            end = position + len(joined)
+            if (position == 0 or self.text[position - 1] == " ") and (
+                end == len(self.text) or self.text[end] == " "
+            ):
+                first = int(self.offsets.searchsorted(position))
+                return range(first, first + len(words))
+            position = self.text.find(joined, position + 1)
+        return None
+
+
+class QuoteAligner:
+    """
+    Locate quotes, like the quotes generated from a note, in the text they come from.
+    A quote is looked up verbatim, then with the case, punctuation and spacing
+    ignored, then approximately in the sentence windows the most similar to it
+    in TF-IDF. The sentence windows are the runs of one, two and three sentences.
+    When nothing is close enough, the most similar sentence window is returned.
+    """
+
+    window_sizes = (1, 2, 3)
+
+    def __init__(self, text: str, sentence_spans: list[tuple[int, int]]):
+        self.text = text
+        self.sentence_spans = sentence_spans
+
+    @classmethod
+    def for_note(cls, note: Note, text: str) -> QuoteAligner:
+        """Reuse the sentences of the note as long as its text is unchanged."""
+        key = hashlib.sha256(text.encode()).hexdigest()
+        index = SentenceIndex.objects.filter(note=note, key=key).first()
+        if index is None:
+            sentence_spans = split_sentences(text)
+            SentenceIndex.objects.update_or_create(
+                note=note, defaults={"key": key, "spans": sentence_spans}
+            )
+        else:
+            sentence_spans = [tuple(span) for span in index.spans]
+        return cls(text, sentence_spans)
+
+    @cached_property
+    def word_index(self) -> WordIndex:
+        return WordIndex(self.text)
+
+    @cached_property
+    def windows(self) -> list[tuple[int, int]]:
+        """The [first, last] sentence of each window."""
+        sentence_count = len(self.sentence_spans)
+        return [
+            (first, first + size - 1)
+            for size in self.window_sizes
+            for first in range(sentence_count - size + 1)
+        ]
+
+    @cached_property
+    def vectors(self):
+        """
+        The vectorizers fitted on the sentences and the TF-IDF of the windows.
+        The word counts of a window are the sums of the counts of its sentences,
+        so the text is only tokenized once.
+        """
+        sentences = [self.text[start:end] for start, end in self.sentence_spans]
+        counter = CountVectorizer()
+        try:
+            counts = counter.fit_transform(sentences)
+        except ValueError:  # None of the sentences has a word
+            return None
+        rows = []
+        columns = []
+        for row, (first, last) in enumerate(self.windows):
+            rows.extend([row] * (last - first + 1))
+            columns.extend(range(first, last + 1))
+        membership = sparse.csr_matrix(
+            ([1] * len(rows), (rows, columns)),
+            shape=(len(self.windows), len(sentences)),
+        )
+        transformer = TfidfTransformer().fit(counts)
+        return counter, transformer, transformer.transform(membership @ counts)
+
+    def align(self, quotes: list[str]) -> list[Alignment | None]:
+        """Return the span of the text matching each quote."""
+        alignments = [self.find(quote) for quote in quotes]
+        missing = [i for i, alignment in enumerate(alignments) if alignment is None]
+        if missing:
+            candidates = self.search([quotes[i] for i in missing])
+            for i, windows in zip(missing, candidates):
+                alignments[i] = self.match(quotes[i], windows)
+        return alignments
+
+    def find(self, quote: str) -> Alignment | None:
+        quote = quote.strip()
+        if not quote:
+            return None
+        start = self.text.find(quote)
+        if start != -1:
+            return Alignment(start, start + len(quote), "exact", 1.0)
+
+        # Look for the words of the quote regardless of case and punctuation
+        indices = self.word_index.find(get_words(quote))
+        if indices is None:
+            return None
+        start = self.word_index.starts[indices[0]]
+        end = self.word_index.ends[indices[-1]]
+        return Alignment(int(start), int(end), "normalized", 1.0)
+
+    def search(self, quotes: list[str]) -> list[list[tuple[float, int]]]:
+        """
+        Return the (similarity, window) of the top windows of each quote.
+        The similarities stay sparse, only the windows sharing words
+        with a quote are ranked.
+        """
+        if self.vectors is None:
+            return [[] for _ in quotes]
+        counter, transformer, window_vectors = self.vectors
+        quote_vectors = transformer.transform(counter.transform(quotes))
+        similarities = (quote_vectors @ window_vectors.T).tocsr()
+        candidates = []
+        for i in range(len(quotes)):
+            lo, hi = similarities.indptr[i], similarities.indptr[i + 1]
+            scores = similarities.data[lo:hi]
+            windows = similarities.indices[lo:hi]
+            top = np.arange(len(scores))
+            if len(scores) > config.align_top_k:
+                top = np.argpartition(-scores, config.align_top_k)[: config.align_top_k]
+            # The best first, ties in the order of the windows
+            top = top[np.lexsort((windows[top], -scores[top]))]
+            candidates.append([(float(scores[j]), int(windows[j])) for j in top])
+        return candidates
+
+    def match(
+        self, quote: str, candidates: list[tuple[float, int]]
+    ) -> Alignment | None:
+        """
+        Return the closest approximate match of the quote in the candidate windows,
+        or the most similar window when none covers enough of the quote.
+        """
+        quote_words = get_words(quote)
+        best = None
+        for _, window in candidates:
+            alignment = self.match_window(quote_words, window)
+            if alignment and (best is None or alignment.score > best.score):
+                best = alignment
+        if best is not None:
+            return best
+        if candidates:
+            similarity, window = candidates[0]
+            start, end = self.get_window_span(window)
+            return Alignment(start, end, "tfidf", similarity)
+        return None
+
+    def match_window(self, quote_words: list[str], window: int) -> Alignment | None:
+        """Match the words of the quote with the words of the window."""
+        if not quote_words:
+            return None
+        word_index = self.word_index
+        start, end = self.get_window_span(window)
+        lo, hi = word_index.starts.searchsorted([start, end])
+        window_words = word_index.get_words(lo, hi - 1)
+        matcher = SequenceMatcher(None, window_words, quote_words, False)
+        # Single words in common are mostly frequent words
+        blocks = [block for block in matcher.get_matching_blocks() if block.size >= 2]
+        coverage = sum(block.size for block in blocks) / len(quote_words)
+        if not blocks or coverage < config.align_fuzzy_ratio:
+            return None
+        start = word_index.starts[lo + blocks[0].a]
+        end = word_index.ends[lo + blocks[-1].a + blocks[-1].size - 1]
+        return Alignment(int(start), int(end), "fuzzy", coverage)
+
+    def get_window_span(self, window: int) -> tuple[int, int]:
+        first, last = self.windows[window]
+        return self.sentence_spans[first][0], self.sentence_spans[last][1]
@@ -1,5 +1,4 @@
 from django.db.models import QuerySet
-from rest_framework import exceptions
 
 from api.ai.generators.asset_generator import generate_content
 from api.ai.generators.asset_title_generator import generate_asset_title
@@ -25,22 +24,34 @@ class AssetAnalyzer:
         takeaway_types: QuerySet[TakeawayType],
         created_by: User,
     ):
-        # Cluster for each takeaway type
         print("========> Clustering takeaways")
+        blocks = [
+            self.cluster(asset, takeaway_type, created_by)
+            for takeaway_type in takeaway_types
+        ]
+        self.assemble(asset, list(zip(takeaway_types, blocks)), created_by)
+
+    def cluster(
+        self, asset: Asset, takeaway_type: TakeawayType, created_by: User
+    ) -> Block:
+        """Cluster the takeaways of the type into a new themes block."""
+        print("  ========> Clustering takeaway type:", takeaway_type.name)
+        takeaways = Takeaway.objects.filter(note__assets=asset, type=takeaway_type)
+        block = asset.blocks.create(type=Block.Type.THEMES)
+        cluster_block(block, takeaways, created_by)
+        return block
+
+    def assemble(
+        self,
+        asset: Asset,
+        type_blocks: list[tuple[TakeawayType, Block]],
+        created_by: User,
+    ):
+        """Lay out the themes blocks and generate the rest of the asset."""
         lexical = LexicalProcessor(asset.content["root"])
-        takeaways = Takeaway.objects.filter(note__assets=asset)
-        for takeaway_type in takeaway_types:
-            print("  ========> Clustering takeaway type:", takeaway_type.name)
-            filtered_takeaways = takeaways.filter(type=takeaway_type)
-            if filtered_takeaways.count() > 200:
-                raise exceptions.ValidationError(
-                    f"Too many takeaways to analyze for takeaway type '{takeaway_type.name}'. "
-                    "Please reduce to 200 takeaways and try again."
-                )
+        for takeaway_type, block in type_blocks:
             block_title = create_lexical_from_markdown(f"# {takeaway_type}:")
             lexical.append(block_title)
-            block = asset.blocks.create(type=Block.Type.THEMES)
-            cluster_block(block, filtered_takeaways, created_by)
             lexical.add_block(block)
 
         empty_takeaways = Takeaway.objects.none()
@@ -1,6 +1,5 @@
 import os
 from decimal import Decimal
-from time import time
 from urllib.parse import urlparse
 
 from django.db.models import QuerySet
@@ -8,6 +7,7 @@ from django.utils import translation
 from pydub.utils import mediainfo
 
 from api.ai.analyzer.utils.add_contacts import add_contacts
+from api.ai.analyzer.utils.stage_graph import Stage, StageGraph
 from api.ai.downloaders.web_downloader import WebDownloader
 from api.ai.downloaders.youtube_downloader import YoutubeDownloader
 from api.ai.generators.metadata_generator import generate_metadata
@@ -90,25 +90,39 @@ class NewNoteAnalyzer:
         note.transcript = assembly.to_transcript()
         note.save()
 
+    def prepare(self, note: Note, created_by: User):
+        if note.file:
+            self.transcribe(note, created_by)
+            if note.recall_bot:
+                self.map_speaker_names(note)
+                add_contacts(note, created_by)
+        elif note.url:
+            self.download(note)
+
+    def get_stages(self, note: Note, created_by: User):
+        # The generators only depend on the transcript, so they can run concurrently.
+        return [
+            Stage("transcribing", lambda: self.prepare(note, created_by)),
+            Stage(
+                "generating tasks",
+                lambda: generate_tasks(note, created_by),
+                depends_on=["transcribing"],
+            ),
+            Stage(
+                "generating templates data",
+                lambda: generate_template_types(note, created_by),
+                depends_on=["transcribing"],
+            ),
+            Stage(
+                "generating metadata",
+                lambda: generate_metadata(note, created_by),
+                depends_on=["transcribing"],
+            ),
+        ]
+
     def analyze(self, note: Note, created_by: User):
         with translation.override(note.project.language):
-            print("========> Start transcribing")
-            start = time()
-            if note.file:
-                self.transcribe(note, created_by)
-                if note.recall_bot:
-                    self.map_speaker_names(note)
-                    add_contacts(note, created_by)
-            elif note.url:
-                self.download(note)
-            end = time()
-            print(f"Elapsed time: {end - start} seconds")
-            print("========> Generating Tasks")
-            generate_tasks(note, created_by)
-            print("===========> Generating templates data")
-            generate_template_types(note, created_by)
-            print("========> Generating metadata")
-            generate_metadata(note, created_by)
+            StageGraph(self.get_stages(note, created_by)).run()
             print("========> End analyzing")
 
 
@@ -1,11 +1,73 @@
+import datetime
+import hashlib
+import logging
+import time
+
+from django.utils import timezone
+
 from api.ai.generators.project_clusterer import cluster_project
 from api.ai.generators.project_summarizer import summarize_project
+from api.models.note import Note
 from api.models.project import Project
+from api.models.project_summary_run import ProjectSummaryRun
+from api.models.takeaway import Takeaway
+
+logger = logging.getLogger(__name__)
 
 
 class ProjectSummarizer:
+    def get_fingerprint(self, project: Project) -> str:
+        """
+        Hash the note summaries and takeaway titles of the past week,
+        which are what the summary and the key themes are generated from.
+        """
+        cutoff = timezone.now() - datetime.timedelta(weeks=1)
+        notes = Note.objects.filter(project=project, created_at__gt=cutoff)
+        takeaways = Takeaway.objects.filter(
+            note__project=project, created_at__gt=cutoff
+        )
+        fingerprint = hashlib.sha256(project.language.encode())
+        for row in notes.order_by("id").values_list("id", "summary").iterator():
+            fingerprint.update(repr(row).encode())
+        fingerprint.update(b"\0")
+        for row in takeaways.order_by("id").values_list("id", "title").iterator():
+            fingerprint.update(repr(row).encode())
+        return fingerprint.hexdigest()
+
+    def summarize_project(self, project: Project, created_by) -> ProjectSummaryRun:
+        """
+        Summarize the project and cluster its key themes, unless its notes
+        and takeaways are unchanged since the last successful run.
+        A failure is recorded instead of raised, to not stop the other projects.
+        """
+        start = time.monotonic()
+        fingerprint = self.get_fingerprint(project)
+        last_run = (
+            project.summary_runs.filter(status=ProjectSummaryRun.Status.SUCCEEDED)
+            .order_by("-created_at")
+            .first()
+        )
+        error = ""
+        if last_run is not None and last_run.fingerprint == fingerprint:
+            status = ProjectSummaryRun.Status.SKIPPED
+        else:
+            try:
+                summarize_project(project, created_by)
+                cluster_project(project, created_by)
+                status = ProjectSummaryRun.Status.SUCCEEDED
+            except Exception as e:
+                logger.exception(f"Failed to summarize project {project.id}")
+                status = ProjectSummaryRun.Status.FAILED
+                error = str(e)
+        return ProjectSummaryRun.objects.create(
+            project=project,
+            fingerprint=fingerprint,
+            status=status,
+            duration=time.monotonic() - start,
+            error=error,
+        )
+
     def summarize_all_projects(self, created_by):
         for project in Project.objects.all():
             print(f"Summarizing project <{project.id}: {project.name}>")
-            summarize_project(project, created_by)
-            cluster_project(project, created_by)
+            self.summarize_project(project, created_by)
@@ -0,0 +1,137 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from time import time
+
+from django.db import connection, connections, transaction
+from django.utils import translation
+
+
+class Stage:
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class StageResult:
+    SUCCESS = "success"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, name, status, duration=0.0, error=None):
+        self.name = name
+        self.status = status
+        self.duration = duration
+        self.error = error
+
+    def __repr__(self):
+        return f"<StageResult {self.name}: {self.status} in {self.duration:.2f}s>"
+
+
+class InlineExecutor:
+    """Run the submitted functions right away in the calling thread."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        future.set_result(func(*args))
+        return future
+
+
+class StageGraph:
+    """
+    Run analyzer stages as a dependency graph.
+
+    A stage starts as soon as all the stages it depends on have succeeded,
+    so independent stages run concurrently in a thread pool.
+    A stage whose dependency failed or was skipped is skipped.
+
+    Inside a transaction, like in a request, the stages run one after another
+    in the calling thread, since the connections of other threads would not see
+    the uncommitted rows.
+    """
+
+    def __init__(self, stages, max_workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(
+                        f"Stage '{stage.name}' depends on unknown stage '{dependency}'."
+                    )
+
+    def run(self, raise_on_error=True) -> dict[str, StageResult]:
+        # Translation is activated per thread so we pass it on to the stages.
+        language = translation.get_language()
+        inline = connection.in_atomic_block
+        results: dict[str, StageResult] = {}
+        pending = dict(self.stages)
+        running = {}
+
+        if inline:
+            executor = InlineExecutor()
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        with executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    statuses = [
+                        results[dependency].status
+                        for dependency in stage.depends_on
+                        if dependency in results
+                    ]
+                    if any(status != StageResult.SUCCESS for status in statuses):
+                        results[name] = StageResult(name, StageResult.SKIPPED)
+                        print(f"========> Skipped {name}")
+                        del pending[name]
+                    elif len(statuses) == len(stage.depends_on):
+                        print(f"========> Start {name}")
+                        future = executor.submit(
+                            self.run_stage, stage, language, inline
+                        )
+                        running[future] = name
+                        del pending[name]
+
+                if not running:
+                    if pending:
+                        raise ValueError(
+                            f"Circular dependency among stages: {list(pending)}."
+                        )
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    results[result.name] = result
+                    del running[future]
+                    print(
+                        f"========> {result.status.capitalize()} {result.name} "
+                        f"in {result.duration:.2f} seconds"
+                    )
+
+        if raise_on_error:
+            for result in results.values():
+                if result.error is not None:
+                    raise result.error
+        return results
+
+    def run_stage(self, stage: Stage, language, inline=False) -> StageResult:
+        start = time()
+        try:
+            # A savepoint keeps the transaction usable after a failed stage
+            with transaction.atomic() if inline else nullcontext():
+                with translation.override(language):
+                    stage.func()
+        except Exception as e:
+            return StageResult(stage.name, StageResult.FAILED, time() - start, e)
+        finally:
+            if not inline:
+                # Each worker thread opens its own database connection.
+                connections.close_all()
+        return StageResult(stage.name, StageResult.SUCCESS, time() - start)
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from django.utils import timezone
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumpd, load
+from langchain_core.messages import AIMessage
+
+from api.ai import config
+from api.models.cache.llm_response import LLMResponse
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+
+# Set by token_tracker so that the cache hits can be reported to TokenUsage.
+# Misses are regular llm calls and are counted by the openai callback.
+# Context variables are copied into the threads of Runnable.batch.
+cache_stats: ContextVar[Optional[CacheStats]] = ContextVar(
+    "llm_cache_stats", default=None
+)
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Persistent cache of LLM responses keyed by the hash of the llm string
+    (model and bind params such as response_format or tools) and the rendered prompt.
+    Entries expire after `ttl` and the least recently used entries are evicted
+    once there are more than `max_entries`.
+    """
+
+    def __init__(
+        self, ttl=config.llm_cache_ttl, max_entries=config.llm_cache_max_entries
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def get_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        entries = LLMResponse.objects.filter(
+            key=self.get_key(prompt, llm_string),
+            created_at__gt=timezone.now() - self.ttl,
+        )
+        entry = entries.first()
+        if entry is None:
+            return None
+
+        entries.update(accessed_at=timezone.now())
+        stats = cache_stats.get()
+        if stats is not None:
+            stats.record_hit()
+        generations = [load(generation) for generation in entry.generations]
+        for generation in generations:
+            # Drop the usage of the original call so that the callbacks
+            # do not count the cached response as spent tokens.
+            if isinstance(getattr(generation, "message", None), AIMessage):
+                generation.message.usage_metadata = None
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        LLMResponse.objects.update_or_create(
+            key=self.get_key(prompt, llm_string),
+            defaults={
+                "generations": [dumpd(generation) for generation in return_val],
+                "created_at": timezone.now(),
+            },
+        )
+        self.cull()
+
+    def cull(self):
+        LLMResponse.objects.filter(created_at__lte=timezone.now() - self.ttl).delete()
+        excess = LLMResponse.objects.count() - self.max_entries
+        if excess > 0:
+            keys = LLMResponse.objects.order_by("accessed_at").values_list(
+                "key", flat=True
+            )[:excess]
+            LLMResponse.objects.filter(key__in=list(keys)).delete()
+
+    def clear(self, **kwargs: Any):
+        LLMResponse.objects.all().delete()
+
+
+llm_cache = LLMResponseCache()
@@ -1,5 +1,30 @@
+from datetime import timedelta
+
 # model = "gpt-3.5-turbo-0125"
 model = "gpt-4o-mini"
 embedding_model = "text-embedding-3-small"
 chunk_size = 80000
 chunk_overlap = 100
+max_concurrency = 8
+llm_cache_ttl = timedelta(days=30)
+llm_cache_max_entries = 20000
+embedding_lru_size = 4096
+embedding_wait_timeout = 60  # seconds to wait for the batch of another request
+embedding_cache_ttl = timedelta(days=90)
+embedding_cache_max_entries = 200000
+media_max_workers = 4
+web_fetch_timeout = 10  # seconds
+web_min_text_length = 500  # shorter static pages are rendered in the browser
+web_ready_timeout = 5  # seconds to wait for the page to settle after it is loaded
+web_max_pages = 2  # concurrent browser pages per worker process
+web_browser_max_uses = 50  # pages rendered before the browser is relaunched
+align_top_k = 5  # sentence windows compared with a quote that is not found verbatim
+align_fuzzy_ratio = 0.8  # share of a quote that a fuzzy match has to cover
+summarize_concurrency = 8  # chunks of projects summarized in parallel every week
+key_theme_min_cluster_size = 3
+key_theme_drift = 0.3  # share of drifted takeaways that triggers a full re-clustering
+key_theme_radius_scale = 1.5  # margin over the farthest takeaway of a theme
+block_cluster_distance = 1.25  # ward linkage threshold between the themes of a block
+block_cluster_sample_size = 2000  # takeaways clustered exactly, the rest are assigned
+block_theme_sample_size = 20  # takeaways of each theme shown to the llm to title it
+block_theme_prompt_tokens = 8000  # takeaway tokens in each call titling the themes
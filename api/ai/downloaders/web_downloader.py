@@ -1,12 +1,16 @@
+import os
+import threading
 import time
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
+import requests
 from django.utils import translation
 from html2text import HTML2Text
-from playwright._impl._errors import TimeoutError
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import Error, Page, TimeoutError, sync_playwright
 from readability import Document
 
+from api.ai import config
 from api.ai.translator import google_translator
 from api.utils.markdown import MarkdownProcessor
 
@@ -36,25 +40,154 @@ def truncate(text):
     return "\n".join(lines)
 
 
+class BrowserPool:
+    """
+    Chromium browsers reused across the downloads of a worker process.
+
+    Playwright objects can only be used from the thread that created them,
+    so the pages are rendered on `max_pages` long-lived threads owned by the pool,
+    each with its own browser. The browsers don't depend on the threads of the
+    callers, which come and go, like the stage threads of the note analyzer.
+    Every page gets a fresh context, and a browser is relaunched after `max_uses`
+    pages to release its memory.
+    """
+
+    def __init__(self, max_pages: int, max_uses: int):
+        self.max_pages = max_pages
+        self.max_uses = max_uses
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_pages, thread_name_prefix="browser"
+        )
+        self.local = threading.local()
+
+    def get_browser(self):
+        local = self.local
+        if getattr(local, "browser", None) is not None and (
+            not local.browser.is_connected() or local.uses >= self.max_uses
+        ):
+            self.close()
+        if getattr(local, "browser", None) is None:
+            if getattr(local, "playwright", None) is None:
+                local.playwright = sync_playwright().start()
+            local.browser = local.playwright.chromium.launch()
+            local.uses = 0
+        local.uses += 1
+        return local.browser
+
+    def run(self, func: Callable[[Page], Any]) -> Any:
+        """Call func with a new page on a browser thread and return its result."""
+        if self.pid != os.getpid():
+            # The threads and the browsers of the parent process are gone after a fork
+            self.reset()
+        return self.executor.submit(self.run_page, func).result()
+
+    def run_page(self, func: Callable[[Page], Any]) -> Any:
+        context = self.get_browser().new_context()
+        try:
+            return func(context.new_page())
+        finally:
+            context.close()
+
+    def close(self):
+        """Close the browser of the current thread."""
+        browser = getattr(self.local, "browser", None)
+        self.local.browser = None
+        if browser is not None:
+            try:
+                browser.close()
+            except Error:
+                pass  # The browser is already gone
+
+
+browser_pool = BrowserPool(config.web_max_pages, config.web_browser_max_uses)
+
+
 class WebDownloader:
     translator = google_translator
+    browser_pool = browser_pool
+    user_agent = (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+    )
+    poll_interval = 250  # milliseconds
+    stable_polls = 4
 
-    def download(self, url: str) -> dict[str, Any]:
-        language = translation.get_language().split("-")[0]
-        with sync_playwright() as playwright:
-            try:
-                browser = playwright.chromium.launch()
-                page = browser.new_page()
-                page.goto(url, timeout=10000)
-                # We wait for 2 seconds for the page to load
-                time.sleep(2)
-                raw_html = page.content()
-            except TimeoutError:
-                raw_html = page.content()
+    def fetch(self, url: str) -> str | None:
+        """Get the html of a static page without the browser."""
+        try:
+            response = requests.get(
+                url,
+                headers={"User-Agent": self.user_agent},
+                timeout=config.web_fetch_timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+        if "html" not in response.headers.get("Content-Type", ""):
+            return None
+        return response.text
+
+    def render(self, url: str) -> str:
+        """Get the html of the page after its scripts have run."""
+        return self.browser_pool.run(lambda page: self.render_page(page, url))
+
+    def render_page(self, page: Page, url: str) -> str:
+        pending_requests = set()
+        page.on("request", pending_requests.add)
+        page.on("requestfinished", pending_requests.discard)
+        page.on("requestfailed", pending_requests.discard)
+        try:
+            page.goto(
+                url,
+                wait_until="domcontentloaded",
+                timeout=config.web_fetch_timeout * 1000,
+            )
+            self.wait_until_ready(page, pending_requests)
+        except TimeoutError:
+            pass
+        return page.content()
+
+    def wait_until_ready(self, page, pending_requests: set):
+        """
+        Wait until the text of the page stops changing: once the network is idle,
+        or after a few polls if the page keeps on making requests.
+        """
+        deadline = time.monotonic() + config.web_ready_timeout
+        text_length = None
+        unchanged_polls = 0
+        while time.monotonic() < deadline:
+            page.wait_for_timeout(self.poll_interval)
+            new_text_length = page.evaluate(
+                "document.body ? document.body.innerText.length : 0"
+            )
+            unchanged_polls = (
+                unchanged_polls + 1 if new_text_length == text_length else 0
+            )
+            text_length = new_text_length
+            if unchanged_polls >= self.stable_polls or (
+                unchanged_polls and not pending_requests
+            ):
+                return
+
+    def to_markdown(self, url: str, raw_html: str) -> str:
         html = Document(raw_html).summary()  # Remove unrelevant tags from raw html
         html2text = HTML2Text(baseurl=url)
         html2text.body_width = 0
-        raw_markdown_string = html2text.handle(html)
+        return html2text.handle(html)
+
+    def download(self, url: str) -> dict[str, Any]:
+        language = translation.get_language().split("-")[0]
+        raw_markdown_string = ""
+        raw_html = self.fetch(url)
+        if raw_html:
+            raw_markdown_string = self.to_markdown(url, raw_html)
+        if len(raw_markdown_string.strip()) < config.web_min_text_length:
+            # The page is likely rendered by javascript
+            raw_markdown_string = self.to_markdown(url, self.render(url))
         return (
             MarkdownProcessor(raw_markdown_string)
             .truncate()
@@ -1,5 +1,179 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+from django.utils import timezone
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
+from api.models.cache.embedding import Embedding
+
 from . import config
 
-embedder = OpenAIEmbeddings(model=config.embedding_model)
+
+class EmbeddingCoalescer:
+    """
+    Batch the texts of concurrent embedding requests into as few api calls as possible.
+
+    A request embeds its texts right away unless another batch is being embedded,
+    then its texts are collected with those of the requests that come in meanwhile
+    and embedded together once that batch is done. A request that waits longer than
+    `timeout` seconds, for a stuck or dead batch, embeds its texts itself.
+    """
+
+    def __init__(self, embeddings: Embeddings, timeout: float):
+        self.embeddings = embeddings
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.pending: dict[str, Future] = {}
+        self.is_embedding = False
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        deadline = time.monotonic() + self.timeout
+        batch = None
+        with self.condition:
+            futures = [self.pending.setdefault(text, Future()) for text in texts]
+            while not all(future.done() for future in futures):
+                if not self.is_embedding:
+                    # Embed all the pending texts, ours included
+                    batch, self.pending = self.pending, {}
+                    self.is_embedding = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Let the next request start a new batch instead of waiting too
+                    self.is_embedding = False
+                    batch = dict(zip(texts, futures))
+                    for text, future in batch.items():
+                        if self.pending.get(text) is future:
+                            del self.pending[text]
+                    break
+                self.condition.wait(remaining)
+
+        if batch is not None:
+            self.embed_batch(batch)
+        return [future.result() for future in futures]
+
+    def embed_batch(self, batch: dict[str, Future]):
+        try:
+            vectors = self.embeddings.embed_documents(list(batch))
+        except BaseException as e:
+            self.resolve(batch, exception=e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self.resolve(batch, vectors=vectors)
+
+    def resolve(self, batch: dict[str, Future], vectors=None, exception=None):
+        with self.condition:
+            for i, future in enumerate(batch.values()):
+                # Already resolved by a request that stopped waiting for the batch
+                if future.done():
+                    continue
+                if exception is not None:
+                    future.set_exception(exception)
+                else:
+                    future.set_result(vectors[i])
+            self.is_embedding = False
+            self.condition.notify_all()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings with an in-process LRU cache in front of the persistent Embedding table.
+    Cache misses go through the EmbeddingCoalescer.
+    The table entries expire after `ttl` and the least recently used entries are
+    culled once there are more than `max_entries`.
+    """
+
+    def __init__(
+        self,
+        embeddings: OpenAIEmbeddings,
+        lru_size=config.embedding_lru_size,
+        timeout=config.embedding_wait_timeout,
+        ttl=config.embedding_cache_ttl,
+        max_entries=config.embedding_cache_max_entries,
+    ):
+        self.model = embeddings.model
+        self.coalescer = EmbeddingCoalescer(embeddings, timeout)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lru: OrderedDict[str, list[float]] = OrderedDict()
+        self.lru_size = lru_size
+        self.lru_lock = threading.Lock()
+        self._blank_vector = None
+
+    def get_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode()).hexdigest()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [self.get_key(text) for text in texts]
+        with self.lru_lock:
+            vectors = {}
+            for key in keys:
+                if key in self.lru:
+                    self.lru.move_to_end(key)
+                    vectors[key] = self.lru[key]
+
+        missing_keys = {key for key in keys if key not in vectors}
+        if missing_keys:
+            entries = Embedding.objects.filter(
+                key__in=missing_keys, created_at__gt=timezone.now() - self.ttl
+            )
+            stored_vectors = dict(entries.values_list("key", "vector"))
+            if stored_vectors:
+                Embedding.objects.filter(key__in=list(stored_vectors)).update(
+                    accessed_at=timezone.now()
+                )
+            vectors.update(stored_vectors)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            new_vectors = self.coalescer.embed_documents(list(missing.values()))
+            vectors.update(zip(missing.keys(), new_vectors))
+            # Replaces the expired entries that are not culled yet
+            Embedding.objects.bulk_create(
+                [
+                    Embedding(key=key, vector=vector)
+                    for key, vector in zip(missing.keys(), new_vectors)
+                ],
+                update_conflicts=True,
+                unique_fields=["key"],
+                update_fields=["vector", "created_at", "accessed_at"],
+            )
+
+        vectors = {
+            key: np.asarray(vector, dtype=float).tolist()
+            for key, vector in vectors.items()
+        }
+        with self.lru_lock:
+            self.lru.update(vectors)
+            while len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def cull(self):
+        Embedding.objects.filter(created_at__lte=timezone.now() - self.ttl).delete()
+        excess = Embedding.objects.count() - self.max_entries
+        if excess > 0:
+            keys = Embedding.objects.order_by("accessed_at").values_list(
+                "key", flat=True
+            )[:excess]
+            Embedding.objects.filter(key__in=list(keys)).delete()
+
+    @property
+    def blank_vector(self) -> list[float]:
+        "The embedding of an empty string, used as the relevance threshold."
+        if self._blank_vector is None:
+            self._blank_vector = self.embed_query("")
+        return self._blank_vector
+
+
+openai_embedder = OpenAIEmbeddings(model=config.embedding_model)
+embedder = CachedEmbeddings(openai_embedder)
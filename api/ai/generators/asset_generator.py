@@ -6,6 +6,7 @@ from langchain.prompts import ChatPromptTemplate
 from langchain_openai.chat_models import ChatOpenAI
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import token_tracker
 from api.models.asset import Asset
 from api.models.takeaway import Takeaway
@@ -65,7 +66,7 @@ def generate_content(
             ("human", "{human_prompt}"),
         ]
     )
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     chain = prompt | llm
     with token_tracker(asset.project, asset, "generate-asset", created_by):
         output = chain.invoke({"human_prompt": human_prompt})
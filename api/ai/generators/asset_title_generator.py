@@ -2,6 +2,7 @@ from langchain.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import token_tracker
 from api.models.asset import Asset
 from api.models.user import User
@@ -21,7 +22,7 @@ def generate_asset_title(asset: Asset, created_by: User):
             ("human", content),
         ]
     )
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     chain = prompt | llm
     with token_tracker(asset.project, asset, "generate-asset-title", created_by):
         output = chain.invoke({})
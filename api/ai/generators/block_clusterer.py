@@ -1,3 +1,5 @@
+import numpy as np
+from django.db import transaction
 from django.db.models.query import QuerySet
 from langchain.output_parsers.openai_tools import PydanticToolsParser
 from langchain_core.prompts import ChatPromptTemplate
@@ -5,23 +7,31 @@ from langchain_openai import ChatOpenAI
 from pydantic.v1 import BaseModel, Field
 from rest_framework import exceptions
 from sklearn.cluster import AgglomerativeClustering
+from tiktoken import encoding_for_model
 
 from api.ai import config
-from api.ai.generators.utils import token_tracker
+from api.ai.cache import llm_cache
+from api.ai.generators.utils import batch_invoke, token_tracker
 from api.models.block import Block
 from api.models.takeaway import Takeaway
 from api.models.user import User
 
+encoder = encoding_for_model(config.model)
+
 
 def get_chain():
 
+    class ThemeSchema(BaseModel):
+        group: int = Field(description="The number of the takeaway group")
+        title: str = Field(description="Give a title for the takeaway group")
+
     class OutputFormatter(BaseModel):
         "Format the output into a JSON object with the given schema"
-        title: str = Field(description="Give a title for the takeaway group")
+        themes: list[ThemeSchema] = Field(description="One title for each group")
 
     system_prompt = """
-    The following are a group of closely-related takeaways extracted from multiple sources . 
-    Generate a title and a description for the takeaway group.
+    The following are groups of closely-related takeaways from multiple sources.
+    Generate a title for each of the takeaway groups.
     """
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -30,7 +40,7 @@ def get_chain():
         ]
     )
     tools = [OutputFormatter]
-    llm = ChatOpenAI(model=config.model).bind_tools(
+    llm = ChatOpenAI(model=config.model, cache=llm_cache).bind_tools(
         tools, tool_choice="OutputFormatter"
     )
     parser = PydanticToolsParser(tools=tools)
@@ -38,35 +48,125 @@ def get_chain():
     return chain
 
 
+def cluster_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    Return the cluster of each vector, numbered by first appearance.
+    Up to config.block_cluster_sample_size vectors are clustered exactly with
+    Ward linkage, the number of clusters is found by the distance threshold.
+    Beyond that, a fixed sample of the vectors is clustered and each vector
+    is assigned to the nearest cluster centroid, so the time and the memory
+    stay bounded however many takeaways there are.
+    """
+    clustering = AgglomerativeClustering(
+        distance_threshold=config.block_cluster_distance, n_clusters=None
+    )
+    if len(vectors) <= config.block_cluster_sample_size:
+        labels = clustering.fit_predict(vectors)
+    else:
+        # Seeded to cluster the same takeaways the same way every time
+        generator = np.random.default_rng(0)
+        sample = generator.choice(
+            len(vectors), config.block_cluster_sample_size, replace=False
+        )
+        sample.sort()
+        sample_labels = clustering.fit_predict(vectors[sample])
+        centroids = np.zeros((sample_labels.max() + 1, vectors.shape[1]))
+        np.add.at(centroids, sample_labels, vectors[sample])
+        centroids /= np.bincount(sample_labels)[:, None]
+        # Squared distances to the centroids up to the squared norms of the vectors
+        bias = (centroids**2).sum(axis=1) / 2
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), 4096):
+            scores = vectors[start : start + 4096] @ centroids.T - bias
+            labels[start : start + 4096] = scores.argmax(axis=1)
+
+    # Number the clusters in the order of the takeaways
+    _, first_indices, inverse = np.unique(
+        labels, return_index=True, return_inverse=True
+    )
+    order = np.argsort(np.argsort(first_indices))
+    return order[inverse]
+
+
+def get_representatives(vectors: np.ndarray, members: np.ndarray) -> np.ndarray:
+    """Return the members the closest to the center of their cluster, in order."""
+    if len(members) <= config.block_theme_sample_size:
+        return members
+    centroid = vectors[members].mean(axis=0)
+    distances = ((vectors[members] - centroid) ** 2).sum(axis=1)
+    closest = np.argpartition(distances, config.block_theme_sample_size)
+    return np.sort(members[closest[: config.block_theme_sample_size]])
+
+
+def get_prompts(titles: list[str], vectors: np.ndarray, clusters: list) -> list[str]:
+    """
+    Return the texts of the titling calls, each with as many groups as fit
+    in config.block_theme_prompt_tokens. A group shows the most central takeaways
+    of its cluster, fewer if they alone exceed the budget.
+    """
+    groups = []
+    for i, members in enumerate(clusters):
+        text = f"Group {i + 1}:"
+        tokens = len(encoder.encode(text))
+        for j in get_representatives(vectors, members):
+            line = f"\n- {titles[j]}"
+            line_tokens = len(encoder.encode(line))
+            if tokens + line_tokens > config.block_theme_prompt_tokens and "\n" in text:
+                break
+            text += line
+            tokens += line_tokens
+        groups.append((text, tokens))
+
+    prompts = []
+    batch = []
+    batch_tokens = 0
+    for text, tokens in groups:
+        if batch and batch_tokens + tokens > config.block_theme_prompt_tokens:
+            prompts.append("\n\n".join(batch))
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    prompts.append("\n\n".join(batch))
+    return prompts
+
+
 def cluster_block(block: Block, takeaways: QuerySet[Takeaway], created_by: User):
     if block.type != Block.Type.THEMES:
         raise exceptions.ValidationError("The block type must be themes.")
 
-    takeaway_count = takeaways.count()
-    if takeaway_count < 2:
-        raise exceptions.ValidationError("Not enough takeaways to analyze.")
-    if takeaway_count > 200:
-        raise exceptions.ValidationError("Too many takeaways to analyze.")
-
     # We only consider takeaways in the same project as block so to not mess up
     takeaways = takeaways.filter(note__project=block.asset.project)
+    rows = list(takeaways.order_by("id").values_list("id", "title", "vector"))
+    if len(rows) < 2:
+        raise exceptions.ValidationError("Not enough takeaways to analyze.")
 
-    clustering = AgglomerativeClustering(distance_threshold=1.25, n_clusters=None)
-    vectors = [takeaway.vector for takeaway in takeaways]
-    labels = clustering.fit_predict(vectors)
-    clusters = dict()
-    for label, takeaway in zip(labels, takeaways):
-        clusters.setdefault(label, []).append(takeaway)
+    ids = [id for id, _, _ in rows]
+    titles = [title for _, title, _ in rows]
+    vectors = np.array([vector for _, _, vector in rows], dtype=np.float32)
+    del rows
+    labels = cluster_vectors(vectors)
+    clusters = [np.flatnonzero(labels == label) for label in range(labels.max() + 1)]
 
+    # Title the themes in as few calls as the token budget allows,
+    # with the most central takeaways of the large clusters
+    prompts = get_prompts(titles, vectors, clusters)
     chain = get_chain()
-    block.themes.all().delete()
-    for label in range(max(labels) + 1):
-        text = "- " + "\n- ".join([takeaway.title for takeaway in clusters[label]])
-
-        with token_tracker(block.asset.project, block, "cluster-block", created_by):
-            output = chain.invoke({"text": text})[0]
+    with token_tracker(block.asset.project, block, "cluster-block", created_by):
+        outputs = batch_invoke(chain, [{"text": text} for text in prompts])
+    # The groups the llm left out get a default title
+    generated_titles = {
+        theme.group: theme.title for output in outputs for theme in output[0].themes
+    }
 
-        theme = block.themes.create(
-            title=output.title,
-        )
-        theme.takeaways.set(clusters[label])
+    used_titles = set()
+    with transaction.atomic():
+        block.themes.all().delete()
+        for i, members in enumerate(clusters):
+            title = (generated_titles.get(i + 1) or f"Theme {i + 1}")[:240]
+            # Theme titles are unique within a block
+            if title in used_titles:
+                title = f"{title} ({i + 1})"
+            used_titles.add(title)
+            theme = block.themes.create(title=title)
+            theme.takeaways.set([ids[j] for j in members])
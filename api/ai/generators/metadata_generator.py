@@ -18,6 +18,7 @@ from pydantic import BaseModel, Field, StringConstraints
 from typing_extensions import Annotated
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.embedder import embedder
 from api.ai.generators.utils import token_tracker
 from api.models.keyword import Keyword
@@ -27,7 +28,7 @@ from api.models.user import User
 
 def get_chain():
 
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
 
     map_prompt = ChatPromptTemplate.from_messages(
         [
@@ -135,8 +136,7 @@ def generate_metadata(note: Note, created_by: User):
 
     # Map meeting type
     vector = embedder.embed_query(metadata["meeting_type"])
-    blank_vector = embedder.embed_documents([""])[0]
-    threshold = np.array(vector).dot(np.array(blank_vector))
+    threshold = np.array(vector).dot(np.array(embedder.blank_vector))
     note_type = (
         note.project.note_types.annotate(score=-MaxInnerProduct("vector", vector))
         .filter(score__gt=threshold)
@@ -7,6 +7,7 @@ from langchain.text_splitter import TokenTextSplitter
 from langchain.output_parsers import PydanticOutputParser
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.translator import google_translator
 from api.ai.generators.utils import ParserErrorCallbackHandler, token_tracker
 
@@ -54,7 +55,7 @@ def get_template_type_chain(template_name, template_types):
             Ensure all quotes and information come directly from the transcript and are properly formatted.
         """
     )
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             ("human", system_prompt),
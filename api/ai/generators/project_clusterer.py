@@ -1,9 +1,10 @@
 import datetime
 
 import numpy as np
+from django.db import transaction
+from django.utils import timezone
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain.prompts import ChatPromptTemplate
-from langchain_community.embeddings.openai import OpenAIEmbeddings
 from langchain_community.utils.openai_functions import (
     convert_pydantic_to_openai_function,
 )
@@ -12,7 +13,9 @@ from pydantic import BaseModel, Field
 from sklearn.cluster import HDBSCAN
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import token_tracker
+from api.models.key_theme import KeyTheme
 from api.models.project import Project
 from api.models.takeaway import Takeaway
 from api.models.user import User
@@ -28,7 +31,7 @@ def get_chain():
         "A collection of cluster."
         clusters: list[Cluster]
 
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", "Assign a topic for each of the given clusters."),
@@ -41,35 +44,97 @@ def get_chain():
     return chain
 
 
-def cluster_project(project: Project, created_by: User):
-    current_time = datetime.datetime.now().astimezone(datetime.timezone.utc)
-    cutoff = current_time - datetime.timedelta(weeks=1)
-    embedder = OpenAIEmbeddings()
-    takeaways = Takeaway.objects.filter(note__project=project).filter(
-        created_at__gt=cutoff
+def get_vectors(takeaways) -> tuple[list[str], list[str], list, np.ndarray]:
+    """Return the ids, the titles, the creation times and the unit vectors."""
+    rows = list(
+        takeaways.order_by("id").values_list("id", "title", "created_at", "vector")
+    )
+    vectors = np.array([row[3] for row in rows], dtype=np.float32)
+    vectors = vectors.reshape(len(rows), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.maximum(norms, 1e-12)
+    return (
+        [row[0] for row in rows],
+        [row[1] for row in rows],
+        [row[2] for row in rows],
+        vectors,
     )
-    takeaway_titles = takeaways.values_list("title", flat=True)
 
-    if len(takeaway_titles) < 5:
-        return
 
-    takeaway_vectors = np.array(embedder.embed_documents(takeaway_titles))
-    clustering = HDBSCAN(min_cluster_size=3)
-    clustering.fit(takeaway_vectors)
+def assign_takeaways(
+    themes: list[KeyTheme], ids: list[str], created_at: list, vectors: np.ndarray
+) -> np.ndarray | None:
+    """
+    Return the index of the theme of each takeaway, -1 for none.
+    The takeaways of a theme stay in it, the takeaways created since the last
+    clustering join the nearest theme whose scaled radius they are within.
+    Return None when the themes drifted too far from the takeaways, that is
+    when too many of the takeaways of the window fit no theme. The members
+    past the window are not counted, the window moves on at every run.
+    """
+    if not themes:
+        return None
+    theme_indices = {theme.id: i for i, theme in enumerate(themes)}
+    memberships = KeyTheme.takeaways.through.objects.filter(
+        keytheme__in=themes, takeaway__in=ids
+    ).values_list("keytheme_id", "takeaway_id")
+    member_labels = {
+        takeaway_id: theme_indices[theme_id] for theme_id, takeaway_id in memberships
+    }
+    labels = np.array([member_labels.get(id, -1) for id in ids], dtype=np.int64)
 
-    if max(clustering.labels_) <= 0:
-        return
+    clustered_at = min(theme.clustered_at for theme in themes)
+    new = (labels == -1) & np.array([time > clustered_at for time in created_at])
+    outliers = 0
+    if new.any():
+        centroids = np.array([theme.centroid for theme in themes], dtype=np.float32)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        radii = np.array([theme.radius for theme in themes])
+        radii *= config.key_theme_radius_scale
+        distances = 1 - vectors[new] @ centroids.T
+        nearest = distances.argmin(axis=1)
+        fits = distances[np.arange(len(nearest)), nearest] <= radii[nearest]
+        labels[new] = np.where(fits, nearest, -1)
+        outliers = int((~fits).sum())
+
+    if outliers / max(len(ids), 1) > config.key_theme_drift:
+        return None
+    return labels
 
-    clusters = dict()
-    for cluster_id in range(max(clustering.labels_)):
-        clusters[f"Cluster {cluster_id}"] = [
-            takeaway_titles[int(i)]
-            for i in np.argwhere(clustering.labels_ == cluster_id).flatten()
-        ]
 
+def get_radius(vectors: np.ndarray, centroid: np.ndarray) -> float:
+    return float((1 - vectors @ centroid).max())
+
+
+def get_centroid(vectors: np.ndarray) -> np.ndarray:
+    centroid = vectors.mean(axis=0)
+    return centroid / max(np.linalg.norm(centroid), 1e-12)
+
+
+def get_clusters(vectors: np.ndarray, allow_single_cluster=False) -> dict:
+    """Return the indices of the vectors of each cluster found by HDBSCAN."""
+    if len(vectors) < config.key_theme_min_cluster_size:
+        return {}
+    clustering = HDBSCAN(
+        min_cluster_size=config.key_theme_min_cluster_size,
+        allow_single_cluster=allow_single_cluster,
+    )
+    clustering.fit(vectors)
+    return {
+        f"Cluster {cluster_id}": np.flatnonzero(clustering.labels_ == cluster_id)
+        for cluster_id in range(max(clustering.labels_) + 1)
+    }
+
+
+def get_topics(
+    project: Project, clusters: dict, titles: list[str], created_by: User
+) -> dict[str, str]:
+    """Name the clusters from the titles of their takeaways."""
+    if not clusters:
+        return {}
     text = "\n\n".join(
         [
-            f"{key}:\n" + "  * " + "\n  * ".join(cluster)
+            f"{key}:\n" + "  * " + "\n  * ".join(titles[i] for i in cluster)
             for key, cluster in clusters.items()
         ]
     )
@@ -77,12 +142,125 @@ def cluster_project(project: Project, created_by: User):
     chain = get_chain()
     with token_tracker(project, project, "cluster-takeaways", created_by):
         output = chain.invoke({"clusters": text})
-    key_themes = [
-        {
-            "title": cluster_topic["topic"],
-            "takeaways": clusters[cluster_topic["cluster"]],
-        }
+    return {
+        cluster_topic["cluster"]: cluster_topic["topic"]
         for cluster_topic in output["clusters"]
-    ]
-    project.key_themes = key_themes
-    project.save()
+    }
+
+
+def create_themes(
+    project: Project,
+    clusters: dict,
+    topics: dict[str, str],
+    ids: list[str],
+    titles: list[str],
+    vectors: np.ndarray,
+) -> list[dict]:
+    """Create the themes of the named clusters, return their key themes."""
+    clustered_at = timezone.now()
+    key_themes = []
+    for key, members in clusters.items():
+        topic = topics.get(key)
+        if topic is None:
+            # Not named by the model
+            continue
+        centroid = get_centroid(vectors[members])
+        theme = KeyTheme.objects.create(
+            project=project,
+            title=topic,
+            centroid=centroid,
+            radius=get_radius(vectors[members], centroid),
+            clustered_at=clustered_at,
+        )
+        theme.takeaways.set([ids[i] for i in members])
+        key_themes.append({"title": topic, "takeaways": [titles[i] for i in members]})
+    return key_themes
+
+
+def update_themes(
+    project: Project,
+    themes: list[KeyTheme],
+    ids: list[str],
+    titles: list[str],
+    vectors: np.ndarray,
+    labels: np.ndarray,
+    created_by: User,
+):
+    """
+    Add the assigned takeaways to their theme and move the centroids to the mean
+    of the takeaways of the week. The takeaways past the week stay in their theme,
+    the themes without takeaways in the week are not shown.
+    The takeaways that fit no theme are clustered on their own, so that they
+    can form new themes without clustering all the takeaways again.
+    """
+    outliers = np.flatnonzero(labels == -1)
+    clusters = {
+        key: outliers[members]
+        for key, members in get_clusters(
+            vectors[outliers], allow_single_cluster=True
+        ).items()
+    }
+    topics = get_topics(project, clusters, titles, created_by)
+
+    key_themes = []
+    with transaction.atomic():
+        for i, theme in enumerate(themes):
+            members = np.flatnonzero(labels == i)
+            if len(members) == 0:
+                continue
+            theme.centroid = get_centroid(vectors[members])
+            theme.save(update_fields=["centroid"])
+            theme.takeaways.add(*[ids[j] for j in members])
+            key_themes.append(
+                {"title": theme.title, "takeaways": [titles[j] for j in members]}
+            )
+        key_themes += create_themes(project, clusters, topics, ids, titles, vectors)
+        project.key_themes = key_themes
+        project.save()
+
+
+def recluster(
+    project: Project,
+    ids: list[str],
+    titles: list[str],
+    vectors: np.ndarray,
+    created_by: User,
+):
+    """
+    Cluster the takeaways from scratch and name the clusters.
+    The previous themes are removed even if no cluster is found,
+    as they drifted away from the takeaways.
+    """
+    clusters = get_clusters(vectors)
+    topics = get_topics(project, clusters, titles, created_by)
+
+    with transaction.atomic():
+        project.key_theme_clusters.all().delete()
+        project.key_themes = create_themes(
+            project, clusters, topics, ids, titles, vectors
+        )
+        project.save()
+
+
+def cluster_project(project: Project, created_by: User):
+    """
+    Group the takeaways of the past week of the project into key themes,
+    from the takeaway vectors stored in the database.
+    The takeaways added since the last clustering are assigned to the existing
+    themes, the takeaways are only clustered again when the themes drifted.
+    """
+    cutoff = timezone.now() - datetime.timedelta(weeks=1)
+    takeaways = Takeaway.objects.filter(note__project=project).filter(
+        created_at__gt=cutoff
+    )
+    ids, titles, created_at, vectors = get_vectors(takeaways)
+
+    if len(ids) < 5:
+        return
+
+    themes = list(project.key_theme_clusters.order_by("id"))
+    labels = assign_takeaways(themes, ids, created_at, vectors)
+    if labels is None:
+        recluster(project, ids, titles, vectors, created_by)
+    else:
+        update_themes(project, themes, ids, titles, vectors, labels, created_by)
@@ -8,13 +8,14 @@ from langchain.text_splitter import TokenTextSplitter
 from langchain_openai.chat_models import ChatOpenAI
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import token_tracker
 from api.models.project import Project
 from api.models.user import User
 
 
 def summarize_project(project: Project, created_by: User):
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             (
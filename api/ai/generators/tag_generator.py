@@ -1,4 +1,5 @@
 import json
+from collections import Counter
 
 from django.db.models.query import QuerySet
 from django.utils.translation import gettext
@@ -9,12 +10,14 @@ from pydantic.v1 import BaseModel, Field
 from tiktoken import encoding_for_model
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import ParserErrorCallbackHandler, token_tracker
 from api.models.note import Note
 from api.models.tag import Tag
 from api.models.takeaway import Takeaway
 from api.models.takeaway_type import TakeawayType
 from api.models.user import User
+from api.utils.rollups import rollup_collector
 
 __all__ = ["generate_tag"]
 
@@ -37,7 +40,7 @@ def get_chain():
 
         takeaways: list[TakeawaySchema]
 
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     example = (
         json.dumps(
             {
@@ -128,10 +131,27 @@ def save_takeaway_tags(note: Takeaway, tags: QuerySet[Tag], results):
     get_tag = {tag.name.lower(): tag for tag in tags}
     get_takeaway = {takeaway.id: takeaway for takeaway in note.takeaways.all()}
     TakeawayTag = Takeaway.tags.through
-    takeaway_tags = []
+    takeaway_tag_ids = set()
     for takeaway_data in results:
         takeaway: Takeaway = get_takeaway[takeaway_data["id"]]
         for tag_name in takeaway_data["tags"]:
             tag = get_tag[tag_name.lower()]
-            takeaway_tags.append(TakeawayTag(takeaway=takeaway, tag=tag))
-    TakeawayTag.objects.bulk_create(takeaway_tags, ignore_conflicts=True)
+            takeaway_tag_ids.add((takeaway.id, tag.id))
+    takeaway_tag_ids -= set(
+        TakeawayTag.objects.filter(
+            takeaway__in=[takeaway_id for takeaway_id, _ in takeaway_tag_ids]
+        ).values_list("takeaway_id", "tag_id")
+    )
+    TakeawayTag.objects.bulk_create(
+        [
+            TakeawayTag(takeaway_id=takeaway_id, tag_id=tag_id)
+            for takeaway_id, tag_id in takeaway_tag_ids
+        ],
+        ignore_conflicts=True,
+    )
+    # The bulk create does not send the m2m_changed signal
+    Tag.objects.add_takeaway_counts(Counter(tag_id for _, tag_id in takeaway_tag_ids))
+    rollup_collector.add_takeaways(
+        (note.id, get_takeaway[takeaway_id].created_at)
+        for takeaway_id in {takeaway_id for takeaway_id, _ in takeaway_tag_ids}
+    )
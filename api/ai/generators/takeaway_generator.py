@@ -6,25 +6,27 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.schema.document import Document
 from langchain.text_splitter import TokenTextSplitter
 from langchain_openai.chat_models import ChatOpenAI
-from nltk.tokenize import sent_tokenize
 from pydantic.v1 import BaseModel
-from sklearn.feature_extraction.text import TfidfVectorizer
 
 from api.ai import config
+from api.ai.aligner import QuoteAligner
+from api.ai.cache import llm_cache
 from api.ai.embedder import embedder
-from api.ai.generators.utils import ParserErrorCallbackHandler, token_tracker
+from api.ai.generators.utils import batch_invoke, token_tracker
 from api.ai.translator import google_translator
 from api.models.highlight import Highlight
 from api.models.note import Note
 from api.models.takeaway import Takeaway
 from api.models.takeaway_type import TakeawayType
 from api.models.user import User
+from api.models.workspace_quota import WorkspaceQuota
 from api.utils import media
 from api.utils.assembly import AssemblyProcessor
 from api.utils.lexical import LexicalProcessor
+from api.utils.rollups import rollup_collector
 
 
-def get_chain(takeaway_type: TakeawayType):
+def get_chain():
     system_prompt = dedent(
         """
             You are tasked with extracting specific information from a given transcript. Here are the details:
@@ -112,7 +114,7 @@ def get_chain(takeaway_type: TakeawayType):
     class TakeawaysSchema(BaseModel):
         takeaways: list[TakeawaySchema]
 
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [("system", system_prompt)],
         template_format="jinja2",
@@ -135,22 +137,24 @@ def generate_takeaways(
     doc = Document(page_content=note.get_markdown())
     docs = text_splitter.split_documents([doc])
 
+    # The takeaway type only goes into the prompt variables,
+    # so a single chain can serve all the (takeaway type, chunk) pairs.
+    chain = get_chain()
+    pairs = [(takeaway_type, doc) for takeaway_type in takeaway_types for doc in docs]
+    inputs = [
+        {
+            "TRANSCRIPT": doc.page_content,
+            "EXTRACTION_NAME": takeaway_type.name,
+            "EXTRACTION_DEFINITION": takeaway_type.definition,
+        }
+        for takeaway_type, doc in pairs
+    ]
     with token_tracker(note.project, note, "generate-takeaways", created_by):
-        outputs = [
-            {
-                "takeaway_type": takeaway_type,
-                "output": get_chain(takeaway_type).invoke(
-                    {
-                        "TRANSCRIPT": doc.page_content,
-                        "EXTRACTION_NAME": takeaway_type.name,
-                        "EXTRACTION_DEFINITION": takeaway_type.definition,
-                    },
-                    config={"callbacks": [ParserErrorCallbackHandler()]},
-                ),
-            }
-            for takeaway_type in takeaway_types
-            for doc in docs
-        ]
+        results = batch_invoke(chain, inputs)
+    outputs = [
+        {"takeaway_type": takeaway_type, "output": result}
+        for (takeaway_type, _), result in zip(pairs, results)
+    ]
 
     if not outputs:
         return
@@ -168,55 +172,29 @@ def generate_takeaways(
         for takeaway in output["output"].dict()["takeaways"]
     ]
 
-    # Embed note content
+    # Locate the quotes in the note
     if note.media_type == Note.MediaType.TEXT:
         lexical = LexicalProcessor(note.content["root"])
-        sentences = [
-            sentence.strip()
-            for paragraph in lexical.to_text().split("\n")
-            for sentence in sent_tokenize(paragraph)
-            if sentence.strip()  # Check if there is some text after stripping
-        ]
+        text, entries = lexical.get_text_index(separator="\n")
     else:  # audio or video
-        transcript = note.transcript
-        words = [
-            word["text"]
-            for utterance in transcript["utterances"]
-            for word in utterance["words"]
-        ]
-        sentences = sent_tokenize(" ".join(words))
-    bi_sentences = [
-        f"{sentence1} {sentence2}"
-        for sentence1, sentence2 in zip(sentences[:-1], sentences[1:])
-    ]
-    tri_sentences = [
-        f"{sentence1} {sentence2} {sentence3}"
-        for sentence1, sentence2, sentence3 in zip(
-            sentences[:-2], sentences[1:-1], sentences[2:]
-        )
-    ]
-    sentences.extend(bi_sentences)
-    sentences.extend(tri_sentences)
-    vectorizer = TfidfVectorizer()
-    doc_vecs = vectorizer.fit_transform(sentences)
-
-    # Find best matches
-    generated_takeaway_quotes = [takeaway["quote"] for takeaway in generated_takeaways]
-    quote_vectors = vectorizer.transform(generated_takeaway_quotes)
-    cosine_similarities = quote_vectors.dot(doc_vecs.T)
-    best_matches = cosine_similarities.argmax(axis=1).A1
+        assembly = AssemblyProcessor(note.transcript)
+        text = assembly.index.text
+    aligner = QuoteAligner.for_note(note, text)
+    alignments = aligner.align([takeaway["quote"] for takeaway in generated_takeaways])
 
     # Embed generated takeaways
     generated_takeaway_titles = [takeaway["title"] for takeaway in generated_takeaways]
     generated_takeaway_vectors = embedder.embed_documents(generated_takeaway_titles)
 
-    # Create takeaways
-    takeaways_to_create = []
-    highlights_to_create = []
-    for generated_takeaway, vector, index in zip(
-        generated_takeaways, generated_takeaway_vectors, best_matches
+    # Highlight the quotes, the quotes not found in the note are kept as generated
+    quote_max_length = Highlight._meta.get_field("quote").max_length
+    takeaways = []
+    highlights = []
+    spans = []
+    segments = []
+    for generated_takeaway, vector, alignment in zip(
+        generated_takeaways, generated_takeaway_vectors, alignments
     ):
-
         takeaway = Takeaway(
             title=generated_takeaway["title"],
             vector=vector,
@@ -224,36 +202,62 @@ def generate_takeaways(
             created_by=bot,
             type=generated_takeaway["takeaway_type"],
         )
-
-        # Highlighting the text and creating the clip
-        start = end = clip = thumbnail = None
-        highlight_str = sentences[index]
-        if note.media_type == Note.MediaType.TEXT:
-            lexical.highlight(highlight_str, takeaway.id)
-        else:  # audio or video
-            assembly = AssemblyProcessor(note.transcript)
-            success, start, end = assembly.highlight(highlight_str, takeaway.id)
-            if success:
-                clip = media.cut_media_file(note.file, start / 1000, end / 1000)
-                if note.media_type == Note.MediaType.VIDEO:
-                    thumbnail = media.create_thumbnail(note.file, start / 1000)
-
         highlight = Highlight(
             takeaway_ptr_id=takeaway.id,
-            quote=highlight_str,
-            start=start,
-            end=end,
-            clip=clip,
-            clip_size=clip.size if clip else 0,
-            thumbnail=thumbnail,
-            thumbnail_size=thumbnail.size if thumbnail else 0,
+            quote=generated_takeaway["quote"][:quote_max_length],
+            # The sizes of the highlights without a clip are 0, not null
+            clip_size=0,
+            thumbnail_size=0,
         )
-
-        takeaways_to_create.append(takeaway)
-        highlights_to_create.append(highlight)
-
-    Takeaway.objects.bulk_create(takeaways_to_create)
-    Highlight.bulk_create(highlights_to_create)
+        if alignment is not None:
+            highlight.quote = " ".join(text[alignment.start : alignment.end].split())
+            spans.append((alignment.start, alignment.end, highlight))
+        takeaways.append(takeaway)
+        highlights.append(highlight)
+    if note.media_type == Note.MediaType.TEXT:
+        lexical.highlight_spans(
+            [
+                (start, end, highlight.takeaway_ptr_id)
+                for start, end, highlight in spans
+            ],
+            entries,
+        )
+    else:  # audio or video
+        for start, end, highlight in spans:
+            highlight.start, highlight.end = assembly.highlight_span(
+                start, end, highlight.takeaway_ptr_id
+            )
+            if highlight.start is not None:
+                segments.append(
+                    (highlight, (highlight.start / 1000, highlight.end / 1000))
+                )
+
+    # Cut all the clips from a single copy of the source, the clips stay on disk
+    # until the storage streams them on save.
+    with media.MediaClipper(note.file, config.media_max_workers) as clipper:
+        clips = clipper.cut_all(
+            [segment for _, segment in segments],
+            with_thumbnails=note.media_type == Note.MediaType.VIDEO,
+        )
+        for (highlight, _), (clip, thumbnail) in zip(segments, clips):
+            highlight.clip = clip
+            highlight.clip_size = clip.size
+            highlight.thumbnail = thumbnail
+            highlight.thumbnail_size = thumbnail.size if thumbnail else 0
+
+        Takeaway.objects.bulk_create(takeaways)
+        Highlight.bulk_create(highlights)
+
+    # Bulk create doesn't send post_save, so we roll up the takeaways
+    # and count the stored clips here
+    rollup_collector.add_takeaways(
+        (takeaway.note_id, takeaway.created_at) for takeaway in takeaways
+    )
+    WorkspaceQuota.objects.filter(workspace=note.workspace_id).add_usage(
+        file_size=sum(
+            highlight.clip_size + highlight.thumbnail_size for highlight in highlights
+        )
+    )
 
     # Update note.content
     note.save()
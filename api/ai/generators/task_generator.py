@@ -10,6 +10,7 @@ from langchain_openai.chat_models import ChatOpenAI
 from pydantic.v1 import BaseModel
 
 from api.ai import config
+from api.ai.cache import llm_cache
 from api.ai.generators.utils import ParserErrorCallbackHandler, token_tracker
 from api.ai.translator import google_translator
 from api.models.note import Note
@@ -124,7 +125,7 @@ def get_task_chain(task_types):
             Provide your final answer in JSON format, ensuring it's a valid JSON structure. Do not include anything else other than the JSON.
         """
     )
-    llm = ChatOpenAI(model=config.model)
+    llm = ChatOpenAI(model=config.model, cache=llm_cache)
     prompt = ChatPromptTemplate.from_messages(
         [
             ("human", system_prompt),
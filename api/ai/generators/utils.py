@@ -4,15 +4,20 @@ from decimal import Decimal
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain_community.callbacks.manager import get_openai_callback
 
+from api.ai import config
+from api.ai.cache import CacheStats, cache_stats
 from api.models.usage.token import TokenUsage
 
 
 @contextmanager
 def token_tracker(project, content_object, action, created_by):
+    stats = CacheStats()
+    token = cache_stats.set(stats)
     with get_openai_callback() as callback:
         try:
             yield callback
         finally:
+            cache_stats.reset(token)
             TokenUsage.objects.create(
                 workspace=project.workspace,
                 project=project,
@@ -22,6 +27,21 @@ def token_tracker(project, content_object, action, created_by):
                 value=callback.total_tokens,
                 cost=Decimal(callback.total_cost),
             )
+            # Cached responses are free, one zero-cost row per hit.
+            TokenUsage.objects.bulk_create(
+                [
+                    TokenUsage(
+                        workspace=project.workspace,
+                        project=project,
+                        content_object=content_object,
+                        action=f"{action}-cache-hit",
+                        created_by=created_by,
+                        value=0,
+                        cost=Decimal(0),
+                    )
+                    for _ in range(stats.hits)
+                ]
+            )
 
 
 class ParserErrorCallbackHandler(BaseCallbackHandler):
@@ -32,3 +52,19 @@ class ParserErrorCallbackHandler(BaseCallbackHandler):
     def on_chain_error(self, *args, **kwargs):
         if hasattr(self, "ai_message"):
             print(self.ai_message)
+
+
+def batch_invoke(chain, inputs: list[dict], max_concurrency=config.max_concurrency):
+    """
+    Invoke the chain on all inputs concurrently and return the outputs in input order.
+    Each input gets its own ParserErrorCallbackHandler since the handler keeps state.
+    Must be called inside token_tracker for the token usage to be recorded.
+    """
+    configs = [
+        {
+            "callbacks": [ParserErrorCallbackHandler()],
+            "max_concurrency": max_concurrency,
+        }
+        for _ in inputs
+    ]
+    return chain.batch(inputs, config=configs)
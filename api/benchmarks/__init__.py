@@ -0,0 +1,17 @@
+"""
+Benchmarks run with `python manage.py benchmark <name>`,
+where <name> is a module in this package exposing `run(stdout)`.
+Everything written to the database during a benchmark is rolled back.
+"""
+
+from time import perf_counter
+
+
+def measure(func, repeat=5):
+    """Return the best wall-clock time of `repeat` runs of func in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
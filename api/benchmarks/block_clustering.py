@@ -0,0 +1,60 @@
+import tracemalloc
+
+import numpy as np
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.metrics import adjusted_rand_score
+
+from api.ai import config
+from api.ai.generators.block_clusterer import cluster_vectors
+from api.benchmarks import measure
+
+# Ward linkage over all the takeaways needs quadratic memory, beyond this it doesn't fit
+EXACT_MAX_COUNT = 5000
+
+
+def create_vectors(count, seed=0):
+    """
+    Unit vectors around topics of long-tailed sizes, like the embeddings
+    of the takeaways of an asset. Return the vectors and their topic.
+    """
+    generator = np.random.default_rng(seed)
+    topic_count = max(5, int(np.sqrt(count) / 2))
+    centers = generator.normal(size=(topic_count, 1536))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    topics = generator.zipf(1.5, size=count) % topic_count
+    vectors = centers[topics] + 0.025 * generator.normal(size=(count, 1536))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32), topics
+
+
+def cluster_exactly(vectors):
+    """The previous clustering, Ward linkage over all the takeaways."""
+    clustering = AgglomerativeClustering(
+        distance_threshold=config.block_cluster_distance, n_clusters=None
+    )
+    return clustering.fit_predict(vectors)
+
+
+def run(stdout):
+    for count in [200, 2000, 20000]:
+        vectors, topics = create_vectors(count)
+        for name, cluster in [
+            ("exact ward", cluster_exactly),
+            ("sampled ward", cluster_vectors),
+        ]:
+            if cluster is cluster_exactly and count > EXACT_MAX_COUNT:
+                stdout.write(f"{count} takeaways, {name}: skipped")
+                continue
+            seconds = measure(lambda: cluster(vectors), repeat=1)
+            tracemalloc.start()
+            labels = cluster(vectors)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            deterministic = (cluster(vectors) == labels).all()
+            stdout.write(
+                f"{count} takeaways, {name}: {seconds * 1000:.0f} ms, "
+                f"peak memory {peak / 1024 / 1024:.1f} MB, "
+                f"{labels.max() + 1} themes for {len(set(topics))} topics, "
+                f"adjusted rand index {adjusted_rand_score(topics, labels):.3f}, "
+                f"deterministic {deterministic}"
+            )
@@ -0,0 +1,104 @@
+from copy import deepcopy
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarks import measure
+from api.models.highlight import Highlight
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.serializers.note import NoteUpdateSerializer
+
+HIGHLIGHT_COUNT = 500
+
+
+def create_note(user):
+    workspace = Workspace.objects.create(name="benchmark", owned_by=user)
+    project = Project.objects.create(name="benchmark", workspace=workspace)
+    note = Note.objects.create(title="benchmark", project=project, author=user)
+    takeaways = [
+        Takeaway(
+            title=f"quote {i}",
+            note=note,
+            created_by=user,
+            vector=np.random.rand(1536),
+        )
+        for i in range(HIGHLIGHT_COUNT)
+    ]
+    Takeaway.objects.bulk_create(takeaways)
+    Highlight.bulk_create(
+        [
+            Highlight(takeaway_ptr_id=takeaway.id, quote=takeaway.title)
+            for takeaway in takeaways
+        ]
+    )
+    note.content = {
+        "root": {
+            "type": "root",
+            "children": [
+                {
+                    "type": "paragraph",
+                    "children": [
+                        {"type": "text", "text": "Some text before the "},
+                        {
+                            "type": "mark",
+                            "ids": [takeaway.id],
+                            "children": [{"type": "text", "text": takeaway.title}],
+                        },
+                        {"type": "text", "text": " and some text after."},
+                    ],
+                }
+                for takeaway in takeaways
+            ],
+        }
+    }
+    note.save()
+    return note
+
+
+def autosave(note, content, user):
+    serializer = NoteUpdateSerializer(
+        note,
+        data={"content": deepcopy(content)},
+        partial=True,
+        context={"request": SimpleNamespace(user=user)},
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def run(stdout):
+    user = User.objects.create_user(username="benchmark@example.com")
+    note = create_note(user)
+    unchanged = deepcopy(note.content)
+    # Edit 20 quotes and add a new highlight
+    edited = deepcopy(note.content)
+    for paragraph in edited["root"]["children"][:20]:
+        paragraph["children"][1]["children"][0]["text"] += " edited"
+    edited["root"]["children"][-1]["children"][2] = {
+        "type": "mark",
+        "ids": [None],
+        "children": [{"type": "text", "text": " and some text after."}],
+    }
+
+    def embed_documents(texts):
+        embed_documents.calls += 1
+        return [np.random.rand(1536).tolist() for _ in texts]
+
+    with patch("api.serializers.note.embedder") as embedder:
+        embedder.embed_documents.side_effect = embed_documents
+        for name, content in [("unchanged", unchanged), ("20 edited, 1 new", edited)]:
+            embed_documents.calls = 0
+            # A single run as the first autosave already syncs the highlights
+            with CaptureQueriesContext(connection) as queries:
+                seconds = measure(lambda: autosave(note, content, user), repeat=1)
+            stdout.write(
+                f"{HIGHLIGHT_COUNT} highlights, {name}: {seconds * 1000:.1f} ms, "
+                f"{len(queries)} queries, {embed_documents.calls} embedding calls"
+            )
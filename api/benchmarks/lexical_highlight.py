@@ -0,0 +1,56 @@
+from copy import deepcopy
+
+from api.benchmarks import measure
+from api.utils.lexical import LexicalProcessor
+
+PARAGRAPH_COUNT = 2000
+QUOTE_COUNT = 40
+REPEAT = 5
+
+
+def create_content():
+    return {
+        "type": "root",
+        "children": [
+            {
+                "type": "paragraph",
+                "children": [
+                    {"type": "text", "text": f"Paragraph {i} starts with a sentence. "},
+                    {"type": "text", "text": "Then a bold part", "format": 1},
+                    {"type": "text", "text": f" ends the paragraph {i}."},
+                ],
+            }
+            for i in range(PARAGRAPH_COUNT)
+        ],
+    }
+
+
+def get_quotes():
+    step = PARAGRAPH_COUNT // QUOTE_COUNT
+    return [
+        (f"Then a bold part ends the paragraph {i}.", f"takeaway{i}")
+        for i in range(step // 2, PARAGRAPH_COUNT, step)
+    ]
+
+
+def run(stdout):
+    content = create_content()
+    quotes = get_quotes()
+
+    def highlight_each(lexical):
+        for quote, id in quotes:
+            lexical.highlight(quote, id)
+
+    def highlight_all(lexical):
+        lexical.highlight_all(quotes)
+
+    for name, highlight in [
+        ("highlight per quote", highlight_each),
+        ("highlight_all", highlight_all),
+    ]:
+        copies = [LexicalProcessor(deepcopy(content)) for _ in range(REPEAT)]
+        seconds = measure(lambda: highlight(copies.pop()), repeat=REPEAT)
+        stdout.write(
+            f"{PARAGRAPH_COUNT} paragraphs, {len(quotes)} quotes, {name}: "
+            f"{seconds * 1000:.1f} ms"
+        )
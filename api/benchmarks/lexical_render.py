@@ -0,0 +1,111 @@
+import tracemalloc
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.benchmarks import measure
+from api.models.asset import Asset
+from api.models.block import Block
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.utils.lexical import LexicalProcessor
+
+CONTENT_SIZE = 200_000  # characters of text
+BLOCK_COUNT = 50
+
+
+def create_paragraph(i):
+    return {
+        "type": "paragraph",
+        "children": [
+            {"type": "text", "text": f"Paragraph {i} with some text before the "},
+            {
+                "type": "mark",
+                "ids": [f"takeaway{i}"],
+                "children": [{"type": "text", "text": "highlighted quote"}],
+            },
+            {"type": "text", "text": ", a "},
+            {
+                "type": "link",
+                "url": f"https://example.com/{i}",
+                "children": [{"type": "text", "text": "link"}],
+            },
+            {"type": "text", "text": " and some text after."},
+        ],
+    }
+
+
+def create_content():
+    children = []
+    size = 0
+    while size < CONTENT_SIZE:
+        i = len(children)
+        if i % 10 == 0:
+            children.append(
+                {
+                    "type": "heading",
+                    "tag": "h2",
+                    "children": [{"type": "text", "text": f"Section {i}"}],
+                }
+            )
+        children.append(create_paragraph(i))
+        size += 100
+    return {"type": "root", "children": children}
+
+
+def create_asset(user):
+    workspace = Workspace.objects.create(name="benchmark", owned_by=user)
+    project = Project.objects.create(name="benchmark", workspace=workspace)
+    note = Note.objects.create(title="benchmark", project=project, author=user)
+    asset = Asset.objects.create(title="benchmark", project=project, created_by=user)
+    takeaways = Takeaway.objects.bulk_create(
+        [
+            Takeaway(
+                title=f"takeaway {i}",
+                note=note,
+                created_by=user,
+                vector=np.random.rand(1536),
+            )
+            for i in range(10)
+        ]
+    )
+    content = create_content()
+    for _ in range(BLOCK_COUNT):
+        block = Block.objects.create(asset=asset, type=Block.Type.TAKEAWAYS)
+        block.takeaways.add(*takeaways)
+        content["children"].append({"type": block.type, "block_id": block.id})
+    return content
+
+
+def run(stdout):
+    note_content = create_content()
+    lexical = LexicalProcessor(note_content)
+    size = len(lexical.to_markdown())
+    renders = {
+        "to_markdown": lexical.to_markdown,
+        "to_text": lexical.to_text,
+        "get_markdown_length": lambda: lexical.get_markdown_length(limit=250_000),
+    }
+    for name, func in renders.items():
+        seconds = measure(func)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stdout.write(
+            f"{size // 1000} KB note, {name}: {seconds * 1000:.1f} ms, "
+            f"peak memory {peak / 1024:.0f} KB"
+        )
+
+    user = User.objects.create_user(username="benchmark@example.com")
+    lexical = LexicalProcessor(create_asset(user))
+    with CaptureQueriesContext(connection) as queries:
+        seconds = measure(lexical.to_markdown, repeat=1)
+    stdout.write(
+        f"Asset with {BLOCK_COUNT} blocks, to_markdown: {seconds * 1000:.1f} ms, "
+        f"{len(queries)} queries"
+    )
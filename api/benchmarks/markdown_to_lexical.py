@@ -0,0 +1,41 @@
+import tracemalloc
+from pathlib import Path
+
+from api.benchmarks import measure
+from api.utils.markdown import MarkdownProcessor
+
+SECTION_COUNT = 200
+
+
+def create_report():
+    """A markdown report in the shape of the generated asset content."""
+    sections = []
+    for i in range(SECTION_COUNT):
+        sections.append(
+            f"## Theme {i}\n\n"
+            f"Users mentioned **theme {i}** in several interviews, "
+            f"see the [source](https://example.com/{i}).\n\n"
+            "- First takeaway\n- Second takeaway\n  - Detail\n\n"
+            f"> A quote about theme {i}.\n\n"
+            "| Takeaway | Count |\n|---|---|\n| First | 3 |\n| Second | 5 |\n"
+        )
+    return "# Report\n\n" + "\n".join(sections)
+
+
+def run(stdout):
+    documents = {
+        path.stem: path.read_text()
+        for path in sorted(Path("api/tests/files/lexical").glob("*.md"))
+    }
+    documents[f"report with {SECTION_COUNT} sections"] = create_report()
+
+    for name, markdown in documents.items():
+        seconds = measure(lambda: MarkdownProcessor(markdown).to_lexical())
+        tracemalloc.start()
+        MarkdownProcessor(markdown).to_lexical()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stdout.write(
+            f"{name} ({len(markdown)} chars): {seconds * 1000:.2f} ms, "
+            f"peak memory {peak / 1024:.0f} KB"
+        )
@@ -0,0 +1,153 @@
+import random
+import tracemalloc
+
+from nltk.tokenize import sent_tokenize
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from api.ai.aligner import QuoteAligner, split_sentences
+from api.benchmarks import measure
+from api.utils.assembly import TranscriptIndex
+
+QUOTE_COUNT = 80
+COMMON_WORDS = ["the", "a", "we", "it", "is", "and", "to", "of", "that", "really"]
+# Pseudo words with a long tail, like the vocabulary of a conversation
+SYLLABLES = ["ba", "ke", "lo", "mi", "nu", "ra", "so", "ti", "ve", "zu"]
+CONTENT_WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+CONTENT_WEIGHTS = [1 / rank for rank in range(1, len(CONTENT_WORDS) + 1)]
+
+
+def create_sentence(generator):
+    words = generator.choices(
+        CONTENT_WORDS, weights=CONTENT_WEIGHTS, k=generator.randint(4, 14)
+    )
+    for _ in range(len(words) // 2):
+        words.insert(generator.randrange(len(words)), generator.choice(COMMON_WORDS))
+    return words
+
+
+def create_transcript(sentence_count, seed=0):
+    """A transcript in the shape of the assembly transcripts, with timed words."""
+    generator = random.Random(seed)
+    utterances = []
+    time = 0
+    for i in range(0, sentence_count, 5):
+        words = []
+        for _ in range(min(5, sentence_count - i)):
+            sentence = create_sentence(generator)
+            sentence[0] = sentence[0].capitalize()
+            sentence[-1] += generator.choice([".", ".", "?", "!"])
+            for text in sentence:
+                words.append({"text": text, "start": time, "end": time + 300})
+                time += 350
+        utterances.append({"speaker": "AB"[i % 2], "words": words})
+    return utterances
+
+
+def create_quotes(text, sentence_spans, seed=0):
+    """
+    Quotes of one to three sentences, like the generated quotes: verbatim,
+    with another case and punctuation, with a few words edited, or paraphrased.
+    Return the (quote, kind, start, end) with the span of the source.
+    """
+    generator = random.Random(seed)
+    quotes = []
+    for i in range(QUOTE_COUNT):
+        first = generator.randrange(len(sentence_spans) - 3)
+        last = first + generator.randint(0, 2)
+        start, end = sentence_spans[first][0], sentence_spans[last][1]
+        words = text[start:end].split()
+        kind = ["verbatim", "normalized", "edited", "paraphrased"][i % 4]
+        if kind == "normalized":
+            words = [word.lower().strip(".?!") for word in words]
+        elif kind == "edited":
+            for _ in range(max(1, len(words) // 10)):
+                words[generator.randrange(len(words))] = generator.choice(COMMON_WORDS)
+        elif kind == "paraphrased":
+            words = words[: len(words) // 2] + create_sentence(generator)
+        quotes.append((" ".join(words), kind, start, end))
+    return quotes
+
+
+def align_with_windows(text, quotes):
+    """The previous alignment, a dense argmax over all the sentence windows."""
+    sentences = sent_tokenize(text)
+    windows = (
+        sentences
+        + [" ".join(sentences[i : i + 2]) for i in range(len(sentences) - 1)]
+        + [" ".join(sentences[i : i + 3]) for i in range(len(sentences) - 2)]
+    )
+    vectorizer = TfidfVectorizer()
+    window_vectors = vectorizer.fit_transform(windows)
+    similarities = vectorizer.transform(quotes).dot(window_vectors.T)
+    spans = []
+    for index in similarities.argmax(axis=1).A1:
+        start = text.find(windows[index])
+        spans.append((start, start + len(windows[index])) if start != -1 else None)
+    return spans
+
+
+def align_with_aligner(text, quotes, sentence_spans=None):
+    if sentence_spans is None:
+        sentence_spans = split_sentences(text)
+    alignments = QuoteAligner(text, sentence_spans).align(quotes)
+    return [
+        (alignment.start, alignment.end) if alignment else None
+        for alignment in alignments
+    ]
+
+
+def get_accuracy(spans, quotes):
+    """Return the share of quotes overlapping their source and the mean overlap."""
+    found = 0
+    overlap = 0
+    for span, (_, _, start, end) in zip(spans, quotes):
+        if span is None or span[1] <= start or end <= span[0]:
+            continue
+        found += 1
+        intersection = min(span[1], end) - max(span[0], start)
+        overlap += intersection / (max(span[1], end) - min(span[0], start))
+    return found / len(quotes), overlap / len(quotes)
+
+
+def run(stdout):
+    for sentence_count in [1000, 5000, 20000]:
+        index = TranscriptIndex(create_transcript(sentence_count))
+        text = index.text
+        sentence_spans = split_sentences(text)
+        quotes = create_quotes(text, sentence_spans)
+        quote_texts = [quote for quote, _, _, _ in quotes]
+
+        for name, align in [
+            ("dense windows", lambda: align_with_windows(text, quote_texts)),
+            ("aligner", lambda: align_with_aligner(text, quote_texts)),
+            (
+                "aligner, cached sentences",
+                lambda: align_with_aligner(text, quote_texts, sentence_spans),
+            ),
+        ]:
+            seconds = measure(align, repeat=3)
+            tracemalloc.start()
+            spans = align()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            found, overlap = get_accuracy(spans, quotes)
+            stdout.write(
+                f"{sentence_count} sentences ({len(text)} chars), {name}: "
+                f"{seconds * 1000:.0f} ms, peak memory {peak / 1024 / 1024:.1f} MB, "
+                f"found {found:.0%}, overlap {overlap:.0%}"
+            )
+
+        aligner = QuoteAligner(text, sentence_spans)
+        for kind in ["verbatim", "normalized", "edited", "paraphrased"]:
+            selected = [quote for quote in quotes if quote[1] == kind]
+            alignments = aligner.align([quote for quote, _, _, _ in selected])
+            spans = [
+                (alignment.start, alignment.end) if alignment else None
+                for alignment in alignments
+            ]
+            found, overlap = get_accuracy(spans, selected)
+            methods = {alignment.method for alignment in alignments if alignment}
+            stdout.write(
+                f"    {kind} quotes: found {found:.0%}, overlap {overlap:.0%}, "
+                f"matched by {', '.join(sorted(methods))}"
+            )
@@ -1,3 +1,5 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, FloatField, Q, Value, When
 from django.utils.encoding import force_str
 from django.utils.translation import gettext_lazy as _
 from pgvector.django import MaxInnerProduct
@@ -11,19 +13,117 @@ class QueryFilter(BaseFilterBackend):
     query_param = "query"
     query_title = _("Query")
     query_description = _("A query term to search semantically.")
+    query_mode_param = "query_mode"
+    query_mode_description = _(
+        "'semantic' (default) orders all results by relevance. "
+        "'hybrid' first narrows the results to those matching any of the query words. "
+        "'fusion' combines the full text and the semantic rankings, "
+        "where the endpoint supports full text search."
+    )
+    query_modes = ["semantic", "hybrid", "fusion"]
+    min_term_length = 3
+    # Reciprocal rank fusion: score = sum(1 / (rrf_k + rank)) over the rankings
+    rrf_k = 60
+    rrf_candidates = 100
 
     def get_query_field(self, view, request):
         return getattr(view, "query_field", None)
 
+    def get_query_search_vectors(self, view):
+        """
+        The SearchVector expressions to rank the full text matches with,
+        each of them should be backed by a GIN index.
+        """
+        return getattr(view, "query_search_vectors", [])
+
     def get_query_string(self, request):
-        return request.query_params.get(self.query_param, "")
+        # Collapse the whitespace so that the same query shares the cached
+        # embedding, e.g. when fetching the following pages. The case is kept,
+        # it changes the embedding of acronyms and product names.
+        query_string = request.query_params.get(self.query_param, "")
+        return " ".join(query_string.split())
+
+    def get_query_vector(self, query_string):
+        # The embedder caches the vectors in process and in the database.
+        return embedder.embed_query(query_string)
+
+    def filter_lexically(self, queryset, view, query_string):
+        """
+        Narrow the queryset to the rows matching any of the query words
+        in the search_fields of the view, if there is any match.
+        """
+        search_fields = getattr(view, "search_fields", None)
+        terms = [
+            term
+            for term in query_string.replace(",", " ").split()
+            if len(term) >= self.min_term_length
+        ]
+        if not search_fields or not terms:
+            return queryset
+
+        condition = Q()
+        for term in terms:
+            for search_field in search_fields:
+                condition |= Q(**{f"{search_field}__icontains": term})
+        # Use subquery to avoid the duplicates from the multi-valued relations
+        narrowed_queryset = queryset.filter(
+            pk__in=queryset.filter(condition).values("pk")
+        )
+        return narrowed_queryset if narrowed_queryset.exists() else queryset
+
+    def fuse_rankings(self, queryset, view, query_field, query_string):
+        """
+        Rank the candidates from the vector index and from each full text index
+        with reciprocal rank fusion, annotated as `relevance`.
+        """
+        query_vector = self.get_query_vector(query_string)
+        rankings = [
+            queryset.order_by(MaxInnerProduct(query_field, query_vector)).values_list(
+                "pk", flat=True
+            )[: self.rrf_candidates]
+        ]
+        search_query = SearchQuery(
+            query_string, config="simple", search_type="websearch"
+        )
+        for search_vector in self.get_query_search_vectors(view):
+            rankings.append(
+                queryset.annotate(
+                    search_document=search_vector,
+                    search_rank=SearchRank(search_vector, search_query),
+                )
+                .filter(search_document=search_query)
+                .order_by("-search_rank")
+                .values_list("pk", flat=True)[: self.rrf_candidates]
+            )
+
+        scores = {}
+        for ranking in rankings:
+            for rank, pk in enumerate(ranking, start=1):
+                scores[pk] = scores.get(pk, 0) + 1 / (self.rrf_k + rank)
+        if not scores:
+            return queryset.none()
+
+        relevance = Case(
+            *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+            output_field=FloatField(),
+        )
+        return (
+            queryset.filter(pk__in=scores.keys())
+            .annotate(relevance=relevance)
+            .order_by("-relevance", "pk")
+        )
 
     def filter_queryset(self, request, queryset, view):
         query_field = self.get_query_field(view, request)
         query_string = self.get_query_string(request)
         if not query_field or not query_string:
             return queryset
-        query_vector = embedder.embed_query(query_string)
+        query_mode = request.query_params.get(self.query_mode_param)
+        if query_mode == "fusion" and self.get_query_search_vectors(view):
+            return self.fuse_rankings(queryset, view, query_field, query_string)
+        if query_mode == "hybrid":
+            queryset = self.filter_lexically(queryset, view, query_string)
+        query_vector = self.get_query_vector(query_string)
         return queryset.order_by(MaxInnerProduct(query_field, query_vector))
 
     def get_schema_fields(self, view):
@@ -45,7 +145,16 @@ class QueryFilter(BaseFilterBackend):
                     title=force_str(self.query_title),
                     description=force_str(self.query_description),
                 ),
-            )
+            ),
+            coreapi.Field(
+                name=self.query_mode_param,
+                required=False,
+                location="query",
+                schema=coreschema.Enum(
+                    self.query_modes,
+                    description=force_str(self.query_mode_description),
+                ),
+            ),
         ]
 
     def get_schema_operation_parameters(self, view):
@@ -62,4 +171,14 @@ class QueryFilter(BaseFilterBackend):
                     "type": "string",
                 },
             },
+            {
+                "name": self.query_mode_param,
+                "required": False,
+                "in": "query",
+                "description": force_str(self.query_mode_description),
+                "schema": {
+                    "type": "string",
+                    "enum": self.query_modes,
+                },
+            },
         ]
@@ -52,7 +52,7 @@ def tags_in_scope(request):
 
     project_id = kwargs.get("project_id")
     if project_id is not None:
-        return Tag.objects.filter(takeaways__note__project=project_id)
+        return Tag.objects.filter(project=project_id)
 
     report_id = kwargs.get("report_id")
     if report_id is not None:
@@ -0,0 +1,17 @@
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Run a benchmark from api/benchmarks. The database changes are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Benchmark module name, e.g. highlight_sync.")
+
+    def handle(self, *args, **options):
+        benchmark = import_module(f"api.benchmarks.{options['name']}")
+        with transaction.atomic():
+            benchmark.run(self.stdout)
+            transaction.set_rollback(True)
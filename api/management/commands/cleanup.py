@@ -1,12 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Count
 
-from api.models.keyword import Keyword
-from api.models.organization import Organization
 from api.models.project import Project
-from api.models.tag import Tag
 from api.models.takeaway_type import TakeawayType
 from api.models.workspace import Workspace
+from api.utils import orphans
 
 
 class Command(BaseCommand):
@@ -31,17 +29,13 @@ class Command(BaseCommand):
         ).delete()
 
     def cleanup_keywords(self):
-        Keyword.objects.annotate(note_count=Count("notes")).filter(
-            note_count=0
-        ).delete()
+        orphans.delete_orphan_keywords()
 
     def cleanup_organizations(self):
-        Organization.objects.annotate(note_count=Count("notes")).filter(
-            note_count=0
-        ).delete()
+        orphans.delete_orphan_organizations()
 
     def cleanup_tags(self):
-        Tag.objects.filter(takeaway_count=0).delete()
+        orphans.delete_orphan_tags()
 
     def cleanup_takeaway_types(self):
         TakeawayType.objects.annotate(takeaway_count=Count("takeaways")).filter(
@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from playwright.sync_api import sync_playwright
+
+from api.utils.lexical import LexicalProcessor
+from api.utils.markdown import MarkdownProcessor
+
+fixture_dir = Path("api/tests/files/lexical")
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the lexical json of the markdown fixtures as exported by the editor "
+        "of the frontend, the reference for the in-process converter."
+    )
+
+    def handle(self, *args, **options):
+        # The way markdown was converted before HtmlProcessor: the html is imported
+        # by the editor in a browser, so the converter is not involved.
+        with sync_playwright() as playwright:
+            browser = playwright.chromium.launch()
+            page = browser.new_page()
+            page.goto(f"{settings.FRONTEND_URL}/lexical/html")
+            for markdown_path in sorted(fixture_dir.glob("*.md")):
+                page.locator("#clear-text").click()
+                html = MarkdownProcessor(markdown_path.read_text()).to_html()
+                page.locator("#html-input").fill(html)
+                output_str = page.locator("#lexical-json-output").text_content()
+                lexical_json = json.loads(output_str)
+
+                # Same post-processing as the browser conversion did
+                lexical = LexicalProcessor(lexical_json["root"])
+                lexical.dict["children"] = lexical.dict["children"][1]["children"]
+                for paragraph in lexical.find_all("paragraph"):
+                    paragraph.dict["format"] = "justify"
+
+                json_path = markdown_path.with_suffix(".json")
+                json_path.write_text(json.dumps(lexical_json, indent=2) + "\n")
+                self.stdout.write(f"Wrote {json_path}")
+            browser.close()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.models.tag import Tag
+
+
+class Command(BaseCommand):
+    help = "Recount the takeaways of the tags, in case the maintained counts drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", help="Only recount the tags of this project.")
+
+    def handle(self, *args, **options):
+        tags = Tag.objects.all()
+        if options["project"]:
+            tags = tags.filter(project=options["project"])
+        count = tags.count_takeaways()
+        self.stdout.write(f"Recounted the takeaways of {count} tags.")
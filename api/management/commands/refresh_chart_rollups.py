@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.models.project import Project
+from api.utils.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Roll up the takeaways of the projects again, in case the rollups drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", help="Only roll up this project.")
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options["project"]:
+            projects = projects.filter(id=options["project"])
+        project_ids = list(projects.values_list("id", flat=True))
+        refresh_rollups({project_id: None for project_id in project_ids})
+        self.stdout.write(f"Rolled up the takeaways of {len(project_ids)} projects.")
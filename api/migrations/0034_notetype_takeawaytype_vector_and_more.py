@@ -5,12 +5,15 @@ import numpy as np
 import pgvector.django
 import shortuuid.django_fields
 from django.db import migrations, models
+from langchain_openai import OpenAIEmbeddings
 from pgvector.django import MaxInnerProduct
 
-from api.ai.embedder import embedder
 from api.models.note_type import default_note_types
 from api.models.takeaway_type import default_takeaway_types
 
+# Frozen copy of the embedder of the time, the embedding cache table doesn't exist yet
+embedder = OpenAIEmbeddings(model="text-embedding-3-small")
+
 
 def add_default_note_types_for_each_project(apps, schema_editor):
     Project = apps.get_model("api", "Project")
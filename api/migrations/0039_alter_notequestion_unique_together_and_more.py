@@ -2,8 +2,10 @@
 import pgvector.django
 from django.db import migrations, models
 from django.http import QueryDict
+from langchain_openai import OpenAIEmbeddings
 
-from api.ai.embedder import embedder
+# Frozen copy of the embedder of the time, the embedding cache table doesn't exist yet
+embedder = OpenAIEmbeddings(model="text-embedding-3-small")
 
 default_takeaway_types = [
     {
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.3 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0059_notetemplate_notetemplatetype'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponse',
+            fields=[
+                ('key', models.CharField(help_text='SHA-256 of the llm parameters and the rendered prompt.', max_length=64, primary_key=True, serialize=False)),
+                ('generations', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('accessed_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
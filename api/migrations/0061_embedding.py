@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 10:03
+
+from django.db import migrations, models
+import pgvector.django
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0060_llmresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Embedding',
+            fields=[
+                ('key', models.CharField(help_text='SHA-256 of the embedding model and the text.', max_length=64, primary_key=True, serialize=False)),
+                ('vector', pgvector.django.VectorField(dimensions=1536)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('accessed_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 11:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0061_embedding'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='takeaway',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('title', 'description', config='simple'), name='takeaway-search-index'),
+        ),
+        migrations.AddIndex(
+            model_name='highlight',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('quote', config='simple'), name='highlight-search-index'),
+        ),
+    ]
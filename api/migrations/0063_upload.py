@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-18 12:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import shortuuid.django_fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0062_takeaway_search_index_highlight_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', shortuuid.django_fields.ShortUUIDField(alphabet=None, editable=False, length=12, max_length=12, prefix='', primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Name of the file in storage.', max_length=255)),
+                ('size', models.BigIntegerField(help_text='File size measured in bytes.')),
+                ('offset', models.BigIntegerField(default=0, help_text='Bytes received so far.')),
+                ('s3_upload_id', models.CharField(max_length=1024, null=True)),
+                ('parts', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='api.project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:52
+
+import api.models.workspace_quota
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def create_workspace_quotas(apps, schema_editor):
+    Workspace = apps.get_model("api", "Workspace")
+    WorkspaceQuota = apps.get_model("api", "WorkspaceQuota")
+    Note = apps.get_model("api", "Note")
+    Highlight = apps.get_model("api", "Highlight")
+    TranscriptionUsage = apps.get_model("api", "TranscriptionUsage")
+    TokenUsage = apps.get_model("api", "TokenUsage")
+
+    month = timezone.now().date().replace(day=1)
+    quotas = []
+    for workspace in Workspace.objects.all():
+        usage_seconds = TranscriptionUsage.objects.filter(
+            workspace=workspace, created_at__date__gte=month
+        ).aggregate(value=Coalesce(Sum("value"), 0))["value"]
+        usage_tokens = TokenUsage.objects.filter(
+            workspace=workspace, created_at__date__gte=month
+        ).aggregate(value=Coalesce(Sum("value"), 0))["value"]
+        notes_size = Note.objects.filter(workspace=workspace).aggregate(
+            value=Coalesce(Sum("file_size"), 0)
+        )["value"]
+        highlights_size = Highlight.objects.filter(
+            note__workspace=workspace
+        ).aggregate(
+            value=Coalesce(Sum(Coalesce(F("clip_size"), 0) + Coalesce(F("thumbnail_size"), 0)), 0)
+        )["value"]
+        quotas.append(
+            WorkspaceQuota(
+                workspace=workspace,
+                usage_month=month,
+                usage_seconds=usage_seconds,
+                usage_tokens=usage_tokens,
+                file_size=notes_size + highlights_size,
+            )
+        )
+    WorkspaceQuota.objects.bulk_create(quotas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0063_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkspaceQuota',
+            fields=[
+                ('workspace', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quota', serialize=False, to='api.workspace')),
+                ('features', models.JSONField(null=True)),
+                ('features_expire_at', models.DateTimeField(null=True)),
+                ('usage_month', models.DateField(default=api.models.workspace_quota.get_start_of_month)),
+                ('usage_seconds', models.BigIntegerField(default=0)),
+                ('usage_tokens', models.BigIntegerField(default=0)),
+                ('file_size', models.BigIntegerField(default=0, help_text='Total size of the files measured in bytes.')),
+            ],
+        ),
+        migrations.RunPython(
+            code=create_workspace_quotas,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.3 on 2026-10-18 15:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_takeaways(apps, schema_editor):
+    Tag = apps.get_model("api", "Tag")
+    TakeawayTag = apps.get_model("api", "Takeaway").tags.through
+    takeaway_counts = (
+        TakeawayTag.objects.filter(tag=OuterRef("pk"))
+        .values("tag")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Tag.objects.update(takeaway_count=Coalesce(Subquery(takeaway_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0064_workspacequota'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='takeaway_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            code=count_takeaways,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['project', '-takeaway_count', 'name'], name='tag-project-count-index'),
+        ),
+    ]
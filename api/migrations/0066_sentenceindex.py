@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0065_tag_takeaway_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentenceIndex',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sentence_index', serialize=False, to='api.note')),
+                ('key', models.CharField(help_text='SHA-256 of the note text the sentences are split from.', max_length=64)),
+                ('spans', models.JSONField(help_text='[start, end) of each sentence in the text.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+from django.db.models.functions import TruncDay
+import django.db.models.deletion
+
+
+def roll_up_takeaways(apps, schema_editor):
+    Takeaway = apps.get_model("api", "Takeaway")
+    TakeawayRollup = apps.get_model("api", "TakeawayRollup")
+    takeaways = Takeaway.objects.annotate(
+        project_id=F("note__project"),
+        day=TruncDay("created_at"),
+        takeaway_type_id=F("type"),
+        note_type_id=F("note__type"),
+        note_sentiment=F("note__sentiment"),
+        creator_id=F("created_by"),
+    )
+    fields = [
+        "project_id",
+        "day",
+        "takeaway_type_id",
+        "priority",
+        "note_type_id",
+        "note_sentiment",
+        "creator_id",
+    ]
+    rows = takeaways.values(*fields).annotate(count=Count("id"))
+    TakeawayRollup.objects.bulk_create(
+        (TakeawayRollup(by_tag=False, **row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+    tag_rows = (
+        takeaways.annotate(takeaway_tag_id=F("tags"))
+        .values(*fields, "takeaway_tag_id")
+        .annotate(count=Count("id"))
+    )
+    TakeawayRollup.objects.bulk_create(
+        (TakeawayRollup(by_tag=True, **row) for row in tag_rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0066_sentenceindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented when the data behind the charts changes.'),
+        ),
+        migrations.CreateModel(
+            name='TakeawayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateTimeField(help_text='Creation time truncated to the day.')),
+                ('by_tag', models.BooleanField()),
+                ('priority', models.CharField(choices=[('Low', 'Low'), ('Med', 'Med'), ('High', 'High')], max_length=4, null=True)),
+                ('note_sentiment', models.CharField(choices=[('Positive', 'Positive'), ('Neutral', 'Neutral'), ('Negative', 'Negative')], max_length=8, null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('note_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.notetype')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='takeaway_rollups', to='api.project')),
+                ('takeaway_tag', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.tag')),
+                ('takeaway_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.takeawaytype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'by_tag', 'day'], name='takeaway-rollup-index')],
+            },
+        ),
+        migrations.RunPython(
+            code=roll_up_takeaways,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0067_takeawayrollup_project_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummaryRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(help_text='SHA-256 of the notes and takeaways the project was summarized from.', max_length=64)),
+                ('status', models.CharField(choices=[('succeeded', 'Succeeded'), ('skipped', 'Skipped'), ('failed', 'Failed')], max_length=9)),
+                ('duration', models.FloatField(help_text='Duration of the run in seconds.')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summary_runs', to='api.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'status', '-created_at'], name='project-summary-run-index')],
+            },
+        ),
+    ]
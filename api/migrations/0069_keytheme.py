@@ -0,0 +1,27 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import pgvector.django
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0068_projectsummaryrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyTheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.TextField()),
+                ('centroid', pgvector.django.VectorField(dimensions=1536)),
+                ('radius', models.FloatField(help_text='Largest cosine distance of a clustered takeaway to the centroid.')),
+                ('clustered_at', models.DateTimeField(help_text='When the takeaways of the project were last fully clustered.')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='key_theme_clusters', to='api.project')),
+                ('takeaways', models.ManyToManyField(related_name='+', to='api.takeaway')),
+            ],
+        ),
+    ]
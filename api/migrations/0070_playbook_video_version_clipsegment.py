@@ -0,0 +1,33 @@
+# Generated by Django 4.2.3 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0069_keytheme'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playbook',
+            name='rendered_video_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='The video version of the stored video.'),
+        ),
+        migrations.AddField(
+            model_name='playbook',
+            name='video_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Incremented when the takeaways of the playbook change.'),
+        ),
+        migrations.CreateModel(
+            name='ClipSegment',
+            fields=[
+                ('highlight', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='segment', serialize=False, to='api.highlight')),
+                ('key', models.CharField(help_text='Name of the clip the segment is encoded from.', max_length=255)),
+                ('file', models.FileField(max_length=255, upload_to='playbook/segments/')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,9 @@
 from api.models.asset import Asset
 from api.models.block import Block
+from api.models.cache.clip_segment import ClipSegment
+from api.models.cache.embedding import Embedding
+from api.models.cache.llm_response import LLMResponse
+from api.models.cache.sentence_index import SentenceIndex
 from api.models.contact import Contact
 from api.models.feature import Feature
 from api.models.highlight import Highlight
@@ -16,6 +20,7 @@ from api.models.integrations.slack.slack_message_buffer import SlackMessageBuffe
 from api.models.integrations.slack.slack_oauth_state import SlackOAuthState
 from api.models.integrations.slack.slack_user import SlackUser
 from api.models.invitation import Invitation
+from api.models.key_theme import KeyTheme
 from api.models.keyword import Keyword
 from api.models.message import Message
 from api.models.note import Note
@@ -28,19 +33,23 @@ from api.models.playbook import Playbook
 from api.models.playbook_takeaway import PlaybookTakeaway
 from api.models.product_feature import ProductFeature
 from api.models.project import Project
+from api.models.project_summary_run import ProjectSummaryRun
 from api.models.property import Property
 from api.models.stripe_price import StripePrice
 from api.models.stripe_product import StripeProduct
 from api.models.stripe_subscription import StripeSubscription
 from api.models.tag import Tag
 from api.models.takeaway import Takeaway
+from api.models.takeaway_rollup import TakeawayRollup
 from api.models.takeaway_type import TakeawayType
 from api.models.theme import Theme
+from api.models.upload import Upload
 from api.models.usage.token import TokenUsage
 from api.models.usage.transciption import TranscriptionUsage
 from api.models.user import User
 from api.models.user_saved_takeaway import UserSavedTakeaway
 from api.models.workspace import Workspace
+from api.models.workspace_quota import WorkspaceQuota
 from api.models.workspace_user import WorkspaceUser
 from api.models.playbook import Playbook
 from api.models.playbook_takeaway import PlaybookTakeaway
@@ -51,18 +60,27 @@ from api.models.note_template_type import NoteTemplateType
 
 __all__ = [
     "Takeaway",
+    "TakeawayRollup",
     "Highlight",
     "Insight",
     "Note",
     "Organization",
     "Project",
+    "ProjectSummaryRun",
     "Tag",
     "User",
     "Keyword",
+    "KeyTheme",
     "Invitation",
     "Workspace",
     "TranscriptionUsage",
     "TokenUsage",
+    "LLMResponse",
+    "Embedding",
+    "SentenceIndex",
+    "ClipSegment",
+    "Upload",
+    "WorkspaceQuota",
     "Asset",
     "Block",
     "UserSavedTakeaway",
@@ -0,0 +1,11 @@
+from .clip_segment import ClipSegment
+from .embedding import Embedding
+from .llm_response import LLMResponse
+from .sentence_index import SentenceIndex
+
+__all__ = [
+    "ClipSegment",
+    "Embedding",
+    "LLMResponse",
+    "SentenceIndex",
+]
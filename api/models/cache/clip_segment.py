@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class ClipSegment(models.Model):
+    """The clip of a highlight normalized for the playbook videos."""
+
+    highlight = models.OneToOneField(
+        "api.Highlight",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="segment",
+    )
+    key = models.CharField(
+        max_length=255, help_text="Name of the clip the segment is encoded from."
+    )
+    file = models.FileField(upload_to="playbook/segments/", max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
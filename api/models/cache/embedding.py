@@ -0,0 +1,13 @@
+from django.db import models
+from pgvector.django import VectorField
+
+
+class Embedding(models.Model):
+    key = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text="SHA-256 of the embedding model and the text.",
+    )
+    vector = VectorField(dimensions=1536)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    accessed_at = models.DateTimeField(auto_now=True, db_index=True)
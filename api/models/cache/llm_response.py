@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class LLMResponse(models.Model):
+    key = models.CharField(
+        max_length=64,
+        primary_key=True,
+        help_text="SHA-256 of the llm parameters and the rendered prompt.",
+    )
+    generations = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    accessed_at = models.DateTimeField(auto_now=True, db_index=True)
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class SentenceIndex(models.Model):
+    note = models.OneToOneField(
+        "api.Note",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="sentence_index",
+    )
+    key = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the note text the sentences are split from.",
+    )
+    spans = models.JSONField(help_text="[start, end) of each sentence in the text.")
+    updated_at = models.DateTimeField(auto_now=True)
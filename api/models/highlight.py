@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from django.db.models import QuerySet
 
@@ -17,6 +19,15 @@ class Highlight(Takeaway):
         null=True, help_text="File size measured in bytes."
     )
 
+    class Meta:
+        indexes = [
+            # Full text search, queries must use the same expression to hit the index.
+            GinIndex(
+                SearchVector("quote", config="simple"),
+                name="highlight-search-index",
+            ),
+        ]
+
     @classmethod
     def bulk_create(cls, objs):
         queryset = QuerySet(cls)
@@ -0,0 +1,29 @@
+from django.db import models
+from pgvector.django import VectorField
+
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+
+
+class KeyTheme(models.Model):
+    """
+    A cluster of the recent takeaways of a project, persisted so that
+    the takeaways added later can be assigned to it without clustering again.
+    See api.ai.generators.project_clusterer.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="key_theme_clusters"
+    )
+    title = models.TextField()
+    centroid = VectorField(dimensions=1536)
+    radius = models.FloatField(
+        help_text="Largest cosine distance of a clustered takeaway to the centroid."
+    )
+    takeaways = models.ManyToManyField(Takeaway, related_name="+")
+    clustered_at = models.DateTimeField(
+        help_text="When the takeaways of the project were last fully clustered."
+    )
+
+    def __str__(self):
+        return self.title
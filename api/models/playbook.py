@@ -1,10 +1,23 @@
-from django.db import models
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import File
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from shortuuid.django_fields import ShortUUIDField
-from api.utils import media
-from api.models.user import User
+
+from api.ai import config
+from api.models.cache.clip_segment import ClipSegment
+from api.models.highlight import Highlight
 from api.models.note import Note
 from api.models.project import Project
 from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.utils import media
+
+video_render_delay = 5  # seconds, the changes made meanwhile are rendered together
 
 
 class Playbook(models.Model):
@@ -31,6 +44,14 @@ class Playbook(models.Model):
     thumbnail_size = models.PositiveIntegerField(
         null=True, help_text="Image size measured in bytes."
     )
+    video_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented when the takeaways of the playbook change.",
+    )
+    rendered_video_version = models.PositiveIntegerField(
+        default=0, editable=False, help_text="The video version of the stored video."
+    )
     notes = models.ManyToManyField(Note, related_name="playbooks")
     takeaways = models.ManyToManyField(
         Takeaway, related_name="playbooks", through="PlaybookTakeaway"
@@ -39,22 +60,136 @@ class Playbook(models.Model):
     def __str__(self):
         return self.title
 
-    def create_playbook_clip_and_thumbnail(self):
-        playbook_takeaways = self.playbook_takeaways.all().order_by("order")
-        files = [pt.takeaway.highlight.clip for pt in playbook_takeaways]
-        if files:
-            video = media.merge_media_files(files)
-            self.video = video
-            self.thumbnail = media.create_thumbnail(files[0], 0)
-            self.save()
-        else:
-            self.video = None
-            self.save()
+    def get_etag(self) -> str:
+        """Changes when the playbook is updated or a new video is rendered."""
+        updated_at = self.updated_at.timestamp()
+        return f'W/"{self.video_version}-{self.rendered_video_version}-{updated_at}"'
+
+    def schedule_video_render(self):
+        """
+        Render the video again in the background once the transaction is committed.
+        The task waits for video_render_delay and is dropped if the playbook
+        changed again meanwhile, a later task renders all the changes at once.
+        """
+        Playbook.objects.filter(id=self.id).update(video_version=F("video_version") + 1)
+        self.refresh_from_db(fields=["video_version"])
+        version = self.video_version
+
+        def render():
+            from api.tasks import render_playbook_video
+
+            render_playbook_video.apply_async(
+                (self.id, version), countdown=video_render_delay
+            )
+
+        transaction.on_commit(render)
+
+    def get_segments(self, highlights: list[Highlight], directory: str) -> list[str]:
+        """
+        Return the local paths of the normalized segments of the highlight clips.
+        The segments are cached, only the clips that are new or cut again
+        are encoded, in parallel.
+        """
+        segments = {
+            segment.highlight_id: segment
+            for segment in ClipSegment.objects.filter(highlight__in=highlights)
+        }
+        paths = []
+        missing = []
+        for i, highlight in enumerate(highlights):
+            segment_directory = os.path.join(directory, str(i))
+            os.mkdir(segment_directory)
+            segment = segments.get(highlight.id)
+            if segment is not None and segment.key == highlight.clip.name:
+                paths.append(media.get_local_path(segment.file, segment_directory))
+            else:
+                paths.append(os.path.join(segment_directory, "segment.mp4"))
+                missing.append((highlight, paths[-1]))
+
+        with ThreadPoolExecutor(max_workers=config.media_max_workers) as executor:
+            list(
+                executor.map(
+                    lambda item: media.normalize_media_file(item[0].clip, item[1]),
+                    missing,
+                )
+            )
+        for highlight, path in missing:
+            segment = segments.get(highlight.id)
+            if segment is not None:
+                segment.file.delete(save=False)
+            with open(path, "rb") as file:
+                ClipSegment.objects.update_or_create(
+                    highlight=highlight,
+                    defaults={
+                        "key": highlight.clip.name,
+                        "file": File(file, name=f"{highlight.id}.mp4"),
+                    },
+                )
+        return paths
+
+    def render_video(self, version: int):
+        """
+        Join the normalized clips of the takeaways into the video of the playbook,
+        stored only if the playbook wasn't changed again while rendering.
+        """
+        highlights = list(
+            Highlight.objects.filter(playbooktakeaway__playbook=self)
+            .exclude(clip="")
+            .exclude(clip__isnull=True)
+            .order_by("playbooktakeaway__order")
+        )
+        fields = {
+            "video": None,
+            "video_size": None,
+            "thumbnail": None,
+            "thumbnail_size": None,
+            "rendered_video_version": version,
+            "updated_at": timezone.now(),
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if highlights:
+                paths = self.get_segments(highlights, temp_dir)
+                output_path = os.path.join(temp_dir, "playbook.mp4")
+                media.concat_media_files(paths, output_path)
+                with open(output_path, "rb") as file:
+                    self.video.save("playbook.mp4", File(file), save=False)
+                self.thumbnail.save(
+                    "thumbnail.jpg", media.create_thumbnail(paths[0], 0), save=False
+                )
+                fields.update(
+                    video=self.video.name,
+                    video_size=self.video.size,
+                    thumbnail=self.thumbnail.name,
+                    thumbnail_size=self.thumbnail.size,
+                )
+
+        with transaction.atomic():
+            previous = (
+                Playbook.objects.select_for_update()
+                .filter(id=self.id, video_version=version)
+                .values("video", "thumbnail")
+                .first()
+            )
+            if previous is not None:
+                Playbook.objects.filter(id=self.id).update(**fields)
+        if previous is None:
+            # Outdated by a change meanwhile, the next render replaces it
+            if highlights:
+                self.video.delete(save=False)
+                self.thumbnail.delete(save=False)
+            return
+        # The files of the previous render aren't referenced anymore
+        for field, name in previous.items():
+            if name and name != fields[field]:
+                getattr(self, field).storage.delete(name)
 
     def update_playbook_takeaway_times(self):
-        playbook_takeaways = self.playbook_takeaways.all().order_by("order")
+        playbook_takeaways = list(
+            self.playbook_takeaways.select_related("takeaway__highlight").order_by(
+                "order"
+            )
+        )
         start_time = 0
-        updated_playbook_takeaways = []
 
         for pt in playbook_takeaways:
             highlight = pt.takeaway.highlight
@@ -63,5 +198,5 @@ class Playbook(models.Model):
                 pt.start = start_time
                 pt.end = start_time + duration
                 start_time = pt.end
-                updated_playbook_takeaways.append(pt)
-        playbook_takeaways.bulk_update(playbook_takeaways, ["start", "end"])
+        PlaybookTakeaway = self.playbook_takeaways.model
+        PlaybookTakeaway.objects.bulk_update(playbook_takeaways, ["start", "end"])
@@ -35,6 +35,11 @@ class Project(models.Model):
     key_themes = models.JSONField(default=list)
 
     objective = models.CharField(max_length=255, blank=True)
+    data_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented when the data behind the charts changes.",
+    )
 
     def __str__(self):
         return self.name
@@ -0,0 +1,32 @@
+from django.db import models
+
+from api.models.project import Project
+
+
+class ProjectSummaryRun(models.Model):
+    """A run of the weekly summary and key themes of a project."""
+
+    class Status(models.TextChoices):
+        SUCCEEDED = "succeeded"
+        SKIPPED = "skipped"
+        FAILED = "failed"
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="summary_runs"
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the notes and takeaways the project was summarized from.",
+    )
+    status = models.CharField(max_length=9, choices=Status.choices)
+    duration = models.FloatField(help_text="Duration of the run in seconds.")
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "status", "-created_at"],
+                name="project-summary-run-index",
+            ),
+        ]
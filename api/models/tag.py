@@ -1,31 +1,63 @@
+from collections import defaultdict
+
 from django.db import models
-from django.db.models import Count
-from django.db.models.query import QuerySet
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from shortuuid.django_fields import ShortUUIDField
 
 from api.models.project import Project
 
 
-class TagModelManager(models.Manager):
-    def get_queryset(self) -> QuerySet:
-        return (
-            super()
-            .get_queryset()
-            .annotate(takeaway_count=Count("takeaways", distinct=True))
+class TagQuerySet(models.QuerySet):
+    def add_takeaway_count(self, value: int):
+        return self.update(takeaway_count=F("takeaway_count") + value)
+
+    def add_takeaway_counts(self, counts: dict[str, int]):
+        """Add the counts by tag id, with one update per distinct value."""
+        tag_ids_by_value = defaultdict(list)
+        for tag_id, value in counts.items():
+            tag_ids_by_value[value].append(tag_id)
+        for value, tag_ids in tag_ids_by_value.items():
+            self.filter(id__in=tag_ids).add_takeaway_count(value)
+
+    def count_takeaways(self):
+        """Recount the takeaways of the tags, to reconcile the maintained counters."""
+        takeaway_counts = (
+            self.model.takeaways.through.objects.filter(tag=OuterRef("pk"))
+            .values("tag")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return self.update(
+            takeaway_count=Coalesce(Subquery(takeaway_counts), 0),
         )
 
 
 class Tag(models.Model):
+    """
+    The takeaway count is maintained as the takeaways are tagged and untagged,
+    see api.signals, and it is only written through the queryset.
+    The reconcile_tag_counts command recounts it from the takeaways.
+    """
+
     id = ShortUUIDField(length=12, max_length=12, primary_key=True, editable=False)
     name = models.CharField(max_length=50)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="tags")
+    takeaway_count = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    objects = TagModelManager()
+    objects = TagQuerySet.as_manager()
 
     class Meta:
         unique_together = [["name", "project"]]
+        indexes = [
+            # The tag list of a project is ordered by the takeaway count
+            models.Index(
+                fields=["project", "-takeaway_count", "name"],
+                name="tag-project-count-index",
+            ),
+        ]
 
     def __str__(self):
         return self.name
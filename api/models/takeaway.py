@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from pgvector.django import HnswIndex, VectorField
 from shortuuid.django_fields import ShortUUIDField
@@ -43,7 +45,12 @@ class Takeaway(models.Model):
                 name="takeaway-vector-index",
                 fields=["vector"],
                 opclasses=["vector_ip_ops"],  # Use the inner product operator
-            )
+            ),
+            # Full text search, queries must use the same expression to hit the index.
+            GinIndex(
+                SearchVector("title", "description", config="simple"),
+                name="takeaway-search-index",
+            ),
         ]
 
     def __str__(self):
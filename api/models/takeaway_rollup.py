@@ -0,0 +1,48 @@
+from django.db import models
+
+from api.models.note import Note
+from api.models.note_type import NoteType
+from api.models.project import Project
+from api.models.tag import Tag
+from api.models.takeaway import Takeaway
+from api.models.takeaway_type import TakeawayType
+from api.models.user import User
+
+
+class TakeawayRollup(models.Model):
+    """
+    The number of takeaways of a project by day and by the common chart dimensions,
+    refreshed by api.utils.rollups.
+    The rows split by tag count a takeaway once for each of its tags,
+    or once with a null tag when it has none.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="takeaway_rollups"
+    )
+    day = models.DateTimeField(help_text="Creation time truncated to the day.")
+    by_tag = models.BooleanField()
+    takeaway_type = models.ForeignKey(
+        TakeawayType, on_delete=models.SET_NULL, related_name="+", null=True
+    )
+    takeaway_tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="+", null=True
+    )
+    priority = models.CharField(
+        max_length=4, choices=Takeaway.Priority.choices, null=True
+    )
+    note_type = models.ForeignKey(
+        NoteType, on_delete=models.SET_NULL, related_name="+", null=True
+    )
+    note_sentiment = models.CharField(
+        max_length=8, choices=Note.Sentiment.choices, null=True
+    )
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "by_tag", "day"], name="takeaway-rollup-index"
+            ),
+        ]
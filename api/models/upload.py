@@ -0,0 +1,106 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from shortuuid.django_fields import ShortUUIDField
+
+from api.models.note import Note
+from api.models.project import Project
+from api.models.user import User
+
+
+class Upload(models.Model):
+    """
+    A resumable chunked upload of a note file.
+
+    The parts are appended to the final file in the storage as they arrive:
+    to the file on disk locally, or to an S3 multipart upload.
+    So neither the web worker nor the note creation ever holds the whole file.
+    """
+
+    # S3 requires every part but the last to be at least 5 MB
+    min_part_size = 5 * 1024 * 1024
+    max_part_size = 64 * 1024 * 1024
+    # Uploads not attached to a note by then are deleted with their parts
+    max_age = timedelta(hours=24)
+
+    id = ShortUUIDField(length=12, max_length=12, primary_key=True, editable=False)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="uploads"
+    )
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="uploads"
+    )
+    name = models.CharField(max_length=255, help_text="Name of the file in storage.")
+    size = models.BigIntegerField(help_text="File size measured in bytes.")
+    offset = models.BigIntegerField(default=0, help_text="Bytes received so far.")
+    s3_upload_id = models.CharField(max_length=1024, null=True)
+    parts = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    @property
+    def s3_client(self):
+        return default_storage.connection.meta.client
+
+    @property
+    def s3_params(self):
+        return {
+            "Bucket": default_storage.bucket_name,
+            "Key": default_storage._normalize_name(self.name),
+        }
+
+    def start(self, file_name):
+        # Reserve the final name of the note file so that no copy is needed at the end
+        field = Note._meta.get_field("file")
+        name = field.generate_filename(None, file_name)
+        self.name = default_storage.get_available_name(name, field.max_length)
+        if settings.USE_S3:
+            response = self.s3_client.create_multipart_upload(
+                **self.s3_params,
+                **default_storage._get_write_parameters(self.name),
+            )
+            self.s3_upload_id = response["UploadId"]
+        else:
+            path = default_storage.path(self.name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "xb").close()
+
+    def append(self, chunk):
+        """Append a chunk, an uploaded file streamed to disk by the parser."""
+        if settings.USE_S3:
+            part_number = len(self.parts) + 1
+            chunk.seek(0)
+            response = self.s3_client.upload_part(
+                **self.s3_params,
+                UploadId=self.s3_upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+            )
+            self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        else:
+            with open(default_storage.path(self.name), "ab") as file:
+                for data in chunk.chunks():
+                    file.write(data)
+        self.offset += chunk.size
+
+        if self.is_complete and settings.USE_S3:
+            self.s3_client.complete_multipart_upload(
+                **self.s3_params,
+                UploadId=self.s3_upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        self.save()
+
+    def abort(self):
+        if settings.USE_S3 and not self.is_complete:
+            self.s3_client.abort_multipart_upload(
+                **self.s3_params, UploadId=self.s3_upload_id
+            )
+        else:
+            default_storage.delete(self.name)
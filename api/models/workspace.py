@@ -1,18 +1,11 @@
 from django.db import models
-from django.apps import apps
-from django.utils import timezone
 from django.utils.text import slugify
-from django.db.models import Sum, F, Value
-from django.db.models.functions import Coalesce
 from shortuuid.django_fields import ShortUUIDField
 
 from api.stripe import stripe
 from api.models.user import User
-from api.models.feature import Feature
 from api.models.stripe_price import StripePrice
 from api.models.workspace_user import WorkspaceUser
-from api.models.product_feature import ProductFeature
-from api.models.stripe_subscription import StripeSubscription
 
 
 class Workspace(models.Model):
@@ -52,43 +45,16 @@ class Workspace(models.Model):
     )
 
     @property
-    def usage_seconds(self):
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        return (
-            self.transcription_usages.filter(created_at__gt=start_of_month)
-            .aggregate(value=Coalesce(Sum("value"), 0))
-            .get("value")
-        )
+    def usage_seconds(self) -> int:
+        return self.quota.get_monthly_usage(self.quota.usage_seconds)
 
     @property
     def usage_tokens(self) -> int:
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        return (
-            self.token_usages.filter(created_at__gt=start_of_month)
-            .aggregate(value=Coalesce(Sum("value"), 0))
-            .get("value")
-        )
+        return self.quota.get_monthly_usage(self.quota.usage_tokens)
 
     @property
     def total_file_size(self) -> int:
-        Highlight = apps.get_model("api", "Highlight")
-        highlights_total_size = (
-            Highlight.objects.filter(note__workspace=self)
-            .aggregate(
-                total_size=Coalesce(Sum(F("clip_size") + F("thumbnail_size")), Value(0))
-            )
-            .get("total_size")
-        )
-
-        notes_total_size = self.notes.aggregate(
-            value=Coalesce(Sum("file_size"), 0)
-        ).get("value")
-
-        return highlights_total_size + notes_total_size
+        return self.quota.file_size
 
     def __str__(self):
         return f"{self.id} - {self.name}"
@@ -99,17 +65,7 @@ class Workspace(models.Model):
         super().save(*args, **kwargs)
 
     def get_feature_value(self, feature_code):
-        feature = Feature.objects.get(code=feature_code)
-        product_feature = ProductFeature.objects.filter(
-            product__subscriptions__workspace=self,
-            product__subscriptions__status__in=[
-                StripeSubscription.Status.ACTIVE,
-                StripeSubscription.Status.TRIALING,
-            ],
-            product__subscriptions__end_at__gt=timezone.now(),
-            feature=feature,
-        ).first()
-        return product_feature.value if product_feature else feature.default
+        return self.quota.get_features()[feature_code]
 
     def get_product_price_id(self):
         price = StripePrice.objects.filter(product__usage_type=self.usage_type).first()
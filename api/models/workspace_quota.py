@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.db import models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models.feature import Feature
+from api.models.product_feature import ProductFeature
+from api.models.stripe_subscription import StripeSubscription
+from api.models.workspace import Workspace
+
+
+def get_start_of_month():
+    return timezone.now().date().replace(day=1)
+
+
+class WorkspaceQuotaQuerySet(models.QuerySet):
+    def add_usage(self, seconds=0, tokens=0, file_size=0):
+        """
+        Increment the counters in a single update.
+        The monthly usages restart from zero in a new month.
+        """
+        month = get_start_of_month()
+        return self.update(
+            usage_seconds=Case(
+                When(usage_month=month, then=F("usage_seconds") + seconds),
+                default=Value(seconds),
+            ),
+            usage_tokens=Case(
+                When(usage_month=month, then=F("usage_tokens") + tokens),
+                default=Value(tokens),
+            ),
+            usage_month=month,
+            file_size=F("file_size") + file_size,
+        )
+
+    def invalidate_features(self):
+        return self.update(features=None)
+
+
+class WorkspaceQuota(models.Model):
+    """
+    The feature entitlements and the usage counters of a workspace.
+
+    The features are cached until the subscription of the workspace changes
+    or its period ends. The counters are maintained as the usages and files
+    are created and deleted instead of summing all the rows of the workspace.
+    This model is only written through its queryset so that the counters are
+    never overwritten by a stale instance.
+    """
+
+    # Upper bound of the staleness in case an invalidation is missed
+    features_ttl = timedelta(hours=1)
+
+    workspace = models.OneToOneField(
+        Workspace, on_delete=models.CASCADE, primary_key=True, related_name="quota"
+    )
+    features = models.JSONField(null=True)
+    features_expire_at = models.DateTimeField(null=True)
+    usage_month = models.DateField(default=get_start_of_month)
+    usage_seconds = models.BigIntegerField(default=0)
+    usage_tokens = models.BigIntegerField(default=0)
+    file_size = models.BigIntegerField(
+        default=0, help_text="Total size of the files measured in bytes."
+    )
+
+    objects = WorkspaceQuotaQuerySet.as_manager()
+
+    def get_monthly_usage(self, value):
+        return value if self.usage_month == get_start_of_month() else 0
+
+    def get_features(self) -> dict[str, int]:
+        now = timezone.now()
+        if self.features is not None and self.features_expire_at > now:
+            return self.features
+
+        subscriptions = StripeSubscription.objects.filter(
+            workspace=self.workspace_id,
+            status__in=[
+                StripeSubscription.Status.ACTIVE,
+                StripeSubscription.Status.TRIALING,
+            ],
+            end_at__gt=now,
+        )
+        product_features = ProductFeature.objects.filter(
+            product__subscriptions__in=subscriptions,
+            feature=OuterRef("pk"),
+        )
+        self.features = dict(
+            Feature.objects.annotate(
+                value=Coalesce(
+                    Subquery(product_features.values("value")[:1]), F("default")
+                )
+            ).values_list("code", "value")
+        )
+        self.features_expire_at = min(
+            [now + self.features_ttl]
+            + list(subscriptions.values_list("end_at", flat=True))
+        )
+        WorkspaceQuota.objects.filter(workspace=self.workspace_id).update(
+            features=self.features, features_expire_at=self.features_expire_at
+        )
+        return self.features
@@ -1,8 +1,111 @@
+import secrets
+
 from django.apps import apps
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models
 from rest_framework import exceptions, permissions
 
 from api.models.workspace_user import WorkspaceUser
 
+membership_cache_ttl = 30  # seconds
+
+
+def get_generation_cache_key(user_id):
+    return f"permissions:generation:{user_id}"
+
+
+def get_membership_cache_key(user_id, generation, workspace_id, project_id):
+    return f"permissions:membership:{user_id}:{generation}:{workspace_id}:{project_id}"
+
+
+def get_generation(user_id):
+    """The generation of the cached memberships of the user, part of their keys."""
+    key = get_generation_cache_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, secrets.token_hex(8), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_memberships(user_ids):
+    # The memberships cached under the previous generation are never read again,
+    # even if a request that read it before writes one afterwards.
+    cache.set_many(
+        {
+            get_generation_cache_key(user_id): secrets.token_hex(8)
+            for user_id in user_ids
+        },
+        timeout=None,
+    )
+
+
+def is_cache_shared():
+    """
+    Whether the processes share the cache. Otherwise the invalidation only
+    reaches the current process, and the others would keep on granting access
+    to removed members until the cache expires.
+    """
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def query_membership(user, workspace, project):
+    Project = apps.get_model("api", "Project")
+    workspace_users = WorkspaceUser.objects.filter(
+        workspace_id=workspace.id, user_id=models.OuterRef("id")
+    )
+    if project:
+        members = Project.users.through.objects.filter(
+            project_id=project.id, user_id=models.OuterRef("id")
+        )
+    else:
+        members = workspace_users
+    return (
+        type(user)
+        .objects.filter(id=user.id)
+        .annotate(
+            is_member=models.Exists(members),
+            role=models.Subquery(workspace_users.values("role")[:1]),
+        )
+        .values_list("is_member", "role")
+        .get()
+    )
+
+
+def get_membership(user, workspace, project):
+    """
+    Return whether the user is a member of the project, or of the workspace
+    if there is no project, and the role of the user in the workspace.
+
+    With a shared cache, each membership is cached for a short time, the cache
+    is invalidated when the members of a workspace or project change.
+    """
+    if not is_cache_shared():
+        return query_membership(user, workspace, project)
+    key = get_membership_cache_key(
+        user.id,
+        get_generation(user.id),
+        workspace.id,
+        project.id if project else None,
+    )
+    membership = cache.get(key)
+    if membership is None:
+        membership = query_membership(user, workspace, project)
+        cache.set(key, membership, membership_cache_ttl)
+    return membership
+
+
+class Access:
+    """The workspace and project of the resource in the url, and the role of the user."""
+
+    def __init__(self, workspace, project, is_member: bool, role: str | None):
+        self.workspace = workspace
+        self.project = project
+        self.is_member = is_member
+        self.role = role
+
 
 def get_instance(queryset, instance_id):
     try:
@@ -187,23 +290,31 @@ class InProjectOrWorkspace(permissions.BasePermission):
     def is_authenticated(self, request):
         return bool(request.user and request.user.is_authenticated)
 
+    def get_access(self, request, view) -> Access | None:
+        """
+        Resolve the access of the user once per request,
+        it is shared by the permissions combined with | and &.
+        """
+        if not hasattr(request, "access"):
+            workspace, project = self.get_workspace_project(request, view)
+            if workspace is None:
+                request.access = None
+            else:
+                is_member, role = get_membership(request.user, workspace, project)
+                request.access = Access(workspace, project, is_member, role)
+        return request.access
+
     def is_in_project_or_workspace(self, request, view):
         if not self.is_authenticated(request):
             return False
 
-        workspace, project = self.get_workspace_project(request, view)
-        if project:
-            if project.users.contains(request.user):
-                return project.workspace
-            else:
-                raise exceptions.NotFound
-        elif workspace:
-            if workspace.members.contains(request.user):
-                return workspace
-            else:
-                raise exceptions.NotFound
-        else:
+        access = self.get_access(request, view)
+        if access is None:
             return False
+        elif access.is_member:
+            return access.workspace
+        else:
+            raise exceptions.NotFound
 
 
 class IsWorkspaceOwner(InProjectOrWorkspace):
@@ -212,7 +323,7 @@ class IsWorkspaceOwner(InProjectOrWorkspace):
         if not workspace:
             return False
 
-        if hasattr(workspace, "owned_by") and workspace.owned_by == request.user:
+        if workspace.owned_by_id == request.user.id:
             return True
         else:
             return False
@@ -224,8 +335,7 @@ class IsWorkspaceEditor(InProjectOrWorkspace):
         if not workspace:
             return False
 
-        role = request.user.get_role(workspace)
-        if role == WorkspaceUser.Role.EDITOR:
+        if request.access.role == WorkspaceUser.Role.EDITOR:
             return True
         else:
             return False
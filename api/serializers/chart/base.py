@@ -1,7 +1,13 @@
-from django.db.models import DateTimeField, F
-from django.db.models.functions import Trunc
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import DateTimeField, F, Sum
+from django.db.models.functions import Coalesce, Trunc
 from rest_framework import serializers
 
+chart_cache_ttl = 600  # seconds, the data version invalidates the charts before
+
 
 def get_order_by_fields(group_by_field_mapping):
     """
@@ -24,6 +30,13 @@ class QuerySerializer:
     aggregate_field_mapping = {}
     aggregate_function_mapping = {}
     group_by_time_fields = {}
+    # The mappings to the rollup fields, for the queries the rollups can answer
+    rollup_filter_key_mapping = {}
+    rollup_group_by_field_mapping = {}
+    rollup_aggregate_fields = set()
+    rollup_time_truncs = {"year", "quarter", "month", "week", "day"}
+    # Multi-valued fields, counted once per value in the rollups split by them
+    rollup_split_fields = set()
 
     def validate(self, data):
         order_by_keys = {item.lstrip("-") for item in data["order_by"]}
@@ -39,12 +52,118 @@ class QuerySerializer:
             )
         return data
 
+    def get_aggregate(self):
+        """Return the label and the expression of the aggregate."""
+        aggregate = self.data["aggregate"]
+        aggregate_field = self.aggregate_field_mapping[aggregate["field"]]
+        aggregate_function = self.aggregate_function_mapping[aggregate["function"]]
+        distinct = aggregate["distinct"]
+        aggregate_label = (
+            f"{aggregate.get('field')}_"
+            f"{'distinct_' if distinct else ''}"
+            f"{aggregate.get('function')}"
+        )
+        return aggregate_label, aggregate_function(aggregate_field, distinct=distinct)
+
     def query(self, queryset):
+        return self.build_query(
+            queryset,
+            self.filter_key_mapping,
+            self.group_by_field_mapping,
+            *self.get_aggregate(),
+        )
+
+    def get_rollup_split(self) -> bool | None:
+        """
+        Plan the query on the rollups.
+        Return whether the rollups split by the multi-valued fields answer the query,
+        or None when the rollups can't answer it.
+        """
+        data = self.data
+        if data["aggregate"]["field"] not in self.rollup_aggregate_fields:
+            return None
+        filter_keys = {key for key, value in data["filter"].items() if value}
+        group_by_keys = {item["field"] for item in data["group_by"]}
+        if filter_keys - self.rollup_filter_key_mapping.keys():
+            return None
+        if group_by_keys - self.rollup_group_by_field_mapping.keys():
+            return None
+        if any(
+            item["field"] in self.group_by_time_fields
+            and item["trunc"] not in self.rollup_time_truncs
+            for item in data["group_by"]
+        ):
+            return None
+        # The rows of a takeaway with several of the filtered values
+        # would be summed up, unless the query is grouped by the values.
+        if (filter_keys & self.rollup_split_fields) - group_by_keys:
+            return None
+        return bool((filter_keys | group_by_keys) & self.rollup_split_fields)
+
+    def query_rollups(self, rollups, by_tag):
+        aggregate_label, _ = self.get_aggregate()
+        return self.build_query(
+            rollups.filter(by_tag=by_tag),
+            self.rollup_filter_key_mapping,
+            self.rollup_group_by_field_mapping,
+            aggregate_label,
+            Coalesce(Sum("count"), 0),
+        )
+
+    def get_cache_key(self, project) -> str:
+        data = self.data
+        # The filters in any order with the same values give the same chart
+        filters = {
+            key: sorted(value) if isinstance(value, list) else value
+            for key, value in data["filter"].items()
+            if value
+        }
+        payload = json.dumps(
+            [
+                type(self).__name__,
+                project.id,
+                project.data_version,
+                {**data, "filter": filters},
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return f"chart:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def get_results(self, project, queryset, rollups=None):
+        """
+        Answer the query from the cache, else from the rollups when they can,
+        else from the queryset. The cache key contains the data version
+        of the project, which is incremented whenever the charts may change.
+        """
+        cache_key = self.get_cache_key(project)
+        results = cache.get(cache_key)
+        if results is not None:
+            return results
+
+        by_tag = None if rollups is None else self.get_rollup_split()
+        if by_tag is None:
+            results = self.query(queryset)
+        else:
+            results = self.query_rollups(rollups, by_tag)
+        if not isinstance(results, dict):
+            results = list(results)
+        cache.set(cache_key, results, chart_cache_ttl)
+        return results
+
+    def build_query(
+        self,
+        queryset,
+        filter_key_mapping,
+        group_by_field_mapping,
+        aggregate_label,
+        aggregate_expression,
+    ):
         data = self.data
 
         # Filters
         filters = {
-            f"{self.filter_key_mapping[key]}": value
+            f"{filter_key_mapping[key]}": value
             for key, value in data["filter"].items()
             if value
         }
@@ -57,7 +176,7 @@ class QuerySerializer:
         order_by_mapping = {}
         for group_by in data["group_by"]:
             label = group_by["field"]
-            field = self.group_by_field_mapping[label]
+            field = group_by_field_mapping[label]
             if label == field and label not in self.group_by_time_fields:
                 # If the label and the field are the same, we don't need to annotate
                 # except if it is time field, we need to truncate it
@@ -85,18 +204,7 @@ class QuerySerializer:
         queryset = queryset.values(*group_by_args)
 
         # Aggregate
-        aggregate = data["aggregate"]
-        aggregate_field = self.aggregate_field_mapping[aggregate["field"]]
-        aggregate_function = self.aggregate_function_mapping[aggregate["function"]]
-        distinct = aggregate["distinct"]
-        aggregate_label = (
-            f"{aggregate.get('field')}_"
-            f"{'distinct_' if distinct else ''}"
-            f"{aggregate.get('function')}"
-        )
-        aggregate_kwargs = {
-            aggregate_label: aggregate_function(aggregate_field, distinct=distinct)
-        }
+        aggregate_kwargs = {aggregate_label: aggregate_expression}
         if len(data["group_by"]) == 0:
             # If no group_by, we just count the total number of takeaways
             queryset = queryset.aggregate(**aggregate_kwargs)
@@ -78,6 +78,27 @@ class ChartTakeawayAggregateSerializer(serializers.Serializer):
     distinct = serializers.BooleanField(default=True)
 
 
+# Rollups, see api.models.takeaway_rollup
+rollup_filter_key_mapping = {
+    "created_by": "creator__username__in",
+    "tag": "takeaway_tag__name__in",
+    "priority": "priority__in",
+    "type": "takeaway_type__name__in",
+    "report_type": "note_type__in",
+}
+rollup_group_by_field_mapping = {
+    "type_name": "takeaway_type__name",
+    "tag": "takeaway_tag__name",
+    "created_by_username": "creator__username",
+    "created_by_first_name": "creator__first_name",
+    "created_by_last_name": "creator__last_name",
+    "priority": "priority",
+    "report_type": "note_type",
+    "report_sentiment": "note_sentiment",
+    "created_at": "day",
+}
+
+
 order_by_fields = get_order_by_fields(group_by_field_mapping)
 
 
@@ -96,3 +117,7 @@ class ChartTakeawaySerializer(QuerySerializer, serializers.Serializer):
     aggregate_field_mapping = aggregate_field_mapping
     aggregate_function_mapping = aggregate_function_mapping
     group_by_time_fields = group_by_time_fields
+    rollup_filter_key_mapping = rollup_filter_key_mapping
+    rollup_group_by_field_mapping = rollup_group_by_field_mapping
+    rollup_aggregate_fields = {"takeaway"}
+    rollup_split_fields = {"tag"}
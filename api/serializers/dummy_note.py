@@ -1,5 +1,6 @@
 import ast
 import json
+from collections import Counter
 
 import shortuuid
 from django.conf import settings
@@ -13,6 +14,7 @@ from api.models.takeaway import Takeaway
 from api.models.takeaway_type import TakeawayType
 from api.models.user import User
 from api.utils.lexical import LexicalProcessor
+from api.utils.rollups import rollup_collector
 
 
 class DummyNoteCreateSerializer(serializers.Serializer):
@@ -147,4 +149,8 @@ class DummyNoteCreateSerializer(serializers.Serializer):
         Takeaway.objects.bulk_create(takeaways_to_create)
         Highlight.bulk_create(highlights_to_create)
         Highlight.tags.through.objects.bulk_create(takeaway_tags_to_create)
+        Tag.objects.add_takeaway_counts(
+            Counter(takeaway_tag.tag_id for takeaway_tag in takeaway_tags_to_create)
+        )
+        rollup_collector.add(request.project.id)
         return {}
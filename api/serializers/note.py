@@ -1,10 +1,8 @@
 # note/serializers.py
 import logging
-import tempfile
 
 import requests
-from django.core.files.base import ContentFile
-from django.db.models import Count
+from django.db import transaction
 from rest_framework import exceptions, serializers
 
 from api.ai.embedder import embedder
@@ -15,6 +13,7 @@ from api.models.keyword import Keyword
 from api.models.note import Note
 from api.models.note_type import NoteType
 from api.models.organization import Organization
+from api.models.upload import Upload
 from api.serializers.note_type import NoteTypeSerializer
 from api.serializers.organization import OrganizationSerializer
 from api.serializers.tag import KeywordSerializer
@@ -44,6 +43,12 @@ class NoteSerializer(serializers.ModelSerializer):
         allow_null=True,
     )
     templates = NoteTemplateSerializer(many=True, read_only=True)
+    upload_id = serializers.PrimaryKeyRelatedField(
+        source="upload",
+        queryset=Upload.objects.none(),
+        write_only=True,
+        required=False,
+    )
 
     class Meta:
         model = Note
@@ -76,6 +81,7 @@ class NoteSerializer(serializers.ModelSerializer):
             "slack_team_id",
             "google_drive_file_id",
             "google_drive_file_timestamp",
+            "upload_id",
         ]
         read_only_fields = [
             "id",
@@ -104,15 +110,23 @@ class NoteSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if hasattr(request, "project"):
             self.fields["type_id"].queryset = request.project.note_types.all()
+            self.fields["upload_id"].queryset = request.project.uploads.filter(
+                created_by=request.user
+            )
         elif hasattr(request, "note"):
             self.fields["type_id"].queryset = request.note.project.note_types.all()
 
     def validate_content(self, content):
-        text = LexicalProcessor(content["root"]).to_markdown()
-        if len(text) > 250_000:
+        length = LexicalProcessor(content["root"]).get_markdown_length(limit=250_000)
+        if length > 250_000:
             raise exceptions.ValidationError("Content exceed length limit.")
         return content
 
+    def validate_upload_id(self, upload: Upload):
+        if not upload.is_complete:
+            raise exceptions.ValidationError("Upload is not complete.")
+        return upload
+
     def validate(self, data):
         slack_team_id = data.get("slack_team_id")
         slack_channel_id = data.get("slack_channel_id")
@@ -167,30 +181,31 @@ class NoteSerializer(serializers.ModelSerializer):
             file_content_response = requests.get(
                 f"https://www.googleapis.com/drive/v3/files/{google_drive_file_id}?alt=media",
                 headers=headers,
+                stream=True,
             )
             file_content_response.raise_for_status()
-            file_content = file_content_response.content
 
             validated_data["title"] = file_metadata.get("name")
-            validated_data["file"] = ContentFile(
-                file_content, name=file_metadata.get("name")
+            validated_data["file"] = media.download_file(
+                file_content_response, file_metadata.get("name")
             )
             validated_data["file_type"] = file_metadata.get("mimeType")
             validated_data["file_size"] = file_metadata.get("size")
             validated_data["google_drive_file_timestamp"] = file_metadata.get(
                 "createdTime"
             )
+        upload = validated_data.pop("upload", None)
+        if upload is not None:
+            # The upload is already stored under its final name, so no copy is needed
+            validated_data["file"] = upload.name
+            validated_data["file_size"] = upload.size
+            upload.delete()
         organizations = validated_data.pop("organizations", [])
         keywords = validated_data.pop("keywords", [])
-        file = validated_data.get("file")
 
-        # Convert mp4 file with movflags faststart for streaming
-        if file and file.name and file.name.split(".")[-1].lower() == "mp4":
-            with tempfile.NamedTemporaryFile(suffix=".mp4") as output:
-                validated_data["file"] = media.process_mp4_for_streaming(file, output)
-                note = Note.objects.create(**validated_data)
-        else:
-            note = Note.objects.create(**validated_data)
+        # The mp4 files are processed for streaming in the background,
+        # see analyze_new_note_on_commit.
+        note = Note.objects.create(**validated_data)
         self.add_organizations(note, organizations)
         self.add_keywords(note, keywords)
         mixpanel.track(
@@ -233,13 +248,6 @@ class NoteUpdateSerializer(NoteSerializer):
                 )
                 organizations_to_add.append(organization)
             note.organizations.set(organizations_to_add)
-            # Clean up
-            (
-                Organization.objects.filter(project=project)
-                .annotate(note_count=Count("notes"))
-                .filter(note_count=0)
-                .delete()
-            )
 
         return note
 
@@ -259,45 +267,67 @@ class NoteUpdateSerializer(NoteSerializer):
         return input_highlights
 
     def extract_highlights_from_content_state(self, note):
-        # Extract highlights from rich text and update
+        # Sync the highlights with the mark nodes in the content state
         request = self.context["request"]
         new_highlight_id = Highlight.id.field._generate_uuid()
         root = LexicalProcessor(note.content["root"])
         input_highlights = self.extract_input_highlights(root, new_highlight_id)
-        if new_highlight_id in input_highlights:
-            new_highlight_text = input_highlights.get(new_highlight_id)
-            Highlight.objects.create(
-                id=new_highlight_id,
-                title=new_highlight_text,
-                quote=new_highlight_text,
-                vector=embedder.embed_documents([new_highlight_text])[0],
-                note=note,
-                created_by=request.user,
-            )
+        new_highlight_text = input_highlights.pop(new_highlight_id, None)
 
-        db_highlights = {
-            highlight.id: highlight for highlight in Highlight.objects.filter(note=note)
-        }
-        highlights_to_update = []
-        for highlight_id, highlight_title in input_highlights.items():
-            highlight = db_highlights.get(highlight_id)
-            if highlight is None:
+        # Only compare the quotes so that the vectors are not loaded
+        db_quotes = dict(note.highlights.values_list("takeaway_ptr_id", "quote"))
+        changed_quotes = {}
+        for highlight_id, quote in input_highlights.items():
+            if highlight_id not in db_quotes:
                 # The highlight id in the note.content doesn't match with
                 # any of the highlights in the db. Will skip it.
-                print(highlight_id)
                 logger.warn(f"The highlight {highlight_id} is not found and skipped.")
                 continue
-            if highlight.quote == highlight_title:
-                # No need to update the highlight if the title is the same.
-                continue
-            highlight.quote = highlight_title
-            highlight.vector = embedder.embed_documents([highlight_title])[0]
-            highlights_to_update.append(highlight)
-        Highlight.objects.bulk_update(highlights_to_update, ["quote", "vector"])
-        note.highlights.exclude(id__in=input_highlights.keys()).delete()
-        # We save the note again as we have added the highlight id
-        # to the newly created highlight in the content state.
-        note.save()
+            if db_quotes[highlight_id] != quote:
+                changed_quotes[highlight_id] = quote
+        deleted_highlight_ids = db_quotes.keys() - input_highlights.keys()
+
+        # Embed all the new and changed quotes in a single call
+        quotes_to_embed = dict(changed_quotes)
+        if new_highlight_text is not None:
+            quotes_to_embed[new_highlight_id] = new_highlight_text
+        vectors = {}
+        if quotes_to_embed:
+            vectors = dict(
+                zip(
+                    quotes_to_embed.keys(),
+                    embedder.embed_documents(list(quotes_to_embed.values())),
+                )
+            )
+
+        with transaction.atomic():
+            if new_highlight_text is not None:
+                Highlight.objects.create(
+                    id=new_highlight_id,
+                    title=new_highlight_text,
+                    quote=new_highlight_text,
+                    vector=vectors[new_highlight_id],
+                    note=note,
+                    created_by=request.user,
+                )
+            if changed_quotes:
+                highlights_to_update = list(
+                    Highlight.objects.filter(
+                        takeaway_ptr_id__in=changed_quotes.keys()
+                    ).only("takeaway_ptr_id")
+                )
+                for highlight in highlights_to_update:
+                    highlight.quote = changed_quotes[highlight.takeaway_ptr_id]
+                    highlight.vector = vectors[highlight.takeaway_ptr_id]
+                Highlight.objects.bulk_update(highlights_to_update, ["quote", "vector"])
+            if deleted_highlight_ids:
+                note.highlights.filter(
+                    takeaway_ptr_id__in=deleted_highlight_ids
+                ).delete()
+            if new_highlight_text is not None:
+                # We save the note again as we have added the highlight id
+                # to the newly created highlight in the content state.
+                note.save()
         return note
 
     def update_highlights(self, note):
@@ -21,10 +21,14 @@ class PlaybookSerializer(serializers.ModelSerializer):
             "thumbnail",
             "report_ids",
             "description",
+            "video_version",
+            "rendered_video_version",
         ]
         read_only_fields = [
             "video",
             "thumbnail",
+            "video_version",
+            "rendered_video_version",
         ]
 
     def __init__(self, *args, **kwargs):
@@ -39,8 +39,8 @@ class PlaybookTakeawaySerializer(OrderedModelSerializer, serializers.ModelSerial
         return super().validate(attrs)
 
     def perform_post_save_actions(self, playbook_takeaway: PlaybookTakeaway):
-        playbook_takeaway.playbook.create_playbook_clip_and_thumbnail()
         playbook_takeaway.playbook.update_playbook_takeaway_times()
+        playbook_takeaway.playbook.schedule_video_render()
 
     def create(self, validated_data):
         playbook = getattr(self.context.get("request"), "playbook")
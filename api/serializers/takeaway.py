@@ -27,6 +27,7 @@ class TakeawaySerializer(serializers.ModelSerializer):
     )
     report = BriefNoteSerializer(source="note", read_only=True)
     is_saved = serializers.BooleanField(read_only=True)
+    relevance = serializers.FloatField(read_only=True)
     quote = serializers.CharField(source="highlight.quote", read_only=True)
     media_type = serializers.CharField(source="note.media_type", read_only=True)
     end = serializers.IntegerField(source="highlight.end", read_only=True)
@@ -57,6 +58,7 @@ class TakeawaySerializer(serializers.ModelSerializer):
             "thumbnail",
             "start",
             "end",
+            "relevance",
         ]
 
     def __init__(self, *args, **kwargs):
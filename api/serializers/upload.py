@@ -0,0 +1,51 @@
+from rest_framework import exceptions, serializers
+
+from api.models.note import Note
+from api.models.upload import Upload
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    file_name = serializers.CharField(write_only=True, max_length=100)
+    is_complete = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Upload
+        fields = [
+            "id",
+            "file_name",
+            "name",
+            "size",
+            "offset",
+            "is_complete",
+            "created_at",
+        ]
+        read_only_fields = [
+            "id",
+            "name",
+            "offset",
+            "created_at",
+        ]
+
+    def validate_file_name(self, file_name):
+        allowed_extensions = [filetype[0] for filetype in Note.FileType.choices]
+        ext = file_name.split(".")[-1]
+        if ext.lower() not in allowed_extensions:
+            raise exceptions.ValidationError(
+                f"Only {allowed_extensions} files are allowed."
+            )
+        return file_name
+
+    def validate_size(self, size):
+        max_size = 1 * 1024 * 1024 * 1024  # 1 GB
+        if size <= 0:
+            raise exceptions.ValidationError("File cannot be empty.")
+        if size > max_size:
+            raise exceptions.ValidationError("File size cannot exceed 1 GB.")
+        return size
+
+    def create(self, validated_data):
+        file_name = validated_data.pop("file_name")
+        upload = Upload(**validated_data)
+        upload.start(file_name)
+        upload.save()
+        return upload
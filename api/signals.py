@@ -2,59 +2,369 @@ import os
 
 from django.apps import apps
 from django.core.management import call_command
-from django.db.models import Count
-from django.db.models.signals import m2m_changed, post_delete, post_migrate, pre_delete
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_migrate,
+    post_save,
+    pre_delete,
+    pre_save,
+)
 from django.dispatch import receiver
 
 from api.integrations.recall import recall
+from api.models.cache.clip_segment import ClipSegment
+from api.models.feature import Feature
+from api.models.highlight import Highlight
 from api.models.keyword import Keyword
 from api.models.note import Note
 from api.models.organization import Organization
+from api.models.product_feature import ProductFeature
 from api.models.project import Project
 from api.models.tag import Tag
 from api.models.takeaway import Takeaway
+from api.models.takeaway_type import TakeawayType
+from api.models.usage.token import TokenUsage
+from api.models.usage.transciption import TranscriptionUsage
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.models.workspace_quota import WorkspaceQuota
+from api.models.workspace_user import WorkspaceUser
+from api.permissions import invalidate_memberships
+from api.utils.orphans import orphan_collector
+from api.utils.rollups import get_days, rollup_collector
 
 
-def cleanup_keywords():
-    Keyword.objects.annotate(note_count=Count("notes")).filter(note_count=0).delete()
+def clear_memberships(user_ids):
+    # Clear again on commit, in case a request cached the old memberships meanwhile
+    user_ids = list(user_ids)
+    invalidate_memberships(user_ids)
+    transaction.on_commit(lambda: invalidate_memberships(user_ids))
 
 
-def cleanup_organizations():
-    Organization.objects.annotate(note_count=Count("notes")).filter(
-        note_count=0
-    ).delete()
+def cleanup_recall_bots(project):
+    for bot in project.recall_bots.all():
+        recall.v1.bot(bot.id).delete()
 
 
-def cleanup_tags():
-    Tag.objects.filter(takeaway_count=0).delete()
+def collect_removed(name, action, instance, reverse, pk_set, related):
+    """Record the objects removed from a many to many relation as orphan candidates."""
+    if reverse:
+        if action in ("post_remove", "post_clear"):
+            orphan_collector.add(name, [instance.pk])
+    elif action == "post_remove":
+        orphan_collector.add(name, pk_set)
+    elif action == "pre_clear":
+        orphan_collector.add(name, related.values_list("id", flat=True))
 
 
-def cleanup_recall_bots(project):
-    for bot in project.recall_bots.all():
-        recall.v1.bot(bot.id).delete()
+def touch_note_projects(action, instance, reverse, pk_set):
+    """Invalidate the note charts of the projects when relations of notes change."""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            rollup_collector.touch(instance.project_id)
+        return
+    if action in ("post_add", "post_remove"):
+        notes = Note.objects.filter(pk__in=pk_set)
+    elif action == "pre_clear":
+        notes = instance.notes.all()
+    else:
+        return
+    for project_id in set(notes.values_list("project", flat=True)):
+        rollup_collector.touch(project_id)
 
 
 @receiver(m2m_changed, sender=Note.keywords.through)
 def note_keywords_changed(sender, action, instance, reverse, pk_set, **kwargs):
-    if action in ("post_remove", "post_clear"):
-        cleanup_keywords()
+    related = None if reverse else instance.keywords
+    collect_removed("keyword", action, instance, reverse, pk_set, related)
+    touch_note_projects(action, instance, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Note.organizations.through)
+def note_organizations_changed(sender, action, instance, reverse, pk_set, **kwargs):
+    related = None if reverse else instance.organizations
+    collect_removed("organization", action, instance, reverse, pk_set, related)
+    touch_note_projects(action, instance, reverse, pk_set)
+
+
+# The fields grouped by in the charts
+note_chart_fields = ["type", "sentiment", "revenue", "author", "title"]
+takeaway_chart_fields = ["type", "priority", "created_by"]
+user_chart_fields = ["username", "first_name", "last_name"]
+# The sizes of the files counted in the quota of the workspace
+note_file_fields = ["file_size"]
+highlight_file_fields = ["clip_size", "thumbnail_size"]
+# The fields compared on save with the values loaded with the instance
+tracked_fields = {
+    Note: note_chart_fields + note_file_fields,
+    Takeaway: takeaway_chart_fields,
+    Highlight: takeaway_chart_fields + highlight_file_fields,
+    User: user_chart_fields,
+}
+tracked_attnames = {
+    model: {field: model._meta.get_field(field).attname for field in fields}
+    for model, fields in tracked_fields.items()
+}
+
+
+@receiver(post_init, sender=Note)
+@receiver(post_init, sender=Takeaway)
+@receiver(post_init, sender=Highlight)
+@receiver(post_init, sender=User)
+def post_init_tracked(sender, instance, **kwargs):
+    # The deferred fields are missing, they are queried on save if needed
+    instance._loaded_values = {
+        attname: instance.__dict__[attname]
+        for attname in tracked_attnames[sender].values()
+        if attname in instance.__dict__
+    }
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=Takeaway)
+@receiver(post_save, sender=Highlight)
+@receiver(post_save, sender=User)
+def post_save_tracked(sender, instance, update_fields, **kwargs):
+    # The next save of the instance is compared with the saved values
+    instance._loaded_values = {
+        **getattr(instance, "_loaded_values", {}),
+        **{
+            attname: getattr(instance, attname)
+            for field, attname in tracked_attnames[sender].items()
+            if update_fields is None
+            or field in update_fields
+            or attname in update_fields
+        },
+    }
+
+
+def get_previous_values(model, instance, fields, update_fields) -> dict:
+    """
+    Return the stored values of the fields among the fields that the save writes,
+    as loaded with the instance. Only the fields that weren't loaded are queried.
+    """
+    if instance._state.adding:
+        return {}
+    attnames = {field: model._meta.get_field(field).attname for field in fields}
+    if update_fields is not None:
+        fields = [
+            field
+            for field in fields
+            if field in update_fields or attnames[field] in update_fields
+        ]
+    loaded_values = getattr(instance, "_loaded_values", {})
+    previous_values = {
+        field: loaded_values[attnames[field]]
+        for field in fields
+        if attnames[field] in loaded_values
+    }
+    missing = [field for field in fields if field not in previous_values]
+    if not missing:
+        return previous_values
+    previous = (
+        model.objects.filter(pk=instance.pk)
+        .values_list(*[attnames[field] for field in missing])
+        .first()
+    )
+    if previous is None:
+        return {}
+    return {**previous_values, **dict(zip(missing, previous))}
+
+
+def get_changed_fields(model, instance, previous_values) -> set:
+    """Return the fields whose previous values the save of the instance changes."""
+    return {
+        field
+        for field, value in previous_values.items()
+        if getattr(instance, model._meta.get_field(field).attname) != value
+    }
+
+
+def get_file_size(instance, fields) -> int:
+    return sum(getattr(instance, field) or 0 for field in fields)
+
+
+def set_previous_file_size(instance, fields, previous_values):
+    """Keep the stored size of the files, to count the change in post_save."""
+    instance._previous_file_size = sum(
+        (previous_values.get(field, getattr(instance, field)) or 0) for field in fields
+    )
+
+
+def get_file_size_change(instance, fields, created) -> int:
+    file_size = get_file_size(instance, fields)
+    if created:
+        return file_size
+    return file_size - getattr(instance, "_previous_file_size", file_size)
+
+
+@receiver(pre_save, sender=Note)
+def pre_save_note(sender, instance, raw, update_fields, **kwargs):
+    if raw:
+        return
+    previous_values = get_previous_values(
+        Note, instance, note_chart_fields + note_file_fields, update_fields
+    )
+    set_previous_file_size(instance, note_file_fields, previous_values)
+    changed = get_changed_fields(Note, instance, previous_values)
+    if changed & {"type", "sentiment"}:
+        # Takeaways are rolled up with the type and sentiment of their note
+        rollup_collector.add(instance.project_id, get_days(instance.takeaways.all()))
+    elif changed:
+        rollup_collector.touch(instance.project_id)
+
+
+@receiver(pre_delete, sender=Note)
+def pre_delete_note(sender, instance, **kwargs):
+    orphan_collector.add("keyword", instance.keywords.values_list("id", flat=True))
+    orphan_collector.add(
+        "organization", instance.organizations.values_list("id", flat=True)
+    )
+    rollup_collector.add(instance.project_id, get_days(instance.takeaways.all()))
 
 
 @receiver(post_delete, sender=Note)
 def post_delete_note(sender, instance, **kwargs):
-    cleanup_keywords()
-    cleanup_organizations()
+    if instance.file_size:
+        quotas = WorkspaceQuota.objects.filter(workspace=instance.workspace_id)
+        quotas.add_usage(file_size=-instance.file_size)
+
+
+def count_tagged_takeaways(action, instance, reverse, pk_set):
+    """
+    Maintain the takeaway counts of the tags.
+    The ids to remove are checked before the removal, as they may not be related.
+    """
+    if reverse:
+        tags = Tag.objects.filter(pk=instance.pk)
+        if action == "post_add" and pk_set:
+            tags.add_takeaway_count(len(pk_set))
+        elif action == "pre_remove":
+            takeaways = instance.takeaways.filter(pk__in=pk_set)
+            tags.add_takeaway_count(-takeaways.count())
+        elif action == "pre_clear":
+            tags.update(takeaway_count=0)
+    elif action == "post_add" and pk_set:
+        Tag.objects.filter(pk__in=pk_set).add_takeaway_count(1)
+    elif action == "pre_remove":
+        instance.tags.filter(pk__in=pk_set).add_takeaway_count(-1)
+    elif action == "pre_clear":
+        instance.tags.all().add_takeaway_count(-1)
+
+
+def collect_tagged_takeaways(action, instance, reverse, pk_set):
+    """Roll up again the days of the takeaways whose tags changed."""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            rollup_collector.add_takeaways([(instance.note_id, instance.created_at)])
+        return
+    if action in ("post_add", "post_remove"):
+        takeaways = Takeaway.objects.filter(pk__in=pk_set)
+    elif action == "pre_clear":
+        takeaways = instance.takeaways.all()
+    else:
+        return
+    rollup_collector.add_takeaways(takeaways.values_list("note", "created_at"))
 
 
 @receiver(m2m_changed, sender=Takeaway.tags.through)
 def takeaway_tags_changed(sender, action, instance, reverse, pk_set, **kwargs):
-    if action in ("post_remove", "post_clear"):
-        cleanup_tags()
+    count_tagged_takeaways(action, instance, reverse, pk_set)
+    related = None if reverse else instance.tags
+    collect_removed("tag", action, instance, reverse, pk_set, related)
+    collect_tagged_takeaways(action, instance, reverse, pk_set)
+
+
+# Highlights are takeaways, their saves are sent with the Highlight sender
+@receiver(pre_save, sender=Takeaway)
+@receiver(pre_save, sender=Highlight)
+def pre_save_takeaway(sender, instance, raw, update_fields, **kwargs):
+    if raw:
+        return
+    file_fields = highlight_file_fields if sender is Highlight else []
+    previous_values = get_previous_values(
+        sender, instance, takeaway_chart_fields + file_fields, update_fields
+    )
+    set_previous_file_size(instance, file_fields, previous_values)
+    if get_changed_fields(sender, instance, previous_values) - set(file_fields):
+        rollup_collector.add_takeaways([(instance.note_id, instance.created_at)])
 
 
-@receiver(post_delete, sender=Takeaway)
-def post_delete_takeaway(sender, instance, **kwargs):
-    cleanup_tags()
+@receiver(post_save, sender=Takeaway)
+@receiver(post_save, sender=Highlight)
+def post_save_takeaway(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        rollup_collector.add_takeaways([(instance.note_id, instance.created_at)])
+
+
+@receiver(pre_delete, sender=Takeaway)
+def pre_delete_takeaway(sender, instance, **kwargs):
+    tag_ids = list(instance.tags.values_list("id", flat=True))
+    if tag_ids:
+        Tag.objects.filter(id__in=tag_ids).add_takeaway_count(-1)
+        orphan_collector.add("tag", tag_ids)
+    rollup_collector.add_takeaways([(instance.note_id, instance.created_at)])
+
+
+@receiver(pre_delete, sender=Tag)
+def pre_delete_tag(sender, instance, **kwargs):
+    # The tags of the takeaways are deleted without m2m_changed
+    takeaways = instance.takeaways.values_list("note", "created_at")
+    rollup_collector.add_takeaways(takeaways)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=TakeawayType)
+@receiver(post_delete, sender=TakeawayType)
+@receiver(post_save, sender=Organization)
+def chart_label_changed(sender, instance, **kwargs):
+    rollup_collector.touch(instance.project_id)
+
+
+# Keywords are shared by the projects, the projects of their notes are touched
+@receiver(post_save, sender=Keyword)
+def post_save_keyword(sender, instance, created, **kwargs):
+    if not created:
+        notes = Note.keywords.through.objects.filter(keyword=instance)
+        rollup_collector.touch_notes(notes.values_list("note", flat=True))
+
+
+# The relations deleted with their keyword or organization, without m2m_changed
+@receiver(pre_delete, sender=Note.keywords.through)
+@receiver(pre_delete, sender=Note.organizations.through)
+def pre_delete_note_label(sender, instance, **kwargs):
+    rollup_collector.touch_notes([instance.note_id])
+
+
+@receiver(pre_save, sender=User)
+def pre_save_user(sender, instance, raw, update_fields, **kwargs):
+    if raw:
+        return
+    previous_values = get_previous_values(
+        User, instance, user_chart_fields, update_fields
+    )
+    # The charts are touched once saved
+    instance._chart_label_changed = bool(
+        get_changed_fields(User, instance, previous_values)
+    )
+
+
+@receiver(post_save, sender=User)
+def post_save_user(sender, instance, **kwargs):
+    if not getattr(instance, "_chart_label_changed", False):
+        return
+    project_ids = set(
+        Note.objects.filter(author=instance).values_list("project", flat=True)
+    ) | set(
+        Takeaway.objects.filter(created_by=instance).values_list(
+            "note__project", flat=True
+        )
+    )
+    for project_id in project_ids:
+        rollup_collector.touch(project_id)
 
 
 @receiver(pre_delete, sender=Project)
@@ -62,6 +372,95 @@ def pre_delete_project(sender, instance, **kwargs):
     cleanup_recall_bots(instance)
 
 
+@receiver(post_save, sender=WorkspaceUser)
+@receiver(post_delete, sender=WorkspaceUser)
+def workspace_user_changed(sender, instance, **kwargs):
+    clear_memberships([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Workspace.members.through)
+@receiver(m2m_changed, sender=Project.users.through)
+def members_changed(sender, action, instance, reverse, pk_set, **kwargs):
+    if reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            clear_memberships([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        clear_memberships(pk_set)
+    elif action == "pre_clear":
+        if sender is Project.users.through:
+            members = instance.users
+        else:
+            members = instance.members
+        clear_memberships(members.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Workspace)
+def post_save_workspace(sender, instance, created, **kwargs):
+    # Also for the raw saves of loaddata, whose fixtures may hold the quota already
+    if created:
+        WorkspaceQuota.objects.get_or_create(workspace=instance)
+
+
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+@receiver(post_save, sender=ProductFeature)
+@receiver(post_delete, sender=ProductFeature)
+def feature_changed(sender, **kwargs):
+    WorkspaceQuota.objects.invalidate_features()
+
+
+@receiver(post_save, sender=TranscriptionUsage)
+def post_save_transcription_usage(sender, instance, created, **kwargs):
+    if created and instance.value:
+        quotas = WorkspaceQuota.objects.filter(workspace=instance.workspace_id)
+        quotas.add_usage(seconds=instance.value)
+
+
+@receiver(post_save, sender=TokenUsage)
+def post_save_token_usage(sender, instance, created, **kwargs):
+    if created and instance.value:
+        quotas = WorkspaceQuota.objects.filter(workspace=instance.workspace_id)
+        quotas.add_usage(tokens=instance.value)
+
+
+@receiver(post_save, sender=Note)
+def post_save_note(sender, instance, created, **kwargs):
+    file_size = get_file_size_change(instance, note_file_fields, created)
+    if file_size:
+        quotas = WorkspaceQuota.objects.filter(workspace=instance.workspace_id)
+        quotas.add_usage(file_size=file_size)
+    if created:
+        rollup_collector.touch(instance.project_id)
+
+
+# Highlights generated in bulk are counted by the generator,
+# as bulk_create doesn't send post_save.
+@receiver(post_save, sender=Highlight)
+def post_save_highlight(sender, instance, created, **kwargs):
+    file_size = get_file_size_change(instance, highlight_file_fields, created)
+    if file_size:
+        quotas = WorkspaceQuota.objects.filter(workspace__notes=instance.note_id)
+        quotas.add_usage(file_size=file_size)
+
+
+@receiver(post_delete, sender=Highlight)
+def post_delete_highlight(sender, instance, **kwargs):
+    # Highlights are deleted before their note, so the note can still be joined
+    file_size = get_file_size(instance, highlight_file_fields)
+    if file_size:
+        quotas = WorkspaceQuota.objects.filter(workspace__notes=instance.note_id)
+        quotas.add_usage(file_size=-file_size)
+
+
+# Also sent for the segments cascaded by the deletes of their highlights
+@receiver(pre_delete, sender=ClipSegment)
+def pre_delete_clip_segment(sender, instance, **kwargs):
+    # Kept until the commit, the delete may still be rolled back
+    storage, name = instance.file.storage, instance.file.name
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
 @receiver(post_migrate, sender=apps.get_app_config("api"))
 def load_data_from_fixture(sender, **kwargs):
     fixture_file = os.path.join("api", "fixtures", "features.json")
@@ -1,30 +1,92 @@
+import json
+import math
+from collections import Counter
 from datetime import datetime
 
-from celery import shared_task
+import ffmpeg
+from celery import chain, chord, shared_task
 from celery.utils.log import get_task_logger
+from django.db import transaction
+from django.utils import timezone
 from django_celery_results.models import TaskResult
 
+from api.ai import config
 from api.ai.analyzer.asset_analyzer import AssetAnalyzer
 from api.ai.analyzer.note_analyzer import ExistingNoteAnalyzer, NewNoteAnalyzer
 from api.ai.analyzer.project_summarizer import ProjectSummarizer
+from api.ai.embedder import embedder
 from api.mixpanel import mixpanel
 from api.models.asset import Asset
+from api.models.block import Block
 from api.models.integrations.google.calendar.channel import GoogleCalendarChannel
 from api.models.integrations.slack.slack_message_buffer import SlackMessageBuffer
 from api.models.note import Note
+from api.models.playbook import Playbook
 from api.models.project import Project
 from api.models.takeaway_type import TakeawayType
+from api.models.upload import Upload
 from api.models.user import User
+from api.utils import media, orphans, rollups
 
 logger = get_task_logger(__name__)
 
 
 @shared_task
 def summarize_projects():
+    """
+    Summarize the projects in parallel, in at most config.summarize_concurrency
+    chunks of projects, and report the outcomes once all of them are done.
+    """
     print("summarizing projects")
     bot = User.objects.get(username="bot@raijin.ai")
-    project_summarizer = ProjectSummarizer()
-    project_summarizer.summarize_all_projects(created_by=bot)
+    project_ids = list(Project.objects.order_by("id").values_list("id", flat=True))
+    if not project_ids:
+        return
+    chunk_size = math.ceil(len(project_ids) / config.summarize_concurrency)
+    chunks = summarize_project.chunks(
+        [(project_id, bot.id) for project_id in project_ids], chunk_size
+    )
+    chord(chunks.group())(report_project_summaries.s())
+
+
+@shared_task
+def summarize_project(project_id, user_id):
+    project = Project.objects.get(id=project_id)
+    user = User.objects.get(id=user_id)
+    run = ProjectSummarizer().summarize_project(project, user)
+    print(f"summarized project {project_id}: {run.status} in {run.duration:.1f}s")
+    return run.status
+
+
+@shared_task
+def report_project_summaries(results):
+    statuses = Counter(status for chunk in results for status in chunk)
+    print(f"summarized projects: {dict(statuses)}")
+
+
+@shared_task
+def delete_orphans(candidates):
+    orphans.delete_orphans(candidates)
+
+
+@shared_task
+def refresh_chart_rollups(projects):
+    rollups.refresh_rollups(projects)
+
+
+@shared_task
+def cull_embeddings():
+    embedder.cull()
+
+
+@shared_task
+def render_playbook_video(playbook_id, version):
+    playbook = Playbook.objects.filter(id=playbook_id, video_version=version).first()
+    if playbook is None:
+        # Deleted, or changed again and rendered by a later task
+        return
+    print(f"rendering video {version} of playbook {playbook_id}")
+    playbook.render_video(version)
 
 
 @shared_task
@@ -72,6 +134,45 @@ def analyze_new_note(self, note_id, user_id):
     analyzer.analyze(note, user)
 
 
+@shared_task
+def process_note_file_for_streaming(note_id):
+    print(f"processing file of note {note_id} for streaming")
+    note = Note.objects.get(id=note_id)
+    try:
+        media.process_mp4_for_streaming(note.file)
+    except ffmpeg.Error as e:
+        # The original file can still be played, only not streamed
+        logger.error(f"Failed to process file of note {note_id}: {e.stderr}")
+
+
+@shared_task
+def delete_stale_uploads():
+    """Abort and delete the uploads that were not attached to a note in time."""
+    uploads = Upload.objects.filter(created_at__lt=timezone.now() - Upload.max_age)
+    for upload in uploads:
+        try:
+            upload.abort()
+        except Exception as e:
+            # The parts may already be gone, the upload is deleted anyway
+            logger.error(f"Failed to abort upload {upload.id}: {e}")
+        upload.delete()
+
+
+def analyze_new_note_on_commit(note: Note, user_id):
+    """
+    Analyze the new note once the transaction is committed.
+    The mp4 files are first processed for streaming, which is too slow for the request.
+    """
+    if note.file_type != Note.FileType.MP4:
+        analyze_new_note.delay_on_commit(note.id, user_id)
+        return
+    workflow = chain(
+        process_note_file_for_streaming.si(note.id),
+        analyze_new_note.si(note.id, user_id),
+    )
+    transaction.on_commit(workflow.delay)
+
+
 @shared_task(bind=True, track_started=True)
 def analyze_existing_note(self, note_id, takeaway_type_ids, user_id):
     print(
@@ -95,8 +196,34 @@ def analyze_existing_note(self, note_id, takeaway_type_ids, user_id):
     analyzer.analyze(note, takeaway_types, user)
 
 
+def advance_progress(task, parent_id, step, total):
+    """
+    Count one more finished subtask of the step in the progress of the parent task.
+    The subtasks run in parallel, the task result row is locked to count them all.
+    """
+    with transaction.atomic():
+        result = TaskResult.objects.select_for_update().get(task_id=parent_id)
+        meta = None
+        if result.status == "PROGRESS" and result.result:
+            meta = json.loads(result.result)
+        current = 1
+        if isinstance(meta, dict) and meta.get("step") == step:
+            current = meta.get("current", 0) + 1
+        task.update_state(
+            task_id=parent_id,
+            state="PROGRESS",
+            meta={"step": step, "current": current, "total": total},
+        )
+
+
 @shared_task(bind=True, track_started=True)
 def analyze_asset(self, project_id, note_ids, takeaway_type_ids, user_id):
+    """
+    Create an asset from the notes, replaced by a workflow of parallel subtasks:
+    the notes are analyzed, then the takeaways of each type are clustered,
+    then the asset is assembled. The assembly keeps the id of this task,
+    so the asset and its notes are analyzing until the workflow is done.
+    """
     print(
         f"analyzing asset with {note_ids} and takeaway types {takeaway_type_ids} by {user_id}"
     )
@@ -121,31 +248,82 @@ def analyze_asset(self, project_id, note_ids, takeaway_type_ids, user_id):
             "created_manually": False,
         },
     )
+    notes.update(task=task)
 
-    # Generate for each takeaway type
-    bot = User.objects.get(username="bot@raijin.ai")
-    for i, note in enumerate(notes):
-        note_takeaway_types = takeaway_types.exclude(
-            takeaways__note=note, takeaways__created_by=bot
-        )
-        self.update_state(
-            state="PROGRESS",
-            meta={"step": "analyzing report", "current": i + 1, "total": len(notes)},
+    note_ids = list(notes.values_list("id", flat=True))
+    takeaway_type_ids = list(takeaway_types.values_list("id", flat=True))
+    self.update_state(
+        state="PROGRESS",
+        meta={"step": "analyzing report", "current": 0, "total": len(note_ids)},
+    )
+    # The results of the last header are the blocks of the takeaway types
+    assembly = assemble_asset.s(self.request.id, asset.id, takeaway_type_ids, user_id)
+    if takeaway_type_ids:
+        total = len(takeaway_type_ids)
+        assembly = chord(
+            [
+                cluster_asset_takeaways.si(
+                    self.request.id, asset.id, takeaway_type_id, total, user_id
+                )
+                for takeaway_type_id in takeaway_type_ids
+            ],
+            assembly,
         )
+    total = len(note_ids)
+    workflow = chord(
+        [
+            analyze_asset_note.si(
+                self.request.id, note_id, takeaway_type_ids, total, user_id
+            )
+            for note_id in note_ids
+        ],
+        assembly,
+    )
+    raise self.replace(workflow)
 
-        note.task = task
-        note.save()
 
-        analyzer = ExistingNoteAnalyzer()
-        analyzer.analyze(note, note_takeaway_types, user)
+@shared_task(bind=True)
+def analyze_asset_note(self, parent_id, note_id, takeaway_type_ids, total, user_id):
+    note = Note.objects.select_related("project").get(id=note_id)
+    user = User.objects.get(id=user_id)
+    bot = User.objects.get(username="bot@raijin.ai")
+    takeaway_types = TakeawayType.objects.filter(
+        id__in=takeaway_type_ids, project=note.project
+    ).exclude(takeaways__note=note, takeaways__created_by=bot)
+    analyzer = ExistingNoteAnalyzer()
+    analyzer.analyze(note, takeaway_types, user)
+    advance_progress(self, parent_id, "analyzing report", total)
 
-        # Generate asset
-        self.update_state(
-            state="PROGRESS",
-            meta={"step": "generating asset"},
-        )
-    analyzer = AssetAnalyzer()
-    analyzer.analyze(asset, takeaway_types, user)
+
+@shared_task(bind=True)
+def cluster_asset_takeaways(
+    self, parent_id, asset_id, takeaway_type_id, total, user_id
+):
+    asset = Asset.objects.select_related("project").get(id=asset_id)
+    takeaway_type = TakeawayType.objects.get(id=takeaway_type_id)
+    user = User.objects.get(id=user_id)
+    block = AssetAnalyzer().cluster(asset, takeaway_type, user)
+    advance_progress(self, parent_id, "clustering takeaways", total)
+    return block.id
+
+
+@shared_task(bind=True)
+def assemble_asset(self, block_ids, parent_id, asset_id, takeaway_type_ids, user_id):
+    """Assemble the asset from the blocks of the takeaway types, in the same order."""
+    self.update_state(
+        task_id=parent_id, state="PROGRESS", meta={"step": "generating asset"}
+    )
+    asset = Asset.objects.select_related("project").get(id=asset_id)
+    user = User.objects.get(id=user_id)
+    takeaway_types = TakeawayType.objects.in_bulk(takeaway_type_ids)
+    # Without takeaway types, the results are the ones of the notes
+    block_ids = block_ids if takeaway_type_ids else []
+    blocks = Block.objects.in_bulk(block_ids)
+    type_blocks = [
+        (takeaway_types[takeaway_type_id], blocks[block_id])
+        for takeaway_type_id, block_id in zip(takeaway_type_ids, block_ids)
+    ]
+    AssetAnalyzer().assemble(asset, type_blocks, user)
 
 
 @shared_task
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from api.ai.aligner import QuoteAligner, split_sentences
+from api.models.cache.sentence_index import SentenceIndex
+from api.models.note import Note
+from api.models.project import Project
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+class TestQuoteAligner(TestCase):
+    text = (
+        "We tried the new dashboard last week. The charts load slowly on mobile.\n"
+        "Pricing is clear, but the annual plan is too expensive for small teams. "
+        "Support answered within an hour."
+    )
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=user)
+        project = Project.objects.create(name="project", workspace=workspace)
+        self.note = Note.objects.create(title="note", project=project, author=user)
+        return super().setUp()
+
+    def test_split_sentences(self):
+        sentences = [self.text[start:end] for start, end in split_sentences(self.text)]
+        self.assertEqual(
+            sentences,
+            [
+                "We tried the new dashboard last week.",
+                "The charts load slowly on mobile.",
+                "Pricing is clear, but the annual plan is too expensive for small teams.",
+                "Support answered within an hour.",
+            ],
+        )
+
+    def test_align(self):
+        aligner = QuoteAligner(self.text, split_sentences(self.text))
+        quotes = [
+            "The charts load slowly on mobile.",
+            "the charts load slowly on mobile pricing is clear",
+            "the annual plan is way too expensive for small teams",
+            "Customers asked whether support answers quickly",
+            "Nothing in common",
+        ]
+        alignments = aligner.align(quotes)
+
+        self.assertEqual(
+            [alignment and alignment.method for alignment in alignments],
+            ["exact", "normalized", "fuzzy", "tfidf", None],
+        )
+        self.assertEqual(
+            [
+                self.text[alignment.start : alignment.end]
+                for alignment in alignments[:4]
+            ],
+            [
+                "The charts load slowly on mobile.",
+                "The charts load slowly on mobile.\nPricing is clear",
+                "the annual plan is too expensive for small teams",
+                "Support answered within an hour.",
+            ],
+        )
+
+    def test_sentence_index_is_cached(self):
+        with patch(
+            "api.ai.aligner.split_sentences", side_effect=split_sentences
+        ) as mocked_split:
+            QuoteAligner.for_note(self.note, self.text)
+            aligner = QuoteAligner.for_note(self.note, self.text)
+            self.assertEqual(mocked_split.call_count, 1)
+            self.assertEqual(len(aligner.sentence_spans), 4)
+
+            # The sentences are split again when the text changes
+            aligner = QuoteAligner.for_note(self.note, "A new text.")
+            self.assertEqual(mocked_split.call_count, 2)
+            self.assertEqual(aligner.sentence_spans, [(0, 11)])
+        self.assertEqual(SentenceIndex.objects.filter(note=self.note).count(), 1)
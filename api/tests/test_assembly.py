@@ -0,0 +1,64 @@
+from django.test import SimpleTestCase
+
+from api.utils.assembly import AssemblyProcessor
+
+
+class TestAssemblyProcessor(SimpleTestCase):
+    def setUp(self) -> None:
+        texts = "We like it. We like the pricing. Support was slow.".split()
+        words = [
+            {"text": text, "start": i * 100, "end": i * 100 + 80}
+            for i, text in enumerate(texts)
+        ]
+        self.transcript = {
+            "id": "transcript",
+            "utterances": [
+                {"speaker": "A", "text": " ".join(texts[:6]), "words": words[:6]},
+                {"speaker": "B", "text": " ".join(texts[6:]), "words": words[6:]},
+            ],
+            "audio_duration": 1,
+            "language_code": "en_us",
+        }
+        return super().setUp()
+
+    def get_highlight_ids(self):
+        return [
+            word.get("highlight_ids", [])
+            for utterance in self.transcript["utterances"]
+            for word in utterance["words"]
+        ]
+
+    def test_highlight_all(self):
+        assembly = AssemblyProcessor(self.transcript)
+        results = assembly.highlight_all(
+            [
+                ("We like the pricing.", "first"),
+                ("pricing. Support", "second"),
+                ("like the pri", "third"),  # Does not end at a word boundary
+            ]
+        )
+        self.assertEqual(
+            results, [(True, 300, 680), (True, 600, 780), (False, None, None)]
+        )
+        self.assertEqual(
+            self.get_highlight_ids(),
+            [[], [], [], ["first"], ["first"], ["first"], ["first", "second"]]
+            + [["second"], [], []],
+        )
+
+    def test_time_range(self):
+        assembly = AssemblyProcessor(self.transcript)
+        self.assertEqual(assembly.get_text_in_range(250, 680), "We like the pricing.")
+
+        assembly.update_transcript_highlights(300, 480, "clip")
+        self.assertEqual(self.get_highlight_ids()[2:6], [[], ["clip"], ["clip"], []])
+        assembly.remove_transcript_highlight(300, 480, "clip")
+        self.assertEqual(self.get_highlight_ids()[2:6], [[], [], [], []])
+
+    def test_highlight_span(self):
+        assembly = AssemblyProcessor(self.transcript)
+        # "like the pricing" in the text of the index
+        self.assertEqual(assembly.highlight_span(15, 31, "first"), (400, 680))
+        self.assertEqual(
+            self.get_highlight_ids()[3:8], [[], ["first"], ["first"], ["first"], []]
+        )
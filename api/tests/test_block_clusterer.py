@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import TestCase
+
+from api.ai import config
+from api.ai.generators.block_clusterer import cluster_block, cluster_vectors
+from api.models.asset import Asset
+from api.models.block import Block
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+def create_vectors(centers, count, generator):
+    vectors = np.repeat(centers, count, axis=0)
+    vectors += 0.025 * generator.normal(size=vectors.shape)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestBlockClusterer(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        note = Note.objects.create(title="note", project=self.project, author=self.user)
+        asset = Asset.objects.create(
+            title="asset", project=self.project, created_by=self.user
+        )
+        asset.notes.set([note])
+        self.block = Block.objects.create(type=Block.Type.THEMES, asset=asset)
+
+        generator = np.random.default_rng(0)
+        centers = generator.normal(size=(2, 1536))
+        vectors = create_vectors(centers, 3, generator)
+        self.takeaways = Takeaway.objects.bulk_create(
+            Takeaway(
+                id=f"takeaway{i}",
+                title=f"takeaway {i}",
+                note=note,
+                created_by=self.user,
+                vector=vector,
+            )
+            for i, vector in enumerate(vectors)
+        )
+        return super().setUp()
+
+    @patch("api.ai.generators.block_clusterer.get_chain")
+    def test_cluster_block(self, mocked_get_chain):
+        chain = MagicMock()
+        chain.batch.return_value = [
+            [
+                SimpleNamespace(
+                    themes=[
+                        SimpleNamespace(group=1, title="theme"),
+                        SimpleNamespace(group=2, title="theme"),
+                    ]
+                )
+            ]
+        ]
+        mocked_get_chain.return_value = chain
+        cluster_block(self.block, Takeaway.objects.all(), self.user)
+
+        # All the themes are titled in one call
+        chain.batch.assert_called_once()
+        self.assertEqual(len(chain.batch.call_args.args[0]), 1)
+        themes = self.block.themes.order_by("id")
+        self.assertEqual([theme.title for theme in themes], ["theme", "theme (2)"])
+        self.assertEqual(
+            [
+                sorted(theme.takeaways.values_list("title", flat=True))
+                for theme in themes
+            ],
+            [
+                ["takeaway 0", "takeaway 1", "takeaway 2"],
+                ["takeaway 3", "takeaway 4", "takeaway 5"],
+            ],
+        )
+
+    @patch.object(config, "block_theme_prompt_tokens", 8)
+    @patch("api.ai.generators.block_clusterer.get_chain")
+    def test_cluster_block_over_token_budget(self, mocked_get_chain):
+        chain = MagicMock()
+        # The llm leaves out the second group
+        chain.batch.return_value = [
+            [SimpleNamespace(themes=[SimpleNamespace(group=1, title="theme")])],
+            [SimpleNamespace(themes=[])],
+        ]
+        mocked_get_chain.return_value = chain
+        cluster_block(self.block, Takeaway.objects.all(), self.user)
+
+        # Each group is titled in its own call, with the takeaways within the budget
+        inputs = chain.batch.call_args.args[0]
+        self.assertEqual(
+            [input["text"] for input in inputs],
+            ["Group 1:\n- takeaway 0", "Group 2:\n- takeaway 3"],
+        )
+        themes = self.block.themes.order_by("id")
+        self.assertEqual([theme.title for theme in themes], ["theme", "Theme 2"])
+        self.assertEqual([theme.takeaways.count() for theme in themes], [3, 3])
+
+    @patch.object(config, "block_cluster_sample_size", 20)
+    def test_cluster_sampled_vectors(self):
+        generator = np.random.default_rng(0)
+        centers = generator.normal(size=(3, 1536))
+        vectors = create_vectors(centers, 50, generator)
+        labels = cluster_vectors(vectors)
+        self.assertEqual(labels.tolist(), [0] * 50 + [1] * 50 + [2] * 50)
+        self.assertEqual(cluster_vectors(vectors).tolist(), labels.tolist())
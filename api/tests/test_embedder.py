@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.ai.embedder import CachedEmbeddings, EmbeddingCoalescer
+from api.models.cache.embedding import Embedding
+
+
+def get_mocked_embeddings():
+    embeddings = MagicMock()
+    embeddings.model = "test-model"
+    embeddings.embed_documents.side_effect = lambda texts: [
+        [float(len(text))] * 1536 for text in texts
+    ]
+    return embeddings
+
+
+class TestEmbeddingCoalescer(SimpleTestCase):
+    def test_concurrent_requests_are_batched(self):
+        embeddings = get_mocked_embeddings()
+        started = threading.Event()
+        release = threading.Event()
+        embed_documents = embeddings.embed_documents.side_effect
+
+        def slow_embed_documents(texts):
+            started.set()
+            release.wait(5)
+            return embed_documents(texts)
+
+        embeddings.embed_documents.side_effect = slow_embed_documents
+        coalescer = EmbeddingCoalescer(embeddings, timeout=5)
+        results = {}
+
+        def embed(text):
+            results[text] = coalescer.embed_documents([text])[0]
+
+        threads = [
+            threading.Thread(target=embed, args=(text,)) for text in ["a", "bb", "ccc"]
+        ]
+        # The first request is embedded right away,
+        # the others wait for it and are embedded together
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while len(coalescer.pending) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(embeddings.embed_documents.call_count, 2)
+        calls = embeddings.embed_documents.call_args_list
+        self.assertEqual(calls[0].args[0], ["a"])
+        self.assertCountEqual(calls[1].args[0], ["bb", "ccc"])
+        self.assertEqual(results["bb"][0], 2.0)
+
+    def test_error_is_raised_to_all_requests(self):
+        embeddings = MagicMock()
+        embeddings.embed_documents.side_effect = RuntimeError("api error")
+        coalescer = EmbeddingCoalescer(embeddings, timeout=5)
+        with self.assertRaises(RuntimeError):
+            coalescer.embed_documents(["a"])
+        self.assertFalse(coalescer.is_embedding)
+
+    def test_stuck_batch_falls_back_to_embedding_directly(self):
+        embeddings = get_mocked_embeddings()
+        coalescer = EmbeddingCoalescer(embeddings, timeout=0.1)
+        # Like a batch whose thread died before resolving it
+        coalescer.is_embedding = True
+
+        vectors = coalescer.embed_documents(["bb"])
+        self.assertEqual(vectors[0][0], 2.0)
+        embeddings.embed_documents.assert_called_once_with(["bb"])
+        self.assertEqual(coalescer.pending, {})
+        self.assertFalse(coalescer.is_embedding)
+
+
+class TestCachedEmbeddings(APITestCase):
+    def test_cached_embeddings(self):
+        embeddings = get_mocked_embeddings()
+        embedder = CachedEmbeddings(embeddings, lru_size=1)
+
+        vectors = embedder.embed_documents(["a", "bb", "a"])
+        self.assertEqual([vector[0] for vector in vectors], [1.0, 2.0, 1.0])
+        embeddings.embed_documents.assert_called_once_with(["a", "bb"])
+        self.assertEqual(Embedding.objects.count(), 2)
+
+        # Served from the lru and the database without calling the api
+        self.assertEqual(embedder.embed_query("a")[0], 1.0)
+        self.assertEqual(embedder.embed_query("bb")[0], 2.0)
+        embeddings.embed_documents.assert_called_once()
+
+        self.assertEqual(embedder.blank_vector[0], 0.0)
+        self.assertEqual(embeddings.embed_documents.call_count, 2)
+
+    def test_cull(self):
+        embeddings = get_mocked_embeddings()
+        embedder = CachedEmbeddings(embeddings, max_entries=1)
+        embedder.embed_documents(["a", "bb", "ccc"])
+        # One entry expired, and one over the maximum used the least recently
+        Embedding.objects.filter(key=embedder.get_key("a")).update(
+            created_at=timezone.now() - embedder.ttl
+        )
+        Embedding.objects.filter(key=embedder.get_key("bb")).update(
+            accessed_at=timezone.now() - timedelta(days=1)
+        )
+
+        embedder.cull()
+        self.assertEqual(
+            list(Embedding.objects.values_list("key", flat=True)),
+            [embedder.get_key("ccc")],
+        )
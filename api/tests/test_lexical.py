@@ -0,0 +1,145 @@
+import numpy as np
+from rest_framework.test import APITestCase
+
+from api.models.asset import Asset
+from api.models.block import Block
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.theme import Theme
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.utils.lexical import LexicalProcessor
+
+
+class TestLexicalProcessor(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        note = Note.objects.create(title="note", project=self.project, author=self.user)
+        self.asset = Asset.objects.create(
+            title="asset", project=self.project, created_by=self.user
+        )
+
+        self.blocks = []
+        for i in range(3):
+            takeaways_block = Block.objects.create(
+                asset=self.asset, type=Block.Type.TAKEAWAYS
+            )
+            takeaways_block.takeaways.add(
+                Takeaway.objects.create(
+                    title=f"takeaway {i}",
+                    note=note,
+                    created_by=self.user,
+                    vector=np.random.rand(1536),
+                )
+            )
+            themes_block = Block.objects.create(
+                asset=self.asset, type=Block.Type.THEMES
+            )
+            Theme.objects.create(block=themes_block, title=f"theme {i}")
+            self.blocks.extend([takeaways_block, themes_block])
+        return super().setUp()
+
+    def get_content(self):
+        return {
+            "type": "root",
+            "children": [
+                {
+                    "type": "heading",
+                    "tag": "h2",
+                    "children": [{"type": "text", "text": "Title"}],
+                },
+                {
+                    "type": "paragraph",
+                    "children": [
+                        {"type": "text", "text": "Some "},
+                        {
+                            "type": "link",
+                            "url": "https://example.com",
+                            "children": [{"type": "text", "text": "link"}],
+                        },
+                    ],
+                },
+                {
+                    "type": "list",
+                    "children": [
+                        {
+                            "type": "listitem",
+                            "children": [{"type": "text", "text": "item"}],
+                        }
+                    ],
+                },
+                *[
+                    {"type": block.type, "block_id": block.id, "version": 1}
+                    for block in self.blocks
+                ],
+            ],
+        }
+
+    def test_to_markdown(self):
+        lexical = LexicalProcessor(self.get_content())
+        # The blocks and their takeaways and themes are fetched at once
+        with self.assertNumQueries(3):
+            markdown = lexical.to_markdown()
+        self.assertTrue(
+            markdown.startswith(
+                "## Title\n\nSome [link](https://example.com)\n\n- item\n\n"
+                "Takeaways:\n- takeaway 0\nThemes:\n- theme 0\n"
+            )
+        )
+        self.assertEqual(lexical.get_markdown_length(), len(markdown))
+        self.assertGreater(lexical.get_markdown_length(limit=10), 10)
+
+    def test_to_text(self):
+        lexical = LexicalProcessor(self.get_content())
+        self.assertEqual(lexical.to_text(), "Title\n\nSome link\n\nitem\n\n\n\n")
+
+    def test_highlight_all(self):
+        content = {
+            "type": "root",
+            "children": [
+                {
+                    "type": "paragraph",
+                    "children": [
+                        {"type": "text", "text": "Hello world. ", "format": 0},
+                        {"type": "text", "text": "Bold part", "format": 1},
+                    ],
+                },
+                {
+                    "type": "paragraph",
+                    "children": [
+                        {
+                            "type": "mark",
+                            "ids": ["existing"],
+                            "children": [{"type": "text", "text": "Marked text"}],
+                        },
+                    ],
+                },
+            ],
+        }
+        lexical = LexicalProcessor(content)
+        found = lexical.highlight_all(
+            [
+                ("world. Bold", "first"),
+                ("Bold part Marked", "second"),
+                ("missing", "third"),
+            ]
+        )
+        self.assertEqual(found, [True, True, False])
+        marks = [
+            (node.dict["ids"], node.to_text())
+            for node in lexical.find_all("mark", recursive=True)
+        ]
+        self.assertEqual(
+            marks,
+            [
+                (["first"], "world. "),
+                (["first", "second"], "Bold"),
+                (["second"], " part"),
+                (["existing", "second"], "Marked"),
+                (["existing"], " text"),
+            ],
+        )
+        self.assertEqual(lexical.to_text(), "Hello world. Bold part\n\nMarked text\n\n")
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+from rest_framework.test import APITestCase
+
+from api.ai.cache import LLMResponseCache
+from api.ai.generators.utils import token_tracker
+from api.models.cache.llm_response import LLMResponse
+from api.models.project import Project
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+class TestLLMResponseCache(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        self.cache = LLMResponseCache(ttl=timedelta(days=1), max_entries=2)
+        self.generations = [
+            ChatGeneration(
+                message=AIMessage(
+                    content="output",
+                    usage_metadata={
+                        "input_tokens": 10,
+                        "output_tokens": 5,
+                        "total_tokens": 15,
+                    },
+                )
+            )
+        ]
+        return super().setUp()
+
+    def test_lookup(self):
+        self.assertIsNone(self.cache.lookup("prompt", "llm"))
+        self.cache.update("prompt", "llm", self.generations)
+
+        generations = self.cache.lookup("prompt", "llm")
+        self.assertEqual(generations[0].message.content, "output")
+        self.assertIsNone(generations[0].message.usage_metadata)
+        # The key includes both the prompt and the llm parameters
+        self.assertIsNone(self.cache.lookup("prompt", "other llm"))
+        self.assertIsNone(self.cache.lookup("other prompt", "llm"))
+
+    def test_expired_entries(self):
+        self.cache.update("prompt", "llm", self.generations)
+        LLMResponse.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.assertIsNone(self.cache.lookup("prompt", "llm"))
+
+    def test_evict_least_recently_used(self):
+        self.cache.update("prompt 1", "llm", self.generations)
+        self.cache.update("prompt 2", "llm", self.generations)
+        self.cache.lookup("prompt 1", "llm")
+        self.cache.update("prompt 3", "llm", self.generations)
+
+        self.assertEqual(LLMResponse.objects.count(), 2)
+        self.assertIsNone(self.cache.lookup("prompt 2", "llm"))
+        self.assertIsNotNone(self.cache.lookup("prompt 1", "llm"))
+
+    def test_token_tracker_reports_cache_hits(self):
+        self.cache.update("prompt", "llm", self.generations)
+        with token_tracker(self.project, self.project, "action", self.user):
+            self.cache.lookup("prompt", "llm")
+            self.cache.lookup("other prompt", "llm")
+
+        token_usages = self.project.token_usages.order_by("action")
+        self.assertEqual(
+            list(token_usages.values_list("action", "value")),
+            [("action", 0), ("action-cache-hit", 0)],
+        )
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from api.utils.html import HtmlProcessor
+from api.utils.markdown import MarkdownProcessor
+
+golden_dir = Path("api/tests/files/lexical")
+
+
+class TestMarkdownToLexical(SimpleTestCase):
+    """
+    The golden files hold the lexical json exported by the frontend editor
+    for each markdown file in the directory, written by
+    `manage.py lexical_fixtures` against a running frontend.
+    """
+
+    def test_golden_files(self):
+        markdown_paths = sorted(golden_dir.glob("*.md"))
+        self.assertTrue(markdown_paths)
+        for markdown_path in markdown_paths:
+            with self.subTest(markdown_path.stem):
+                json_path = markdown_path.with_suffix(".json")
+                self.assertTrue(
+                    json_path.exists(), f"Run lexical_fixtures to export {json_path}."
+                )
+                expected = json.loads(json_path.read_text())
+                lexical = MarkdownProcessor(markdown_path.read_text()).to_lexical()
+                self.assertEqual(lexical, expected)
+
+    def test_empty_markdown(self):
+        lexical = MarkdownProcessor("").to_lexical()
+        self.assertEqual(lexical["root"]["children"], [])
+        self.assertIsNone(lexical["root"]["direction"])
+
+    def test_html_whitespace(self):
+        lexical = HtmlProcessor(
+            "<p>\n  Some   <b>bold </b> text \n</p>\n<ul>\n<li> item </li>\n</ul>"
+        ).to_lexical()
+        paragraph, list_ = lexical["root"]["children"]
+        self.assertEqual(
+            [(node["text"], node["format"]) for node in paragraph["children"]],
+            [("Some ", 0), ("bold ", 1), ("text", 0)],
+        )
+        self.assertEqual(list_["children"][0]["children"][0]["text"], "item")
@@ -1,4 +1,5 @@
 import logging
+from unittest.mock import MagicMock, patch
 
 import numpy as np
 from rest_framework import status
@@ -12,6 +13,7 @@ from api.models.organization import Organization
 from api.models.project import Project
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.utils.orphans import delete_orphans
 
 
 # Create your tests here.
@@ -89,12 +91,14 @@ class TestNoteRetrieveUpdateDeleteView(APITestCase):
         )
         self.single_line_highlight = Highlight.objects.create(
             title="sample",
+            quote="sample",
             note=self.note,
             created_by=self.user,
             vector=np.random.rand(1536),
         )
         self.multiline_highlight = Highlight.objects.create(
             title="only.This",
+            quote="only.This",
             note=self.note,
             created_by=self.user,
             vector=np.random.rand(1536),
@@ -211,6 +215,95 @@ class TestNoteRetrieveUpdateDeleteView(APITestCase):
         last_created_highlight = self.note.highlights.order_by("created_at").last()
         self.assertTrue(last_created_highlight.title, "only.This")
 
+    @patch("api.serializers.note.embedder")
+    def test_new_highlight_quote_is_embedded(self, mocked_embedder: MagicMock):
+        mocked_embedder.embed_documents.side_effect = lambda texts: [
+            np.ones(1536) for _ in texts
+        ]
+        self.client.force_authenticate(self.user)
+        url = f"/api/reports/{self.note.id}/"
+        content = self.note.content
+        content["root"]["children"][1]["children"][1:2] = [
+            {"text": " is a ", "type": "text"},
+            {
+                "type": "mark",
+                "ids": [None],
+                "children": [{"text": "sample", "type": "text"}],
+            },
+            {"text": " text in the second block.", "type": "text"},
+        ]
+        response = self.client.patch(url, data={"content": content})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Only the new quote is embedded
+        mocked_embedder.embed_documents.assert_called_once_with(["sample"])
+        highlight = self.note.highlights.exclude(
+            takeaway_ptr_id__in=[
+                self.single_line_highlight.id,
+                self.multiline_highlight.id,
+            ]
+        ).get()
+        self.assertEqual(highlight.quote, "sample")
+        self.assertTrue(np.array_equal(highlight.vector, np.ones(1536)))
+        # The id of the new highlight is saved in the content
+        self.note.refresh_from_db()
+        mark = self.note.content["root"]["children"][1]["children"][1]
+        self.assertEqual(mark["ids"], [highlight.id])
+
+    @patch("api.serializers.note.embedder")
+    def test_changed_highlight_quote_is_embedded(self, mocked_embedder: MagicMock):
+        mocked_embedder.embed_documents.side_effect = lambda texts: [
+            np.ones(1536) for _ in texts
+        ]
+        self.client.force_authenticate(self.user)
+        url = f"/api/reports/{self.note.id}/"
+        content = self.note.content
+        mark = content["root"]["children"][0]["children"][1]
+        mark["children"][0]["text"] = "sample text"
+        content["root"]["children"][0]["children"][2]["text"] = " only."
+        response = self.client.patch(url, data={"content": content})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_embedder.embed_documents.assert_called_once_with(["sample text"])
+        self.single_line_highlight.refresh_from_db()
+        self.assertEqual(self.single_line_highlight.quote, "sample text")
+        self.assertTrue(
+            np.array_equal(self.single_line_highlight.vector, np.ones(1536))
+        )
+        self.assertEqual(self.note.highlights.count(), self.highlight_count)
+
+    @patch("api.serializers.note.embedder")
+    def test_unchanged_highlight_quote_is_not_embedded(
+        self, mocked_embedder: MagicMock
+    ):
+        self.client.force_authenticate(self.user)
+        url = f"/api/reports/{self.note.id}/"
+        response = self.client.patch(url, data={"content": self.note.content})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_embedder.embed_documents.assert_not_called()
+        self.assertEqual(self.note.highlights.count(), self.highlight_count)
+        self.single_line_highlight.refresh_from_db()
+        self.assertEqual(self.single_line_highlight.quote, "sample")
+
+    @patch("api.serializers.note.embedder")
+    def test_removed_highlight_is_deleted(self, mocked_embedder: MagicMock):
+        self.client.force_authenticate(self.user)
+        url = f"/api/reports/{self.note.id}/"
+        content = self.note.content
+        # Unmark the single line highlight
+        content["root"]["children"][0]["children"][1] = {
+            "text": "sample",
+            "type": "text",
+        }
+        response = self.client.patch(url, data={"content": content})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mocked_embedder.embed_documents.assert_not_called()
+        self.assertFalse(
+            Highlight.objects.filter(id=self.single_line_highlight.id).exists()
+        )
+        self.assertEqual(
+            list(self.note.highlights.values_list("takeaway_ptr_id", flat=True)),
+            [self.multiline_highlight.id],
+        )
+
     def test_remove_content(self):
         self.client.force_authenticate(self.user)
         url = f"/api/reports/{self.note.id}/"
@@ -241,7 +334,8 @@ class TestNoteRetrieveUpdateDeleteView(APITestCase):
         self.note.refresh_from_db()
         self.assertEqual(self.note.highlights.count(), 0)
 
-    def test_user_update_note_organization(self):
+    @patch("api.tasks.delete_orphans.delay", side_effect=delete_orphans)
+    def test_user_update_note_organization(self, mocked_delay):
         self.client.force_authenticate(self.user)
         url = f"/api/reports/{self.note.id}/"
 
@@ -255,7 +349,8 @@ class TestNoteRetrieveUpdateDeleteView(APITestCase):
 
         # Test replace organization
         data = {"organizations": [{"name": "replaced organization"}]}
-        response = self.client.patch(url, data=data)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, data=data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.note.organizations.count(), 1)
         organization2 = self.note.organizations.first()
@@ -0,0 +1,128 @@
+import logging
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models.project import Project
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.models.workspace_user import WorkspaceUser
+from api.permissions import (
+    get_generation,
+    get_generation_cache_key,
+    get_membership_cache_key,
+    query_membership,
+)
+
+
+class TestProjectPermission(APITestCase):
+    shared_cache = False
+
+    def setUp(self) -> None:
+        """Reduce the log level to avoid errors like 'not found'"""
+        logger = logging.getLogger("django.request")
+        self.previous_level = logger.getEffectiveLevel()
+        logger.setLevel(logging.ERROR)
+
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="password")
+        self.user = User.objects.create_user(username="user", password="password")
+        self.workspace = Workspace.objects.create(name="workspace", owned_by=self.owner)
+        self.workspace.members.add(self.owner, through_defaults={"role": "Owner"})
+        self.workspace.members.add(self.user, through_defaults={"role": "Editor"})
+        self.project = Project.objects.create(name="project", workspace=self.workspace)
+        self.project.users.add(self.owner, self.user)
+        self.url = f"/api/projects/{self.project.id}/"
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        """Reset the log level back to normal"""
+        logger = logging.getLogger("django.request")
+        logger.setLevel(self.previous_level)
+        return super().tearDown()
+
+    def test_project_users_change(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.project.users.remove(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.user.projects.add(self.project)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_workspace_role_change(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(self.url, {"name": "new name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        workspace_user = WorkspaceUser.objects.get(user=self.user)
+        workspace_user.role = WorkspaceUser.Role.VIEWER
+        workspace_user.save()
+        response = self.client.patch(self.url, {"name": "other name"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_memberships_cache(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Only a shared cache keeps the memberships, not the local test cache
+        generation = cache.get(get_generation_cache_key(self.user.id))
+        key = get_membership_cache_key(
+            self.user.id, generation, self.workspace.id, self.project.id
+        )
+        self.assertEqual(cache.get(key) is not None, self.shared_cache)
+
+    def test_removed_member_requesting_other_projects(self):
+        other_project = Project.objects.create(name="other", workspace=self.workspace)
+        other_project.users.add(self.user)
+        clock = Mock()
+        clock.time.return_value = 0
+        self.client.force_authenticate(self.user)
+        with patch("django.core.cache.backends.base.time", clock), patch(
+            "django.core.cache.backends.locmem.time", clock
+        ):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            # Removed without signals, the cached membership expires anyway
+            Project.users.through.objects.filter(
+                project=self.project, user=self.user
+            ).delete()
+            for seconds in [10, 20, 30]:
+                clock.time.return_value = seconds
+                response = self.client.get(f"/api/projects/{other_project.id}/")
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_membership_cached_after_invalidation(self):
+        # A request reads the memberships before the removal and caches them after
+        generation = get_generation(self.user.id)
+        membership = query_membership(self.user, self.workspace, self.project)
+        self.project.users.remove(self.user)
+        key = get_membership_cache_key(
+            self.user.id, generation, self.workspace.id, self.project.id
+        )
+        cache.set(key, membership)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestProjectPermissionWithSharedCache(TestProjectPermission):
+    """The membership changes are seen through the cache when it is shared."""
+
+    shared_cache = True
+
+    def setUp(self) -> None:
+        patcher = patch("api.permissions.is_cache_shared", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return super().setUp()
@@ -55,6 +55,19 @@ class TestPlaybookRetrieveUpdateDeleteView(APITestCase):
         self.assertEqual(response.data["title"], self.playbook.title)
         self.assertEqual(response.data["description"], self.playbook.description)
 
+    def test_retrieve_playbook_not_modified(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        etag = response.headers["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # A new video version changes the ETag
+        Playbook.objects.filter(id=self.playbook.id).update(video_version=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
     def test_update_playbook_success(self):
         data = {
             "title": "Updated Playbook Title",
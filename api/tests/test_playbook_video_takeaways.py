@@ -1,6 +1,9 @@
 import io
 import logging
+import os
+from unittest.mock import patch
 
+import ffmpeg
 import numpy as np
 from django.conf import settings
 from django.core.files.base import ContentFile
@@ -15,6 +18,27 @@ from api.models.playbook_takeaway import PlaybookTakeaway
 from api.models.project import Project
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.utils import media
+
+
+def get_video_packets(path: str) -> list[str]:
+    """Hashes of the video packets of the file, kept as is by a stream copy."""
+    out, err = (
+        ffmpeg.input(path)
+        .output(
+            "pipe:1",
+            map="0:v",
+            codec="copy",
+            bsf="h264_mp4toannexb",
+            format="framemd5",
+        )
+        .run(quiet=True)
+    )
+    return [
+        line.split(",")[-1].strip()
+        for line in out.decode().splitlines()
+        if not line.startswith("#")
+    ]
 
 
 class TestPlaybookVideoTakeawaysListCreateView(APITestCase):
@@ -93,6 +117,23 @@ class TestPlaybookVideoTakeawaysListCreateView(APITestCase):
         expected_duration = 0.677
         self.assertAlmostEqual(duration_in_seconds, expected_duration, places=2)
 
+    @patch("api.tasks.render_playbook_video.apply_async")
+    def test_create_playbook_takeaway_schedules_video_render(self, mocked_apply_async):
+        data = {"takeaway_id": self.takeaway_2.id, "order": 2}
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # The video is rendered in the background, not in the request
+        self.playbook.refresh_from_db()
+        self.assertEqual(self.playbook.video_version, 1)
+        self.assertEqual(self.playbook.rendered_video_version, 0)
+        mocked_apply_async.assert_called_once()
+        args, kwargs = mocked_apply_async.call_args
+        self.assertEqual(args, ((self.playbook.id, 1),))
+        self.assertGreater(kwargs["countdown"], 0)
+
     def test_create_playbook_takeaway_order(self):
         data = {"takeaway_id": self.takeaway_2.id, "order": 2}
         self.client.force_authenticate(self.user)
@@ -133,3 +174,66 @@ class TestPlaybookVideoTakeawaysListCreateView(APITestCase):
             error_messages,
             f"Expected error message '{expected_error_message}' for takeaway_id.",
         )
+
+    def test_render_video(self):
+        Playbook.objects.filter(id=self.playbook.id).update(video_version=1)
+        self.playbook.render_video(1)
+        self.playbook.refresh_from_db()
+        self.assertEqual(self.playbook.rendered_video_version, 1)
+        first_video_path = self.playbook.video.path
+        first_thumbnail_path = self.playbook.thumbnail.path
+        self.assertTrue(os.path.exists(first_video_path))
+
+        # Only the clip of the new takeaway is encoded again
+        PlaybookTakeaway.objects.create(
+            playbook=self.playbook, takeaway=self.takeaway_2, order=2
+        )
+        Playbook.objects.filter(id=self.playbook.id).update(video_version=2)
+        with patch(
+            "api.utils.media.normalize_media_file", wraps=media.normalize_media_file
+        ) as mocked_normalize:
+            self.playbook.render_video(2)
+        mocked_normalize.assert_called_once()
+        self.playbook.refresh_from_db()
+        self.assertEqual(self.playbook.rendered_video_version, 2)
+        self.assertEqual(self.playbook.video_size, self.playbook.video.size)
+        self.addCleanup(self.playbook.video.delete, save=False)
+        self.addCleanup(self.playbook.thumbnail.delete, save=False)
+
+        # The replaced files of the previous render are deleted
+        self.assertFalse(os.path.exists(first_video_path))
+        self.assertFalse(os.path.exists(first_thumbnail_path))
+
+        # The segments are joined with stream copy, in the order of the takeaways
+        segment_paths = [
+            self.takeaway_1.segment.file.path,
+            self.takeaway_2.segment.file.path,
+        ]
+        self.addCleanup(self.takeaway_1.segment.file.delete, save=False)
+        duration = float(mediainfo(self.playbook.video.path)["duration"])
+        expected_duration = sum(
+            float(mediainfo(path)["duration"]) for path in segment_paths
+        )
+        self.assertAlmostEqual(duration, expected_duration, delta=0.1)
+        self.assertEqual(
+            get_video_packets(self.playbook.video.path),
+            [packet for path in segment_paths for packet in get_video_packets(path)],
+        )
+
+        # The segment file is deleted with the highlight
+        with self.captureOnCommitCallbacks(execute=True):
+            self.takeaway_2.delete()
+        self.assertFalse(os.path.exists(segment_paths[1]))
+
+        # Without clips, the video and the thumbnail are removed
+        video_path = self.playbook.video.path
+        thumbnail_path = self.playbook.thumbnail.path
+        PlaybookTakeaway.objects.filter(playbook=self.playbook).delete()
+        Playbook.objects.filter(id=self.playbook.id).update(video_version=3)
+        self.playbook.render_video(3)
+        self.playbook.refresh_from_db()
+        self.assertFalse(self.playbook.video)
+        self.assertFalse(self.playbook.thumbnail)
+        self.assertIsNone(self.playbook.thumbnail_size)
+        self.assertFalse(os.path.exists(video_path))
+        self.assertFalse(os.path.exists(thumbnail_path))
@@ -1,16 +1,21 @@
+import json
 import logging
 from unittest.mock import patch
 
 import numpy as np
+from django_celery_results.models import TaskResult
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.models.asset import Asset
+from api.models.block import Block
 from api.models.note import Note
 from api.models.project import Project
 from api.models.takeaway import Takeaway
 from api.models.takeaway_type import TakeawayType
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.tasks import analyze_asset_note, assemble_asset
 
 
 # Create your tests here.
@@ -93,3 +98,38 @@ class TestProjectAssetAnalyzeCreateView(APITestCase):
         self.client.force_authenticate(user=self.user)
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_advance_progress_of_parallel_subtasks(self):
+        TaskResult.objects.create(
+            task_id="parent",
+            status="PROGRESS",
+            result=json.dumps({"step": "analyzing report", "current": 0, "total": 2}),
+        )
+        with patch("api.tasks.ExistingNoteAnalyzer"):
+            for _ in range(2):
+                analyze_asset_note("parent", self.note.id, [], 2, self.user.id)
+        result = TaskResult.objects.get(task_id="parent")
+        self.assertEqual(result.status, "PROGRESS")
+        self.assertEqual(
+            json.loads(result.result),
+            {"step": "analyzing report", "current": 2, "total": 2},
+        )
+
+    @patch("api.tasks.AssetAnalyzer.assemble")
+    def test_assemble_asset_in_takeaway_type_order(self, mocked_assemble):
+        TaskResult.objects.create(task_id="parent", status="PROGRESS")
+        asset = Asset.objects.create(project=self.project, created_by=self.user)
+        block1 = asset.blocks.create(type=Block.Type.THEMES)
+        block2 = asset.blocks.create(type=Block.Type.THEMES)
+        assemble_asset(
+            [block2.id, block1.id],
+            "parent",
+            asset.id,
+            [self.takeaway_type1.id, self.takeaway_type2.id],
+            self.user.id,
+        )
+        mocked_assemble.assert_called_once_with(
+            asset,
+            [(self.takeaway_type1, block2), (self.takeaway_type2, block1)],
+            self.user,
+        )
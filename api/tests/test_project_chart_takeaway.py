@@ -1,6 +1,8 @@
 import logging
+from unittest.mock import patch
 
 import numpy as np
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APITestCase
 
@@ -8,9 +10,13 @@ from api.models.keyword import Keyword
 from api.models.note import Note
 from api.models.organization import Organization
 from api.models.project import Project
+from api.models.tag import Tag
 from api.models.takeaway import Takeaway
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.serializers.chart.takeaway import ChartTakeawaySerializer
+from api.utils.orphans import delete_orphans
+from api.utils.rollups import refresh_rollups, refresh_takeaway_rollups
 
 
 # Create your tests here.
@@ -64,6 +70,14 @@ class TestSavedTakeawayView(APITestCase):
 
         keyword = Keyword.objects.create(name="keyword")
         self.note2.keywords.add(keyword)
+
+        tag1 = Tag.objects.create(name="tag 1", project=self.project)
+        tag2 = Tag.objects.create(name="tag 2", project=self.project)
+        self.takeaway1.tags.add(tag1, tag2)
+        self.takeaway2.tags.add(tag1)
+        self.takeaway2.priority = Takeaway.Priority.HIGH
+        self.takeaway2.save()
+        cache.clear()
         return super().setUp()
 
     def test_user_count_note(self):
@@ -118,3 +132,123 @@ class TestSavedTakeawayView(APITestCase):
         self.client.force_authenticate(self.outsider)
         response = self.client.post(url, data=data)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rollups_answer_query(self):
+        refresh_takeaway_rollups(self.project.id)
+        rollups = self.project.takeaway_rollups.all()
+        queryset = Takeaway.objects.filter(note__project=self.project)
+        aggregate = {"field": "takeaway", "function": "count", "distinct": True}
+        queries = [
+            {"filter": {}, "group_by": []},
+            {"filter": {}, "group_by": [{"field": "tag"}]},
+            {
+                "filter": {"tag": ["tag 1"]},
+                "group_by": [{"field": "tag"}, {"field": "priority"}],
+            },
+            {
+                "filter": {"priority": ["High"]},
+                "group_by": [
+                    {"field": "created_at", "trunc": "day"},
+                    {"field": "report_sentiment", "exclude_null": False},
+                ],
+            },
+        ]
+        for data in queries:
+            with self.subTest(data=data):
+                serializer = ChartTakeawaySerializer(
+                    data={**data, "aggregate": aggregate}
+                )
+                serializer.is_valid(raise_exception=True)
+                by_tag = serializer.get_rollup_split()
+                self.assertIsNotNone(by_tag)
+                expected = serializer.query(queryset)
+                results = serializer.query_rollups(rollups, by_tag)
+                if isinstance(expected, dict):
+                    self.assertEqual(results, expected)
+                else:
+                    self.assertCountEqual(list(results), list(expected))
+
+        # A takeaway with both tags would be counted twice in the rollups
+        data = {"filter": {"tag": ["tag 1", "tag 2"]}, "group_by": []}
+        serializer = ChartTakeawaySerializer(data={**data, "aggregate": aggregate})
+        serializer.is_valid(raise_exception=True)
+        self.assertIsNone(serializer.get_rollup_split())
+
+    @patch("api.tasks.delete_orphans.delay", side_effect=delete_orphans)
+    @patch("api.tasks.refresh_chart_rollups.delay", side_effect=refresh_rollups)
+    def test_chart_cache_is_invalidated(self, mocked_refresh, mocked_delay):
+        data = {
+            "filter": {},
+            "group_by": [{"field": "priority", "exclude_null": False}],
+            "aggregate": {"field": "takeaway", "function": "count"},
+            "order_by": ["priority"],
+        }
+        url = f"/api/projects/{self.project.id}/charts/takeaways/"
+        self.client.force_authenticate(self.user)
+        refresh_takeaway_rollups(self.project.id)
+        response = self.client.post(url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            [
+                {"priority": "High", "takeaway_distinct_count": 1},
+                {"priority": None, "takeaway_distinct_count": 2},
+            ],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/takeaways/{self.takeaway2.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        mocked_refresh.assert_called_once()
+
+        response = self.client.post(url, data=data, format="json")
+        self.assertEqual(
+            response.json(), [{"priority": None, "takeaway_distinct_count": 2}]
+        )
+
+    @patch("api.tasks.refresh_chart_rollups.delay", side_effect=refresh_rollups)
+    def test_chart_cache_is_invalidated_by_renames(self, mocked_refresh):
+        url = f"/api/projects/{self.project.id}/charts/takeaways/"
+        self.client.force_authenticate(self.user)
+        refresh_takeaway_rollups(self.project.id)
+
+        def get_labels(field):
+            data = {
+                "filter": {},
+                "group_by": [{"field": field}],
+                "aggregate": {"field": "takeaway", "function": "count"},
+                "order_by": [field],
+            }
+            response = self.client.post(url, data=data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [row[field] for row in response.json()]
+
+        self.assertEqual(get_labels("created_by_first_name"), [""])
+        self.assertEqual(get_labels("report_keyword"), ["keyword"])
+        self.assertEqual(get_labels("report_title"), ["note 1", "note 2"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(id=self.user.id)
+            user.first_name = "First"
+            user.save()
+            keyword = Keyword.objects.get(name="keyword")
+            keyword.name = "renamed"
+            keyword.save()
+            note = Note.objects.get(id=self.note1.id)
+            note.title = "renamed note"
+            note.save()
+        self.assertEqual(get_labels("created_by_first_name"), ["First"])
+        self.assertEqual(get_labels("report_keyword"), ["renamed"])
+        self.assertEqual(get_labels("report_title"), ["note 2", "renamed note"])
+
+        # The relations deleted with the keyword change the charts too
+        with self.captureOnCommitCallbacks(execute=True):
+            Keyword.objects.all().delete()
+        self.assertEqual(get_labels("report_keyword"), [])
+
+    def test_note_save_compares_loaded_values(self):
+        note = Note.objects.select_related("project__workspace").get(id=self.note1.id)
+        note.title = "renamed note"
+        # Only the update, the previous values were loaded with the note
+        with self.assertNumQueries(1):
+            note.save()
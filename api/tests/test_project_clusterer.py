@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import TestCase
+from django.utils import timezone
+
+from api.ai.generators.project_clusterer import cluster_project
+from api.models.key_theme import KeyTheme
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+class TestProjectClusterer(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        self.note = Note.objects.create(
+            title="note", project=self.project, author=self.user
+        )
+        self.generator = np.random.default_rng(0)
+        self.centers = self.generator.normal(size=(2, 1536))
+        for i, center in enumerate(self.centers):
+            for j in range(5):
+                self.create_takeaway(f"theme {i} takeaway {j}", center)
+        return super().setUp()
+
+    def create_takeaway(self, title, center, noise=0.05):
+        vector = center + noise * self.generator.normal(size=1536)
+        return Takeaway.objects.create(
+            title=title,
+            note=self.note,
+            created_by=self.user,
+            vector=vector / np.linalg.norm(vector),
+        )
+
+    def get_chain(self):
+        chain = MagicMock()
+        chain.invoke.return_value = {
+            "clusters": [
+                {"cluster": "Cluster 0", "topic": "topic 0"},
+                {"cluster": "Cluster 1", "topic": "topic 1"},
+            ]
+        }
+        return chain
+
+    @patch("api.ai.generators.project_clusterer.get_chain")
+    def test_cluster_project(self, mocked_get_chain):
+        chain = mocked_get_chain.return_value = self.get_chain()
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 1)
+        self.assertEqual(KeyTheme.objects.filter(project=self.project).count(), 2)
+        self.assertCountEqual(
+            [
+                (theme["title"], sorted(theme["takeaways"])[0])
+                for theme in self.project.key_themes
+            ],
+            [("topic 0", "theme 0 takeaway 0"), ("topic 1", "theme 1 takeaway 0")],
+        )
+
+        # A new takeaway joins its theme without clustering again
+        self.create_takeaway("theme 1 takeaway 5", self.centers[1], noise=0.03)
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 1)
+        key_themes = {
+            theme["title"]: theme["takeaways"] for theme in self.project.key_themes
+        }
+        self.assertIn("theme 1 takeaway 5", key_themes["topic 1"])
+        self.assertEqual(len(key_themes["topic 0"]), 5)
+
+        # Takeaways unlike any theme make the project clustered again
+        for i in range(7):
+            self.create_takeaway(f"new takeaway {i}", self.generator.normal(size=1536))
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 2)
+
+    @patch("api.ai.generators.project_clusterer.get_chain")
+    def test_cluster_project_new_theme(self, mocked_get_chain):
+        chain = mocked_get_chain.return_value = self.get_chain()
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 1)
+
+        # Too few takeaways unlike the themes to cluster all the takeaways again,
+        # they are alike each other and form a new theme
+        center = self.generator.normal(size=1536)
+        for j in range(3):
+            self.create_takeaway(f"theme 2 takeaway {j}", center, noise=0.03)
+        chain.invoke.return_value = {
+            "clusters": [{"cluster": "Cluster 0", "topic": "topic 2"}]
+        }
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 2)
+        self.assertEqual(KeyTheme.objects.filter(project=self.project).count(), 3)
+        key_themes = {
+            theme["title"]: sorted(theme["takeaways"])
+            for theme in self.project.key_themes
+        }
+        self.assertEqual(
+            key_themes["topic 2"], [f"theme 2 takeaway {j}" for j in range(3)]
+        )
+        self.assertEqual(len(key_themes["topic 0"]), 5)
+
+    @patch("api.ai.generators.project_clusterer.get_chain")
+    def test_cluster_project_next_week(self, mocked_get_chain):
+        chain = mocked_get_chain.return_value = self.get_chain()
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 1)
+
+        # A week later, the clustered takeaways are past the window
+        # and the takeaways of the new week are like the themes
+        Takeaway.objects.update(created_at=timezone.now() - timedelta(days=8))
+        for i, center in enumerate(self.centers):
+            for j in range(5, 10):
+                self.create_takeaway(f"theme {i} takeaway {j}", center, noise=0.03)
+        cluster_project(self.project, self.user)
+        self.assertEqual(chain.invoke.call_count, 1)
+        key_themes = {
+            theme["title"]: sorted(theme["takeaways"])
+            for theme in self.project.key_themes
+        }
+        self.assertEqual(
+            key_themes["topic 1"], [f"theme 1 takeaway {j}" for j in range(5, 10)]
+        )
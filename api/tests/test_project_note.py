@@ -315,7 +315,10 @@ class TestProjectNoteListCreateView(APITestCase):
         # Mock the response for file content
         file_content_response = Mock()
         file_content_response.status_code = 200
-        file_content_response.content = b"File content from Google Drive"
+        file_content_response.iter_content.return_value = [
+            b"File content ",
+            b"from Google Drive",
+        ]
 
         # Assign the mocks to the return values of requests.get
         mock_get.side_effect = [file_metadata_response, file_content_response]
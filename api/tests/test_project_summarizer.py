@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from api.ai.analyzer.project_summarizer import ProjectSummarizer
+from api.models.note import Note
+from api.models.project import Project
+from api.models.project_summary_run import ProjectSummaryRun
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+@patch("api.ai.analyzer.project_summarizer.cluster_project")
+@patch("api.ai.analyzer.project_summarizer.summarize_project")
+class TestProjectSummarizer(TestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        Note.objects.create(
+            title="note", project=self.project, author=self.user, summary=["summary"]
+        )
+        return super().setUp()
+
+    def test_skip_unchanged_project(self, mocked_summarize, mocked_cluster):
+        summarizer = ProjectSummarizer()
+        run = summarizer.summarize_project(self.project, self.user)
+        self.assertEqual(run.status, ProjectSummaryRun.Status.SUCCEEDED)
+        run = summarizer.summarize_project(self.project, self.user)
+        self.assertEqual(run.status, ProjectSummaryRun.Status.SKIPPED)
+        self.assertEqual(mocked_summarize.call_count, 1)
+
+        Note.objects.create(title="new note", project=self.project, author=self.user)
+        run = summarizer.summarize_project(self.project, self.user)
+        self.assertEqual(run.status, ProjectSummaryRun.Status.SUCCEEDED)
+        self.assertEqual(mocked_summarize.call_count, 2)
+        self.assertEqual(mocked_cluster.call_count, 2)
+
+    def test_record_failure(self, mocked_summarize, mocked_cluster):
+        mocked_summarize.side_effect = ValueError("failed")
+        summarizer = ProjectSummarizer()
+        run = summarizer.summarize_project(self.project, self.user)
+        self.assertEqual(run.status, ProjectSummaryRun.Status.FAILED)
+        self.assertEqual(run.error, "failed")
+        mocked_cluster.assert_not_called()
+
+        # The failed project is summarized again in the next run
+        mocked_summarize.side_effect = None
+        run = summarizer.summarize_project(self.project, self.user)
+        self.assertEqual(run.status, ProjectSummaryRun.Status.SUCCEEDED)
@@ -0,0 +1,92 @@
+import logging
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models.note import Note
+from api.models.project import Project
+from api.models.tag import Tag
+from api.models.takeaway import Takeaway
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+class TestProjectTagListView(APITestCase):
+    def setUp(self) -> None:
+        """Reduce the log level to avoid errors like 'not found'"""
+        logger = logging.getLogger("django.request")
+        self.previous_level = logger.getEffectiveLevel()
+        logger.setLevel(logging.ERROR)
+
+        self.user = User.objects.create_user(username="user", password="password")
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        workspace.members.add(self.user, through_defaults={"role": "Editor"})
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        self.project.users.add(self.user)
+
+        self.note = Note.objects.create(
+            title="note", project=self.project, author=self.user
+        )
+        self.takeaway1 = Takeaway.objects.create(
+            title="takeaway 1",
+            note=self.note,
+            created_by=self.user,
+            vector=np.random.rand(1536),
+        )
+        self.takeaway2 = Takeaway.objects.create(
+            title="takeaway 2",
+            note=self.note,
+            created_by=self.user,
+            vector=np.random.rand(1536),
+        )
+        self.tag1 = Tag.objects.create(name="tag 1", project=self.project)
+        self.tag2 = Tag.objects.create(name="tag 2", project=self.project)
+
+        self.url = f"/api/projects/{self.project.id}/tags/"
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        """Reset the log level back to normal"""
+        logger = logging.getLogger("django.request")
+        logger.setLevel(self.previous_level)
+        return super().tearDown()
+
+    def get_takeaway_counts(self):
+        return dict(Tag.objects.values_list("name", "takeaway_count"))
+
+    def test_takeaway_counts_are_maintained(self):
+        self.takeaway1.tags.add(self.tag1, self.tag2)
+        self.tag1.takeaways.add(self.takeaway2)
+        self.assertEqual(self.get_takeaway_counts(), {"tag 1": 2, "tag 2": 1})
+
+        # Removing a tag that is not related does not change the count
+        self.takeaway2.tags.remove(self.tag1, self.tag2)
+        self.assertEqual(self.get_takeaway_counts(), {"tag 1": 1, "tag 2": 1})
+
+        self.takeaway2.tags.add(self.tag2)
+        self.takeaway1.delete()
+        self.assertEqual(self.get_takeaway_counts(), {"tag 1": 0, "tag 2": 1})
+
+        self.tag2.takeaways.clear()
+        self.assertEqual(self.get_takeaway_counts(), {"tag 1": 0, "tag 2": 0})
+
+    def test_reconcile_tag_counts(self):
+        self.takeaway1.tags.add(self.tag1)
+        Tag.objects.update(takeaway_count=10)
+        call_command("reconcile_tag_counts", stdout=StringIO())
+        self.assertEqual(self.get_takeaway_counts(), {"tag 1": 1, "tag 2": 0})
+
+    def test_user_list_project_tags(self):
+        self.takeaway1.tags.add(self.tag1, self.tag2)
+        self.takeaway2.tags.add(self.tag2)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(tag["name"], tag["takeaway_count"]) for tag in response.json()],
+            [("tag 2", 2), ("tag 1", 1)],
+        )
@@ -1,4 +1,5 @@
 import logging
+from unittest.mock import MagicMock, patch
 
 import numpy as np
 from rest_framework import status
@@ -132,3 +133,52 @@ class TestProjectTakeawayListView(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         response_takeaway_ids = [takeaway["id"] for takeaway in response.json()]
         self.assertCountEqual(response_takeaway_ids, [self.takeaway2.id])
+
+    @patch("api.filters.backends.embedder")
+    def test_user_query_project_takeaways(self, mocked_embedder: MagicMock):
+        mocked_embedder.embed_query.return_value = self.takeaway2.vector
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f"{self.url}?query=%20Takeaway%20%202%20")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_takeaway_ids = [takeaway["id"] for takeaway in response.json()]
+        self.assertEqual(response_takeaway_ids[0], self.takeaway2.id)
+        # The whitespace is collapsed before embedding, the case is kept
+        mocked_embedder.embed_query.assert_called_once_with("Takeaway 2")
+
+    @patch("api.filters.backends.embedder")
+    def test_user_hybrid_query_project_takeaways(self, mocked_embedder: MagicMock):
+        mocked_embedder.embed_query.return_value = self.takeaway2.vector
+        self.takeaway1.title = "The onboarding is confusing"
+        self.takeaway1.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(f"{self.url}?query=onboarding&query_mode=hybrid")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_takeaway_ids = [takeaway["id"] for takeaway in response.json()]
+        self.assertEqual(response_takeaway_ids, [self.takeaway1.id])
+
+        # Fall back to semantic search when nothing matches lexically
+        response = self.client.get(f"{self.url}?query=pricing&query_mode=hybrid")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response_takeaway_ids = [takeaway["id"] for takeaway in response.json()]
+        self.assertEqual(response_takeaway_ids, [self.takeaway2.id, self.takeaway1.id])
+
+    @patch("api.filters.backends.embedder")
+    def test_user_fusion_query_project_takeaways(self, mocked_embedder: MagicMock):
+        mocked_embedder.embed_query.return_value = self.takeaway2.vector
+        self.takeaway1.title = "The onboarding is confusing"
+        self.takeaway1.save()
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(f"{self.url}?query=onboarding&query_mode=fusion")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        takeaways = response.json()
+        # takeaway1 is ranked by both the full text and the vector search
+        self.assertEqual(
+            [takeaway["id"] for takeaway in takeaways],
+            [self.takeaway1.id, self.takeaway2.id],
+        )
+        self.assertGreater(takeaways[0]["relevance"], takeaways[1]["relevance"])
+
+        response = self.client.get(f"{self.url}?query=onboarding")
+        self.assertNotIn("relevance", response.json()[0])
@@ -0,0 +1,146 @@
+from unittest.mock import Mock, patch
+
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models.note import Note
+from api.models.project import Project
+from api.models.upload import Upload
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.tasks import delete_stale_uploads, process_note_file_for_streaming
+
+
+class TestProjectUploadView(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        self.outsider = User.objects.create_user(
+            username="outsider", password="password"
+        )
+        workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        workspace.members.add(self.user, through_defaults={"role": "Editor"})
+        self.project = Project.objects.create(name="project", workspace=workspace)
+        self.project.users.add(self.user)
+        self.content = b"File content from a chunked upload."
+        return super().setUp()
+
+    def put_chunk(self, upload_id, start, end):
+        url = f"/api/projects/{self.project.id}/uploads/{upload_id}/"
+        return self.client.put(
+            url,
+            data=self.content[start:end],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.content)}",
+        )
+
+    @patch.object(Upload, "min_part_size", 10)
+    @patch("api.tasks.analyze_new_note.delay_on_commit")
+    def test_user_upload_file_in_chunks(self, mocked_analyze: Mock):
+        self.client.force_authenticate(self.user)
+        url = f"/api/projects/{self.project.id}/uploads/"
+        data = {"file_name": "upload.txt", "size": len(self.content)}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.json()["id"]
+
+        # Chunks smaller than the part size are only allowed at the end
+        response = self.put_chunk(upload_id, 0, 5)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.put_chunk(upload_id, 0, 20)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["offset"], 20)
+        self.assertFalse(response.json()["is_complete"])
+
+        # A retried chunk returns the current offset to resume from
+        response = self.put_chunk(upload_id, 0, 20)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()["offset"], 20)
+
+        response = self.put_chunk(upload_id, 20, len(self.content))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["is_complete"])
+
+        url = f"/api/projects/{self.project.id}/reports/"
+        data = {"title": "Report from upload", "upload_id": upload_id}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mocked_analyze.assert_called_once()
+
+        note = Note.objects.get(id=response.json()["id"])
+        self.assertEqual(note.file.read(), self.content)
+        self.assertEqual(note.file_type, "txt")
+        self.assertEqual(note.file_size, len(self.content))
+        self.assertFalse(Upload.objects.filter(id=upload_id).exists())
+        note.file.delete()
+
+    def test_user_create_report_with_incomplete_upload(self):
+        upload = Upload(project=self.project, created_by=self.user, size=10)
+        upload.start("upload.txt")
+        upload.save()
+
+        self.client.force_authenticate(self.user)
+        url = f"/api/projects/{self.project.id}/reports/"
+        data = {"title": "Report from upload", "upload_id": upload.id}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = f"/api/projects/{self.project.id}/uploads/{upload.id}/"
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Upload.objects.filter(id=upload.id).exists())
+
+    def test_user_upload_unsupported_file(self):
+        self.client.force_authenticate(self.user)
+        url = f"/api/projects/{self.project.id}/uploads/"
+        data = {"file_name": "upload.exe", "size": 10}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_outsider_upload_file(self):
+        self.client.force_authenticate(self.outsider)
+        url = f"/api/projects/{self.project.id}/uploads/"
+        data = {"file_name": "upload.txt", "size": 10}
+        response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_stale_uploads(self):
+        uploads = []
+        for _ in range(2):
+            upload = Upload(project=self.project, created_by=self.user, size=10)
+            upload.start("upload.txt")
+            upload.save()
+            uploads.append(upload)
+        stale_upload, upload = uploads
+        Upload.objects.filter(id=stale_upload.id).update(
+            created_at=timezone.now() - Upload.max_age
+        )
+
+        delete_stale_uploads()
+        self.assertFalse(Upload.objects.filter(id=stale_upload.id).exists())
+        self.assertFalse(default_storage.exists(stale_upload.name))
+        self.assertTrue(Upload.objects.filter(id=upload.id).exists())
+        upload.abort()
+
+    def test_process_note_file_for_streaming(self):
+        with open("api/tests/files/test_takeaway_1.mp4", "rb") as file:
+            note = Note.objects.create(
+                title="note",
+                project=self.project,
+                author=self.user,
+                file=File(file, name="note.mp4"),
+            )
+        self.addCleanup(note.file.delete, save=False)
+        name = note.file.name
+
+        process_note_file_for_streaming(note.id)
+
+        # Replaced under the same name, so the url returned before still works
+        note.refresh_from_db()
+        self.assertEqual(note.file.name, name)
+        with note.file.open("rb") as file:
+            content = file.read()
+        self.assertLess(content.find(b"moov"), content.find(b"mdat"))
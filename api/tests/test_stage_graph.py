@@ -0,0 +1,87 @@
+import threading
+
+from django.test import SimpleTestCase, TestCase
+
+from api.ai.analyzer.utils.stage_graph import Stage, StageGraph, StageResult
+from api.models.project import Project
+from api.models.user import User
+from api.models.workspace import Workspace
+
+
+class TestStageGraph(SimpleTestCase):
+    def test_independent_stages_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        calls = []
+
+        def prepare():
+            calls.append("prepare")
+
+        def generate(name):
+            # Each stage waits for the other two, which only works if they run together.
+            barrier.wait()
+            calls.append(name)
+
+        stages = [Stage("prepare", prepare)] + [
+            Stage(name, lambda name=name: generate(name), depends_on=["prepare"])
+            for name in ["tasks", "templates", "metadata"]
+        ]
+        results = StageGraph(stages).run()
+
+        self.assertEqual(calls[0], "prepare")
+        self.assertCountEqual(calls[1:], ["tasks", "templates", "metadata"])
+        for result in results.values():
+            self.assertEqual(result.status, StageResult.SUCCESS)
+            self.assertGreaterEqual(result.duration, 0)
+
+    def test_failed_stage_skips_dependents(self):
+        def fail():
+            raise RuntimeError("failed")
+
+        calls = []
+        stages = [
+            Stage("prepare", fail),
+            Stage("generate", lambda: calls.append("generate"), ["prepare"]),
+            Stage("independent", lambda: calls.append("independent")),
+        ]
+        results = StageGraph(stages).run(raise_on_error=False)
+
+        self.assertEqual(calls, ["independent"])
+        self.assertEqual(results["prepare"].status, StageResult.FAILED)
+        self.assertEqual(results["generate"].status, StageResult.SKIPPED)
+        self.assertEqual(results["independent"].status, StageResult.SUCCESS)
+        with self.assertRaises(RuntimeError):
+            StageGraph(stages).run()
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            StageGraph([Stage("generate", lambda: None, ["prepare"])])
+
+
+class TestStageGraphInTransaction(TestCase):
+    def test_stages_see_uncommitted_rows(self):
+        # The test case runs in a transaction, like a request with ATOMIC_REQUESTS
+        user = User.objects.create_user(username="user", password="password")
+        threads = []
+
+        def prepare():
+            threads.append(threading.current_thread())
+            Workspace.objects.create(name="workspace", owned_by=user)
+
+        def generate(name):
+            threads.append(threading.current_thread())
+            workspace = Workspace.objects.get(owned_by=user)
+            Project.objects.create(name=name, workspace=workspace)
+
+        stages = [Stage("prepare", prepare)] + [
+            Stage(name, lambda name=name: generate(name), depends_on=["prepare"])
+            for name in ["tasks", "templates", "metadata"]
+        ]
+        results = StageGraph(stages).run()
+
+        for result in results.values():
+            self.assertEqual(result.status, StageResult.SUCCESS)
+        self.assertEqual(set(threads), {threading.current_thread()})
+        self.assertCountEqual(
+            Project.objects.values_list("name", flat=True),
+            ["tasks", "templates", "metadata"],
+        )
@@ -1,4 +1,5 @@
 import logging
+from unittest.mock import patch
 
 import numpy as np
 from rest_framework import status
@@ -11,6 +12,8 @@ from api.models.tag import Tag
 from api.models.takeaway import Takeaway
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.utils.orphans import delete_orphans
+from api.utils.rollups import refresh_rollups
 
 
 class TestTakeawayRetrieveUpdateDeleteView(APITestCase):
@@ -116,11 +119,14 @@ class TestTakeawayRetrieveUpdateDeleteView(APITestCase):
         self.assertEqual(self.takeaway.type, self.takeaway_type)
         self.assertEqual(self.takeaway.priority, Takeaway.Priority.HIGH)
 
-    def test_user_delete_takeaway(self):
+    @patch("api.tasks.delete_orphans.delay", side_effect=delete_orphans)
+    @patch("api.tasks.refresh_chart_rollups.delay", side_effect=refresh_rollups)
+    def test_user_delete_takeaway(self, mocked_refresh, mocked_delay):
         self.assertTrue(Takeaway.objects.filter(id=self.takeaway.id).exists())
         url = f"/api/takeaways/{self.takeaway.id}/"
         self.client.force_authenticate(self.user)
-        response = self.client.delete(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Takeaway.objects.filter(id=self.takeaway.id).exists())
 
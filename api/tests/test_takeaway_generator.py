@@ -78,8 +78,8 @@ class TestTakeawayGenerator(APITestCase):
         )
         return super().setUp()
 
-    @patch("langchain_core.runnables.base.RunnableSequence.invoke")
-    def test_generate_takeaways_for_content(self, mocked_invoke: MagicMock):
+    @patch("langchain_core.runnables.base.RunnableSequence.batch")
+    def test_generate_takeaways_for_content(self, mocked_batch: MagicMock):
         class MockedTakeawaysSchema:
             def __init__(self, result):
                 self.result = result
@@ -87,7 +87,7 @@ class TestTakeawayGenerator(APITestCase):
             def dict(self):
                 return self.result
 
-        mocked_invoke.side_effect = [
+        mocked_batch.return_value = [
             MockedTakeawaysSchema(
                 {
                     "takeaways": [
@@ -121,27 +121,27 @@ class TestTakeawayGenerator(APITestCase):
         ]
 
         generate_takeaways(self.note, self.project.takeaway_types.all(), self.user)
+        mocked_batch.assert_called_once()
         self.assertEqual(
-            mocked_invoke.call_args_list[0].args[0],
-            {
-                "TRANSCRIPT": (
-                    "This is a sample text only.\n\n"
-                    "This is a sample text in the second block.\n\n"
-                ),
-                "EXTRACTION_NAME": "Takeaway-type-1",
-                "EXTRACTION_DEFINITION": "",
-            },
-        )
-        self.assertEqual(
-            mocked_invoke.call_args_list[1].args[0],
-            {
-                "TRANSCRIPT": (
-                    "This is a sample text only.\n\n"
-                    "This is a sample text in the second block.\n\n"
-                ),
-                "EXTRACTION_NAME": "Takeaway-type-2",
-                "EXTRACTION_DEFINITION": "",
-            },
+            mocked_batch.call_args.args[0],
+            [
+                {
+                    "TRANSCRIPT": (
+                        "This is a sample text only.\n\n"
+                        "This is a sample text in the second block.\n\n"
+                    ),
+                    "EXTRACTION_NAME": "Takeaway-type-1",
+                    "EXTRACTION_DEFINITION": "",
+                },
+                {
+                    "TRANSCRIPT": (
+                        "This is a sample text only.\n\n"
+                        "This is a sample text in the second block.\n\n"
+                    ),
+                    "EXTRACTION_NAME": "Takeaway-type-2",
+                    "EXTRACTION_DEFINITION": "",
+                },
+            ],
         )
         takeaway_titles = [takeaway.title for takeaway in self.note.takeaways.all()]
         expected_takeaway_titles = [
@@ -150,9 +150,50 @@ class TestTakeawayGenerator(APITestCase):
             "Topic: 'Answer 2 topic' - 'Answer 2 title': 'Answer 2 significance'",
         ]
         self.assertCountEqual(takeaway_titles, expected_takeaway_titles)
+        # The highlights of a text note have no clip
+        for takeaway in self.note.takeaways.all():
+            self.assertEqual(takeaway.highlight.clip_size, 0)
+            self.assertEqual(takeaway.highlight.thumbnail_size, 0)
+
+    @patch("langchain_core.runnables.base.RunnableSequence.batch")
+    def test_generate_takeaways_with_unaligned_quote(self, mocked_batch: MagicMock):
+        class MockedTakeawaysSchema:
+            def __init__(self, result):
+                self.result = result
+
+            def dict(self):
+                return self.result
 
-    @patch("langchain_core.runnables.base.RunnableSequence.invoke")
-    def test_generate_takeaways_for_transcript(self, mocked_invoke: MagicMock):
+        # None of the words of the quote are in the note
+        quote = "Unrelated words " * 100
+        mocked_batch.return_value = [
+            MockedTakeawaysSchema(
+                {
+                    "takeaways": [
+                        {
+                            "topic": "'Answer topic'",
+                            "insight": "'Answer title'",
+                            "significance": "'Answer significance'",
+                            "quote": quote,
+                        },
+                    ]
+                }
+            ),
+        ]
+        generate_takeaways(self.note, self.project.takeaway_types.all()[:1], self.user)
+        takeaway = self.note.takeaways.get()
+        self.assertEqual(
+            takeaway.title,
+            "Topic: 'Answer topic' - 'Answer title': 'Answer significance'",
+        )
+        # The quote is cut to fit the highlight and nothing is highlighted
+        self.assertEqual(takeaway.highlight.quote, quote[:1000])
+        self.assertIsNone(takeaway.highlight.start)
+        self.note.refresh_from_db()
+        self.assertNotIn('"type": "mark"', json.dumps(self.note.content))
+
+    @patch("langchain_core.runnables.base.RunnableSequence.batch")
+    def test_generate_takeaways_for_transcript(self, mocked_batch: MagicMock):
         with open("api/tests/files/sample-transcript.json", "r") as fp:
             transcript = json.load(fp)
 
@@ -174,7 +215,7 @@ class TestTakeawayGenerator(APITestCase):
             def dict(self):
                 return self.result
 
-        mocked_invoke.side_effect = [
+        mocked_batch.return_value = [
             MockedTakeawaysSchema(
                 {
                     "takeaways": [
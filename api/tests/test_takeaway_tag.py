@@ -1,4 +1,5 @@
 import logging
+from unittest.mock import patch
 
 import numpy as np
 from rest_framework import status
@@ -11,6 +12,8 @@ from api.models.tag import Tag
 from api.models.takeaway import Takeaway
 from api.models.user import User
 from api.models.workspace import Workspace
+from api.utils.orphans import delete_orphans
+from api.utils.rollups import refresh_rollups
 
 
 # Create your tests here.
@@ -70,10 +73,15 @@ class TestTakeawayTagView(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.tag.takeaway_count, 2)
 
-    def test_user_delete_takeaway_tags_with_no_remaining_takeaways(self):
+    @patch("api.tasks.delete_orphans.delay", side_effect=delete_orphans)
+    @patch("api.tasks.refresh_chart_rollups.delay", side_effect=refresh_rollups)
+    def test_user_delete_takeaway_tags_with_no_remaining_takeaways(
+        self, mocked_refresh, mocked_delay
+    ):
         self.client.force_authenticate(self.user)
         url = f"{self.url1}{self.tag.id}/"
-        response = self.client.delete(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Tag.objects.contains(self.tag))
 
@@ -0,0 +1,67 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from api.ai.downloaders.web_downloader import BrowserPool, WebDownloader
+
+
+class TestWebDownloader(SimpleTestCase):
+    def setUp(self) -> None:
+        self.downloader = WebDownloader()
+        self.downloader.translator = MagicMock()
+        self.downloader.translator.translate.side_effect = lambda text, _: text
+        self.downloader.browser_pool = MagicMock()
+        return super().setUp()
+
+    def get_html(self, paragraph_count):
+        paragraphs = "".join(
+            f"<p>This is the sentence number {i} of the article.</p>"
+            for i in range(paragraph_count)
+        )
+        return (
+            f"<html><body><article><h1>Title</h1>{paragraphs}</article></body></html>"
+        )
+
+    @patch("requests.get")
+    def test_static_page_is_not_rendered(self, mocked_get):
+        mocked_get.return_value.headers = {"Content-Type": "text/html"}
+        mocked_get.return_value.text = self.get_html(50)
+
+        markdown = self.downloader.download("https://example.com").markdown
+
+        self.assertIn("sentence number 49", markdown)
+        self.downloader.browser_pool.run.assert_not_called()
+
+    @patch("requests.get")
+    def test_short_page_is_rendered(self, mocked_get):
+        mocked_get.return_value.headers = {"Content-Type": "text/html"}
+        mocked_get.return_value.text = "<html><body><div id='app'></div></body></html>"
+        page = MagicMock()
+        self.downloader.browser_pool.run.side_effect = lambda func: func(page)
+        page.content.return_value = self.get_html(50)
+        page.evaluate.return_value = 1000
+
+        markdown = self.downloader.download("https://example.com").markdown
+
+        self.assertIn("sentence number 49", markdown)
+        page.goto.assert_called_once()
+
+
+class TestBrowserPool(SimpleTestCase):
+    @patch("api.ai.downloaders.web_downloader.sync_playwright")
+    def test_browsers_are_kept_on_the_pool_threads(self, mocked_sync_playwright):
+        pool = BrowserPool(max_pages=1, max_uses=2)
+        callers = [
+            threading.Thread(target=pool.run, args=(lambda page: page.content(),))
+            for _ in range(3)
+        ]
+        for caller in callers:
+            caller.start()
+            caller.join()
+
+        # The callers' threads are gone, but a single driver served all the pages
+        mocked_sync_playwright.return_value.start.assert_called_once()
+        playwright = mocked_sync_playwright.return_value.start.return_value
+        # The browser is relaunched after max_uses pages
+        self.assertEqual(playwright.chromium.launch.call_count, 2)
@@ -0,0 +1,110 @@
+from datetime import date
+
+import numpy as np
+from rest_framework.test import APITestCase
+
+from api.models.feature import Feature
+from api.models.highlight import Highlight
+from api.models.note import Note
+from api.models.project import Project
+from api.models.usage.transciption import TranscriptionUsage
+from api.models.user import User
+from api.models.workspace import Workspace
+from api.models.workspace_quota import WorkspaceQuota
+
+
+class TestWorkspaceQuota(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="user", password="password")
+        self.workspace = Workspace.objects.create(name="workspace", owned_by=self.user)
+        self.project = Project.objects.create(name="project", workspace=self.workspace)
+        return super().setUp()
+
+    def get_workspace(self):
+        return Workspace.objects.get(id=self.workspace.id)
+
+    def test_features_are_cached(self):
+        feature = Feature.objects.get(code=Feature.Code.NUMBER_OF_PROJECTS)
+        workspace = self.get_workspace()
+        self.assertEqual(
+            workspace.get_feature_value(Feature.Code.NUMBER_OF_PROJECTS),
+            feature.default,
+        )
+
+        # Loading the quota is the only query once the features are cached
+        workspace = self.get_workspace()
+        with self.assertNumQueries(1):
+            for code in Feature.Code:
+                workspace.get_feature_value(code)
+
+        # Changing a feature invalidates the cache
+        feature.default += 1
+        feature.save()
+        workspace = self.get_workspace()
+        self.assertEqual(
+            workspace.get_feature_value(Feature.Code.NUMBER_OF_PROJECTS),
+            feature.default,
+        )
+
+    def test_usage_counters(self):
+        note = Note.objects.create(
+            title="note", project=self.project, author=self.user, file_size=100
+        )
+        TranscriptionUsage.objects.create(
+            workspace=self.workspace,
+            project=self.project,
+            note=note,
+            created_by=self.user,
+            value=60,
+        )
+        workspace = self.get_workspace()
+        self.assertEqual(workspace.total_file_size, 100)
+        self.assertEqual(workspace.usage_seconds, 60)
+
+        note.delete()
+        workspace = self.get_workspace()
+        self.assertEqual(workspace.total_file_size, 0)
+        self.assertEqual(workspace.usage_seconds, 60)
+
+        # The monthly usages restart in a new month
+        WorkspaceQuota.objects.update(usage_month=date(2000, 1, 1))
+        self.assertEqual(self.get_workspace().usage_seconds, 0)
+        WorkspaceQuota.objects.add_usage(seconds=30)
+        self.assertEqual(self.get_workspace().usage_seconds, 30)
+
+    def test_file_size_updates(self):
+        note = Note.objects.create(
+            title="note", project=self.project, author=self.user, file_size=100
+        )
+        note.file_size = 250
+        note.save()
+        self.assertEqual(self.get_workspace().total_file_size, 250)
+
+        highlight = Highlight.objects.create(
+            quote="quote",
+            note=note,
+            created_by=self.user,
+            vector=np.random.rand(1536),
+            clip_size=10,
+            thumbnail_size=5,
+        )
+        self.assertEqual(self.get_workspace().total_file_size, 265)
+        highlight.clip_size = 20
+        highlight.save()
+        self.assertEqual(self.get_workspace().total_file_size, 275)
+
+        # The sizes that aren't saved aren't counted
+        highlight.thumbnail_size = 50
+        highlight.save(update_fields=["clip_size"])
+        self.assertEqual(self.get_workspace().total_file_size, 275)
+
+        highlight.delete()
+        note.delete()
+        self.assertEqual(self.get_workspace().total_file_size, 0)
+
+    def test_quota_of_loaded_workspace(self):
+        # Saved like loaddata does, without Workspace.save
+        workspace = Workspace(name="loaded", domain_slug="loaded", owned_by=self.user)
+        workspace.save_base(raw=True)
+        workspace = Workspace.objects.get(id=workspace.id)
+        self.assertEqual(workspace.total_file_size, 0)
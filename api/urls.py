@@ -81,6 +81,10 @@ from api.views.project.project_task import ProjectTaskListView
 from api.views.project.project_takeaway import ProjectTakeawayListView
 from api.views.project.project_takeaway_type import ProjectTakeawayTypeListCreateView
 from api.views.project.project_task_type import ProjectTaskTypeListCreateView
+from api.views.project.project_upload import (
+    ProjectUploadCreateView,
+    ProjectUploadRetrieveUpdateDestroyView,
+)
 
 from api.views.project.project_user import ProjectUserListView
 from api.views.project.project_user_delete import ProjectUserDeleteView
@@ -222,6 +226,16 @@ urlpatterns = [
         ProjectNoteListCreateView.as_view(),
         name="project-note-list-create",
     ),
+    path(
+        "projects/<str:project_id>/uploads/",
+        ProjectUploadCreateView.as_view(),
+        name="project-upload-create",
+    ),
+    path(
+        "projects/<str:project_id>/uploads/<str:upload_id>/",
+        ProjectUploadRetrieveUpdateDestroyView.as_view(),
+        name="project-upload-retrieve-update-destroy",
+    ),
     path(
         "projects/<str:project_id>/tasks/",
         ProjectTaskListView.as_view(),
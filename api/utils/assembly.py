@@ -1,4 +1,6 @@
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+from functools import cached_property
 
 
 def blank_transcript():
@@ -10,10 +12,68 @@ def blank_transcript():
     }
 
 
+class TranscriptIndex:
+    """
+    Flat arrays over the words of a transcript, to look them up by time with
+    bisect and by text in the words joined with spaces.
+    The words are in chronological order and do not overlap.
+    """
+
+    def __init__(self, utterances: list[dict]):
+        self.words = [word for utterance in utterances for word in utterance["words"]]
+        self.starts = [word["start"] for word in self.words]
+        self.ends = [word["end"] for word in self.words]
+        # The offsets of the words in the text
+        self.offsets = []
+        offset = 0
+        for word in self.words:
+            self.offsets.append(offset)
+            offset += len(word["text"]) + 1
+        self.text = " ".join(word["text"] for word in self.words)
+
+    def get_range(self, start: int, end: int) -> range:
+        """Return the indices of the words within the time range."""
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.ends, end, lo=first)
+        return range(first, max(first, last))
+
+    def get_text_range(self, start: int, end: int) -> range:
+        """Return the indices of the words overlapping the [start, end) of the text."""
+        first = max(bisect_right(self.offsets, start) - 1, 0)
+        last = bisect_right(self.offsets, end - 1)
+        return range(first, max(first, last))
+
+    def find(self, quote: str) -> range | None:
+        """
+        Return the indices of the first words that spell the quote,
+        the quote has to start and end at word boundaries.
+        """
+        quote = " ".join(quote.split())
+        if not quote:
+            return None
+        position = self.text.find(quote)
+        while position != -1:
+            first = bisect_left(self.offsets, position)
+            end = position + len(quote)
+            last = bisect_right(self.offsets, end - 1) - 1
+            if (
+                first < len(self.offsets)
+                and self.offsets[first] == position
+                and self.offsets[last] + len(self.words[last]["text"]) == end
+            ):
+                return range(first, last + 1)
+            position = self.text.find(quote, position + 1)
+        return None
+
+
 class AssemblyProcessor:
     def __init__(self, json: dict):
         self.json = json
 
+    @cached_property
+    def index(self) -> TranscriptIndex:
+        return TranscriptIndex(self.json["utterances"])
+
     def to_transcript(self) -> dict:
         return {
             "id": self.json["id"],
@@ -23,86 +83,58 @@ class AssemblyProcessor:
         }
 
     def get_text_in_range(self, start, end):
-        result = [
-            word["text"]
-            for utterance in self.json["utterances"]
-            for word in utterance["words"]
-            if word["start"] >= start and word["end"] <= end
-        ]
-        return " ".join(result)
+        words = self.index.words
+        return " ".join(words[i]["text"] for i in self.index.get_range(start, end))
 
     def highlight(self, text: str, id: str) -> tuple[bool, int | None, int | None]:
-        if text == "":
-            return False
-
-        # This assumes that the `text`s of the `words` have been stripped
-        subtext = text.strip()
-        indices = []
-        capturing = False
-        break_outer_loop = False
-        for i, utterance in enumerate(self.json["utterances"]):
-            if break_outer_loop:
-                break
-            for j, word in enumerate(utterance["words"]):
-                if capturing:
-                    if subtext.startswith(word["text"]):
-                        # Continue capturing
-                        indices.append((i, j))
-                        subtext = subtext[len(word["text"]) :].strip()
-                        if not subtext:
-                            break_outer_loop = True
-                            break
-                    else:
-                        # Reset capturing
-                        capturing = False
-                        subtext = text.strip()
-                        indices = []
-                else:
-                    if subtext.startswith(word["text"]):
-                        # Start capturing
-                        capturing = True
-                        indices.append((i, j))
-                        subtext = subtext[len(word["text"]) :].strip()
-                        if not subtext:
-                            break_outer_loop = True
-                            break
-        if subtext:
-            # Couldn't match the entire text
-            return False, None, None
-
-        for i, j in indices:
-            (
-                self.json["utterances"][i]["words"][j]
-                .setdefault("highlight_ids", [])
-                .append(id)
+        return self.highlight_all([(text, id)])[0]
+
+    def highlight_all(
+        self, quotes: list[tuple[str, str]]
+    ) -> list[tuple[bool, int | None, int | None]]:
+        """
+        Highlight the words of the first occurrence of each (quote, id).
+        Return whether each quote is found, with its start and end times.
+        """
+        results = []
+        for quote, highlight_id in quotes:
+            indices = self.index.find(quote)
+            if indices is None:
+                results.append((False, None, None))
+                continue
+            self.add_highlight_id(indices, highlight_id)
+            results.append(
+                (True, self.index.starts[indices[0]], self.index.ends[indices[-1]])
             )
-        start = self.json["utterances"][indices[0][0]]["words"][indices[0][1]]["start"]
-        end = self.json["utterances"][indices[-1][0]]["words"][indices[-1][1]]["end"]
-        return True, start, end
+        return results
+
+    def highlight_span(
+        self, start: int, end: int, highlight_id: str
+    ) -> tuple[int | None, int | None]:
+        """
+        Highlight the words overlapping the [start, end) of the text of the index.
+        Return the start and end times of the words.
+        """
+        indices = self.index.get_text_range(start, end)
+        if not indices:
+            return None, None
+        self.add_highlight_id(indices, highlight_id)
+        return self.index.starts[indices[0]], self.index.ends[indices[-1]]
+
+    def add_highlight_id(self, indices: range, highlight_id: str):
+        for i in indices:
+            self.index.words[i].setdefault("highlight_ids", []).append(highlight_id)
 
     def update_transcript_highlights(self, start, end, highlight_id):
-        capturing = False
-
-        for utterance in self.json["utterances"]:
-            for word in utterance["words"]:
-                if capturing or word["start"] == start:
-                    capturing = True
-                    word.setdefault("highlight_ids", []).append(highlight_id)
-                    if word["end"] == end:
-                        return self.json
+        self.add_highlight_id(self.index.get_range(start, end), highlight_id)
+        return self.json
 
     def remove_transcript_highlight(self, start, end, highlight_id):
-        capturing = False
-
-        for utterance in self.json["utterances"]:
-            for word in utterance["words"]:
-                if capturing or word["start"] == start:
-                    capturing = True
-                    if "highlight_ids" in word.keys():
-                        if highlight_id in word["highlight_ids"]:
-                            word["highlight_ids"].remove(highlight_id)
-                    if word["end"] == end:
-                        return self.json
+        for i in self.index.get_range(start, end):
+            highlight_ids = self.index.words[i].get("highlight_ids", [])
+            if highlight_id in highlight_ids:
+                highlight_ids.remove(highlight_id)
+        return self.json
 
     def map_to_recall_speakers(self, recall_transcript: dict) -> dict:
         # Preprocess the recall transcript
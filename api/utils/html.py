@@ -0,0 +1,377 @@
+import re
+from html.parser import HTMLParser
+
+
+class Element:
+    def __init__(self, tag: str, attrs: dict, parent=None):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: list[Element | str] = []
+
+
+class TreeBuilder(HTMLParser):
+    """Build a minimal DOM tree, enough for the html generated from markdown."""
+
+    void_tags = {"br", "hr", "img", "input", "meta", "link", "col", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("root", {})
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, dict(attrs), self.current)
+        self.current.children.append(element)
+        if tag not in self.void_tags:
+            self.current = element
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Element(tag, dict(attrs), self.current))
+
+    def handle_endtag(self, tag):
+        # Close up to the matching tag, ignore stray end tags
+        element = self.current
+        while element is not self.root and element.tag != tag:
+            element = element.parent
+        if element is not self.root:
+            self.current = element.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+class HtmlProcessor:
+    """
+    Convert html to the lexical json of the frontend editor.
+
+    It mirrors the html import of lexical ($generateNodesFromDOM) for the nodes
+    registered in the editor: headings, paragraphs, quotes, lists, links,
+    tables, code blocks, line breaks and text formats.
+    Other elements are unwrapped and unknown void elements are dropped.
+    """
+
+    # Lexical text format flags
+    text_formats = {
+        "b": 1,
+        "strong": 1,
+        "i": 2,
+        "em": 2,
+        "s": 4,
+        "del": 4,
+        "strike": 4,
+        "u": 8,
+        "code": 16,
+        "sub": 32,
+        "sup": 64,
+        "mark": 128,
+    }
+    heading_tags = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    block_tags = heading_tags | {
+        "p",
+        "blockquote",
+        "ul",
+        "ol",
+        "li",
+        "table",
+        "thead",
+        "tbody",
+        "tfoot",
+        "tr",
+        "td",
+        "th",
+        "pre",
+        "div",
+        "hr",
+    }
+    whitespace_pattern = re.compile(r"[ \t\r\n]+")
+
+    def __init__(self, html: str):
+        self.html = html
+
+    def to_lexical(self) -> dict:
+        builder = TreeBuilder()
+        builder.feed(self.html)
+        builder.close()
+        root = self.element_node("root", self.convert_blocks(builder.root))
+        return {"root": root}
+
+    # Node factories, with the keys exported by lexical
+
+    def element_node(self, type: str, children: list, **extra) -> dict:
+        return {
+            "children": children,
+            "direction": "ltr" if self.has_text(children) else None,
+            "format": "",
+            "indent": 0,
+            "type": type,
+            "version": 1,
+            **extra,
+        }
+
+    def text_node(self, text: str, format: int) -> dict:
+        return {
+            "detail": 0,
+            "format": format,
+            "mode": "normal",
+            "style": "",
+            "text": text,
+            "type": "text",
+            "version": 1,
+        }
+
+    def linebreak_node(self) -> dict:
+        return {"type": "linebreak", "version": 1}
+
+    def has_text(self, children: list) -> bool:
+        return any(
+            child["type"] == "text" or self.has_text(child.get("children", []))
+            for child in children
+        )
+
+    # Block conversion
+
+    def is_block(self, node) -> bool:
+        return isinstance(node, Element) and node.tag in self.block_tags
+
+    def is_list(self, node) -> bool:
+        return isinstance(node, Element) and node.tag in {"ul", "ol"}
+
+    def convert_blocks(self, element: Element) -> list[dict]:
+        """Convert the children of a block container, wrapping loose inlines in paragraphs."""
+        blocks = []
+        inlines = []
+
+        def flush():
+            children = self.normalize(inlines)
+            if children:
+                blocks.append(self.paragraph(children))
+            inlines.clear()
+
+        for child in element.children:
+            if self.is_block(child):
+                flush()
+                blocks.extend(self.convert_block(child))
+            else:
+                inlines.extend(self.convert_inline(child, 0))
+        flush()
+        return blocks
+
+    def convert_block(self, element: Element) -> list[dict]:
+        match element.tag:
+            case "p":
+                return [self.paragraph(self.normalize(self.convert_inlines(element)))]
+            case tag if tag in self.heading_tags:
+                children = self.normalize(self.convert_inlines(element))
+                return [self.element_node("heading", children, tag=tag)]
+            case "blockquote":
+                children = self.normalize(self.convert_flattened(element))
+                return [self.element_node("quote", children)]
+            case "ul" | "ol":
+                return [self.convert_list(element, depth=0)]
+            case "table":
+                return [self.convert_table(element)]
+            case "pre":
+                children = self.convert_preformatted(element)
+                return [self.element_node("code", children)]
+            case "hr":
+                return []
+            case _:  # div, stray list items and table parts
+                return self.convert_blocks(element)
+
+    def paragraph(self, children: list) -> dict:
+        return self.element_node("paragraph", children)
+
+    def convert_flattened(self, element: Element) -> list[dict]:
+        """
+        Inline content of an element that only holds inline nodes in lexical,
+        like quotes and list items. Nested blocks are separated with line breaks.
+        """
+        return self.join_lines(self.split_lines(element.children))
+
+    def split_lines(self, nodes: list) -> list[list[dict]]:
+        lines = [[]]
+        for node in nodes:
+            if self.is_block(node):
+                lines.append(self.convert_flattened(node))
+                lines.append([])
+            else:
+                lines[-1].extend(self.convert_inline(node, 0))
+        return lines
+
+    def join_lines(self, lines: list[list[dict]]) -> list[dict]:
+        children = []
+        for line in lines:
+            line = self.normalize(line)
+            if line:
+                if children:
+                    children.append(self.linebreak_node())
+                children.extend(line)
+        return children
+
+    def convert_list(self, element: Element, depth: int) -> dict:
+        start = int(element.attrs.get("start") or 1)
+        items = []
+        value = start
+        for child in element.children:
+            if not isinstance(child, Element) or child.tag != "li":
+                continue
+            # A nested list is wrapped in its own list item after the item it belongs to
+            nested_lists = [
+                self.convert_list(node, depth + 1)
+                for node in child.children
+                if self.is_list(node)
+            ]
+            lines = self.split_lines(
+                [node for node in child.children if not self.is_list(node)]
+            )
+            inlines = self.join_lines(lines)
+            if inlines or not nested_lists:
+                items.append(self.list_item(inlines, value, depth))
+                value += 1
+            for nested_list in nested_lists:
+                items.append(self.list_item([nested_list], value, depth))
+
+        list_type = "number" if element.tag == "ol" else "bullet"
+        node = self.element_node(
+            "list", items, listType=list_type, start=start, tag=element.tag
+        )
+        node["indent"] = depth
+        return node
+
+    def list_item(self, children: list, value: int, depth: int) -> dict:
+        node = self.element_node("listitem", children, value=value)
+        node["indent"] = depth
+        return node
+
+    def convert_table(self, element: Element) -> dict:
+        rows = []
+        stack = list(reversed(element.children))
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Element):
+                continue
+            if node.tag == "tr":
+                rows.append(self.convert_table_row(node))
+            elif node.tag in {"thead", "tbody", "tfoot"}:
+                stack.extend(reversed(node.children))
+        return self.element_node("table", rows)
+
+    def convert_table_row(self, element: Element) -> dict:
+        cells = []
+        for node in element.children:
+            if not isinstance(node, Element) or node.tag not in {"td", "th"}:
+                continue
+            blocks = self.convert_blocks(node) or [self.paragraph([])]
+            cell = self.element_node(
+                "tablecell",
+                blocks,
+                backgroundColor=None,
+                colSpan=int(node.attrs.get("colspan") or 1),
+                headerState=1 if node.tag == "th" else 0,
+                rowSpan=int(node.attrs.get("rowspan") or 1),
+            )
+            cells.append(cell)
+        return self.element_node("tablerow", cells)
+
+    def convert_preformatted(self, element: Element) -> list[dict]:
+        """Text of a code block, whitespace is kept and new lines are line breaks."""
+        children = []
+
+        def visit(node):
+            if isinstance(node, str):
+                lines = node.split("\n")
+                for i, line in enumerate(lines):
+                    if i > 0:
+                        children.append(self.linebreak_node())
+                    if line:
+                        children.append(self.text_node(line, 0))
+            elif node.tag == "br":
+                children.append(self.linebreak_node())
+            else:
+                for child in node.children:
+                    visit(child)
+
+        for child in element.children:
+            visit(child)
+        # Drop the trailing new line of the code block
+        while children and children[-1]["type"] == "linebreak":
+            children.pop()
+        return self.merge_texts(children)
+
+    # Inline conversion
+
+    def convert_inlines(self, element: Element, format: int = 0) -> list[dict]:
+        children = []
+        for child in element.children:
+            children.extend(self.convert_inline(child, format))
+        return children
+
+    def convert_inline(self, node, format: int) -> list[dict]:
+        if isinstance(node, str):
+            text = self.whitespace_pattern.sub(" ", node)
+            return [self.text_node(text, format)] if text else []
+        if node.tag == "br":
+            return [self.linebreak_node()]
+        if node.tag == "a":
+            children = self.normalize(self.convert_inlines(node, format), strip=False)
+            return [
+                self.element_node(
+                    "link",
+                    children,
+                    rel=node.attrs.get("rel"),
+                    target=node.attrs.get("target"),
+                    title=node.attrs.get("title"),
+                    url=node.attrs.get("href", ""),
+                )
+            ]
+        if node.tag in {"img", "hr", "input", "wbr"}:
+            return []
+        if self.is_block(node):
+            return self.convert_flattened(node)
+        return self.convert_inlines(node, format | self.text_formats.get(node.tag, 0))
+
+    def normalize(self, children: list[dict], strip: bool = True) -> list[dict]:
+        """
+        Collapse the whitespace like the browser does,
+        and merge the adjacent text nodes with the same format like lexical does.
+        """
+        children = self.merge_texts(children)
+        result = []
+        for child in children:
+            if child["type"] == "text":
+                previous = result[-1] if result else None
+                ends_with_space = previous is None and strip
+                if previous is not None:
+                    ends_with_space = (
+                        previous["type"] == "linebreak"
+                        or previous["type"] == "text"
+                        and previous["text"].endswith(" ")
+                    )
+                if ends_with_space:
+                    child["text"] = child["text"].lstrip(" ")
+                if not child["text"]:
+                    continue
+            result.append(child)
+        # Drop the spaces before a line break and at the end of the block
+        for i, child in enumerate(result):
+            is_last = i == len(result) - 1
+            is_before_linebreak = not is_last and result[i + 1]["type"] == "linebreak"
+            if child["type"] == "text" and (is_last and strip or is_before_linebreak):
+                child["text"] = child["text"].rstrip(" ")
+        return [child for child in result if child["type"] != "text" or child["text"]]
+
+    def merge_texts(self, children: list[dict]) -> list[dict]:
+        result = []
+        for child in children:
+            previous = result[-1] if result else None
+            if (
+                child["type"] == "text"
+                and previous is not None
+                and previous["type"] == "text"
+                and previous["format"] == child["format"]
+            ):
+                result[-1] = {**previous, "text": previous["text"] + child["text"]}
+            else:
+                result.append(child)
+        return result
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import re
+from bisect import bisect_right
 from copy import deepcopy
 from typing import Callable
 
@@ -29,6 +30,18 @@ def blank_content():
 
 
 class LexicalProcessor:
+    # The types that end with a blank line in the text
+    text_block_types = {"paragraph", "heading", "quote", "listitem", "list"}
+    mark_template = {
+        "ids": [],
+        "type": "mark",
+        "format": "",
+        "indent": 0,
+        "version": 1,
+        "children": [],
+        "direction": "ltr",
+    }
+
     def __init__(self, lexical: dict, parent: LexicalProcessor | None = None):
         self.dict = lexical
         self.parent = parent
@@ -82,65 +95,116 @@ class LexicalProcessor:
         indentation = "." * self.depth
         return f"<LexicalProcessor: {indentation}{self.dict['type']}{content}>"
 
-    def to_text(self):
-        if self.dict["type"] == "text":
-            text = self.dict["text"]
-        else:
-            text = "".join(node.to_text() for node in self.children)
-
-        match self.dict["type"]:
-            case "paragraph" | "heading" | "quote" | "listitem" | "list":
-                return text + "\n\n"
-            case _:
-                return text
+    def iter_text(self):
+        """Yield the text of the tree in pieces, iterating over the raw dicts."""
+        stack = [self.dict]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif node["type"] == "text":
+                yield node["text"]
+            else:
+                if node["type"] in self.text_block_types:
+                    stack.append("\n\n")
+                stack.extend(reversed(node.get("children", [])))
 
-    def to_markdown(self):
-        # Setting the content
-        match self.dict["type"]:
-            case "text":
-                text = self.dict["text"]
-            case "Question":
-                text = "<cursor/>\n"
-            case "Takeaways":
-                from api.models.block import Block
-
-                block = Block.objects.get(id=self.dict["block_id"])
-                text = (
-                    "Takeaways:\n"
-                    + "- "
-                    + "\n- ".join(takeaway.title for takeaway in block.takeaways.all())
-                    + "\n"
-                )
-            case "Themes":
-                from api.models.block import Block
-
-                block = Block.objects.get(id=self.dict["block_id"])
-                text = (
-                    "Themes:\n"
-                    + "- "
-                    + "\n- ".join(theme.title for theme in block.themes.all())
-                    + "\n"
-                )
-            case _:
-                text = "".join(node.to_markdown() for node in self.children)
+    def to_text(self):
+        return "".join(self.iter_text())
 
-        # Setting the format
-        match self.dict["type"]:
+    def get_markdown_format(self, node: dict) -> tuple[str, str]:
+        """Return the markdown prefix and suffix around the content of the node."""
+        match node["type"]:
             case "paragraph":
-                return text + "\n\n"
+                return "", "\n\n"
             case "heading":
-                level = re.match(r"^h(\d+)$", self.dict["tag"]).group(1)
-                return f'{"#" * int(level)} {text}\n\n'
+                level = re.match(r"^h(\d+)$", node["tag"]).group(1)
+                return f'{"#" * int(level)} ', "\n\n"
             case "quote":
-                return "> " + text + "\n\n"
+                return "> ", "\n\n"
             case "link" | "autolink":
-                return f'[{text}]({self.dict["url"]})'
+                return "[", f']({node["url"]})'
             case "listitem":
-                return "- " + text + "\n"
+                return "- ", "\n"
             case "list":
-                return text + "\n"
+                return "", "\n"
             case _:
-                return text
+                return "", ""
+
+    def iter_markdown(self):
+        """
+        Yield the markdown of the tree in pieces, iterating over the raw dicts.
+        The Takeaways and Themes blocks are yielded as (type, block_id)
+        so that the blocks of the whole document can be fetched at once.
+        """
+        stack = [self.dict]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+                continue
+            match node["type"]:
+                case "text":
+                    yield node["text"]
+                case "Question":
+                    yield "<cursor/>\n"
+                case "Takeaways" | "Themes":
+                    yield node["type"], node["block_id"]
+                case _:
+                    prefix, suffix = self.get_markdown_format(node)
+                    if prefix:
+                        yield prefix
+                    if suffix:
+                        stack.append(suffix)
+                    stack.extend(reversed(node.get("children", [])))
+
+    def render_blocks(self, block_parts: list[tuple[str, str]]) -> dict:
+        """Render the Takeaways and Themes blocks with one prefetch for all of them."""
+        if not block_parts:
+            return {}
+
+        from api.models.block import Block
+
+        block_ids = {block_id for _, block_id in block_parts}
+        blocks = (
+            Block.objects.filter(id__in=block_ids)
+            .prefetch_related("takeaways", "themes")
+            .in_bulk()
+        )
+        rendered = {}
+        for type, block_id in block_parts:
+            if block_id not in blocks:
+                raise Block.DoesNotExist(f"Block {block_id} does not exist.")
+            block = blocks[block_id]
+            items = block.takeaways.all() if type == "Takeaways" else block.themes.all()
+            titles = "\n- ".join(item.title for item in items)
+            rendered[type, block_id] = f"{type}:\n- {titles}\n"
+        return rendered
+
+    def to_markdown(self):
+        parts = list(self.iter_markdown())
+        block_parts = [part for part in parts if isinstance(part, tuple)]
+        rendered_blocks = self.render_blocks(block_parts)
+        return "".join(
+            part if isinstance(part, str) else rendered_blocks[part] for part in parts
+        )
+
+    def get_markdown_length(self, limit: int | None = None) -> int:
+        """
+        Return the length of the markdown without building it.
+        Stop counting once the length exceeds the limit.
+        """
+        length = 0
+        block_parts = []
+        for part in self.iter_markdown():
+            if isinstance(part, str):
+                length += len(part)
+                if limit is not None and length > limit:
+                    return length
+            else:
+                block_parts.append(part)
+        rendered_blocks = self.render_blocks(block_parts)
+        return length + sum(len(rendered_blocks[part]) for part in block_parts)
 
     def highlight(self, text: str, id: str):
         if text == "":
@@ -217,6 +281,134 @@ class LexicalProcessor:
             node.parent.dict["children"][i : i + 1] = replacing_nodes
         return True
 
+    def get_text_index(self, separator: str = " "):
+        """
+        Return the text of the tree, with the text blocks separated by the separator,
+        and the (start, node, container) of each text node in the order of the text.
+        The container is the closest ancestor that is not a mark.
+        """
+        pieces = []
+        entries = []
+        length = 0
+        is_separated = True
+        stack = [(self.dict, self.dict)]
+        while stack:
+            node, container = stack.pop()
+            if isinstance(node, str):  # Separator after a text block
+                if not is_separated:
+                    pieces.append(node)
+                    length += len(node)
+                    is_separated = True
+            elif node["type"] == "text":
+                entries.append((length, node, container))
+                pieces.append(node["text"])
+                length += len(node["text"])
+                is_separated = is_separated and not node["text"]
+            else:
+                if node["type"] in self.text_block_types:
+                    stack.append((separator, None))
+                if node["type"] != "mark":
+                    container = node
+                stack.extend(
+                    (child, container) for child in reversed(node.get("children", []))
+                )
+        return "".join(pieces), entries
+
+    def highlight_all(self, quotes: list[tuple[str, str]]) -> list[bool]:
+        """
+        Highlight the first occurrence of each (quote, id) in one go.
+        The quotes are located in a single text index of the tree.
+        Return whether each quote is found.
+        """
+        text, entries = self.get_text_index()
+        spans = []
+        found = []
+        for quote, highlight_id in quotes:
+            quote_start = text.find(quote) if quote else -1
+            found.append(quote_start != -1)
+            if quote_start != -1:
+                spans.append((quote_start, quote_start + len(quote), highlight_id))
+        self.highlight_spans(spans, entries)
+        return found
+
+    def highlight_spans(self, spans: list[tuple[int, int, str]], entries: list):
+        """
+        Highlight the (start, end, id) spans of the text of a text index,
+        the entries are the text nodes of the index from `get_text_index`.
+        Each container of a highlighted text is rewritten once. Overlapping spans
+        result in marks with several ids, like the marks of the editor.
+        """
+        starts = [start for start, _, _ in entries]
+        # The highlighted ranges by text node
+        ranges = {}
+        containers = {}
+        for span_start, span_end, highlight_id in spans:
+            i = max(bisect_right(starts, span_start) - 1, 0)
+            while i < len(entries) and entries[i][0] < span_end:
+                start, node, container = entries[i]
+                end = start + len(node["text"])
+                if end > span_start:
+                    node_range = (
+                        max(span_start, start) - start,
+                        min(span_end, end) - start,
+                        highlight_id,
+                    )
+                    ranges.setdefault(id(node), []).append(node_range)
+                    containers[id(container)] = container
+                i += 1
+
+        for container in containers.values():
+            container["children"] = self.rebuild_marks(container["children"], ranges)
+
+    def rebuild_marks(self, children: list[dict], ranges: dict) -> list[dict]:
+        """
+        Split the text nodes at the highlighted ranges
+        and group the consecutive nodes with the same ids into marks.
+        """
+        pieces = []  # (node, ids, mark)
+        stack = [(child, [], None) for child in reversed(children)]
+        while stack:
+            node, ids, mark = stack.pop()
+            if node["type"] == "mark":
+                stack.extend(
+                    (child, list(dict.fromkeys(ids + node.get("ids", []))), node)
+                    for child in reversed(node.get("children", []))
+                )
+            elif node["type"] == "text" and id(node) in ranges:
+                pieces.extend(self.split_text(node, ids, mark, ranges[id(node)]))
+            else:
+                pieces.append((node, ids, mark))
+
+        new_children = []
+        last_ids = None
+        for node, ids, mark in pieces:
+            if not ids:
+                new_children.append(node)
+            elif ids == last_ids:
+                new_children[-1]["children"].append(node)
+            else:
+                template = mark or self.mark_template
+                new_children.append({**template, "ids": ids, "children": [node]})
+            last_ids = ids
+        return new_children
+
+    def split_text(self, node: dict, ids: list, mark: dict | None, ranges: list):
+        text = node["text"]
+        boundaries = {0, len(text)}
+        for start, end, _ in ranges:
+            boundaries.update((start, end))
+        boundaries = sorted(boundaries)
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            segment_ids = ids + [
+                highlight_id
+                for range_start, range_end, highlight_id in ranges
+                if range_start <= start and end <= range_end
+            ]
+            segment_ids = list(dict.fromkeys(segment_ids))
+            segment = node if start == 0 and end == len(text) else {**node}
+            segment["text"] = text[start:end]
+            yield segment, segment_ids, mark
+
     def append(self, another: LexicalProcessor):
         another = deepcopy(another)
         self.dict["children"].extend(another.dict["children"])
@@ -1,11 +1,9 @@
-import json
 import re
 
 import markdown
-from django.conf import settings
-from playwright.sync_api import sync_playwright
 
 from api.ai.translator import GoogleTranslator
+from api.utils.html import HtmlProcessor
 from api.utils.lexical import LexicalProcessor
 
 
@@ -80,19 +78,10 @@ class MarkdownProcessor:
         return self.replace_newlines_in_pre_tags(raw_html)
 
     def to_lexical(self):
-        frontend_url = settings.FRONTEND_URL
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch()
-            page = browser.new_page()
-            page.goto(f"{frontend_url}/lexical/html")
-            page.locator("#clear-text").click()
-            page.locator("#html-input").fill(self.to_html())
-            output_str = page.locator("#lexical-json-output").text_content()
-            lexical_json = json.loads(output_str)
-
-            # Convert the paragraph format to justify
-            lexical = LexicalProcessor(lexical_json["root"])
-            lexical.dict["children"] = lexical.dict["children"][1]["children"]
-            for paragraph in lexical.find_all("paragraph"):
-                paragraph.dict["format"] = "justify"
-            return lexical_json
+        lexical_json = HtmlProcessor(self.to_html()).to_lexical()
+
+        # Convert the paragraph format to justify
+        lexical = LexicalProcessor(lexical_json["root"])
+        for paragraph in lexical.find_all("paragraph"):
+            paragraph.dict["format"] = "justify"
+        return lexical_json
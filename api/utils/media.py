@@ -1,15 +1,54 @@
 import os
 import secrets
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import ffmpeg
 from django.conf import settings
 from django.core.files.base import ContentFile, File
 from django.db.models.fields.files import FieldFile
 
+chunk_size = 8 * 1024 * 1024
+# Format of the playbook segments
+segment_width = 1280
+segment_height = 720
+segment_frame_rate = 30
+segment_sample_rate = 48000
 
-def create_thumbnail(file: FieldFile, time: float) -> ContentFile:
-    file_url = file.url if settings.USE_S3 else file.path
+
+def get_local_path(file: FieldFile, directory: str) -> str:
+    """
+    Path of the file on the local disk.
+    On S3, the file is streamed in chunks into the directory,
+    as ffmpeg needs a seekable input to process mp4 files efficiently.
+    """
+    if not settings.USE_S3:
+        return file.path
+    path = os.path.join(directory, f"source.{file.name.split('.')[-1]}")
+    with file.open("rb") as source, open(path, "wb") as destination:
+        shutil.copyfileobj(source, destination, chunk_size)
+    return path
+
+
+def download_file(response, name: str) -> File:
+    """
+    Stream the content of a `requests` response opened with `stream=True`
+    into a temporary file, so that large downloads are never held in memory.
+    """
+    temp_file = tempfile.TemporaryFile()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        temp_file.write(chunk)
+    temp_file.seek(0)
+    return File(temp_file, name=name)
+
+
+def create_thumbnail(file: FieldFile | str, time: float) -> ContentFile:
+    """Capture a frame of the stored file, or of the file at the given local path."""
+    if isinstance(file, str):
+        file_url = file
+    else:
+        file_url = file.url if settings.USE_S3 else file.path
     out, err = (
         ffmpeg.input(file_url, ss=time)
         .output("pipe:1", vframes=1, format="image2")
@@ -39,35 +78,173 @@ def cut_media_file(file: FieldFile, start_time: float, end_time: float) -> Conte
     return clip
 
 
-def merge_media_files(files):
-    with tempfile.NamedTemporaryFile(suffix=".mp4") as temp_file:
-        input_files = [
-            ffmpeg.input(file.url) if settings.USE_S3 else ffmpeg.input(file.path)
-            for file in files
-            for stream in ("video", "audio")
-        ]
+class MediaClipper:
+    """
+    Cut many clips and thumbnails out of one media file.
+
+    The source is copied once into a temporary directory (streamed in chunks when
+    on S3) the first time a clip is cut, then the clips are cut by a pool of ffmpeg
+    processes seeking in the local copy.
+    The clips and thumbnails are returned as files on disk so that the storage
+    streams them on save instead of holding them in memory.
+    They are only valid inside the `with` block.
+    """
+
+    def __init__(self, file: FieldFile, max_workers: int = 4):
+        self.file = file
+        self.max_workers = max_workers
+        self.source_path = None
+        self.opened_files = []
+
+    def __enter__(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        return self
+
+    def __exit__(self, *args):
+        for opened_file in self.opened_files:
+            opened_file.close()
+        self.temp_dir.cleanup()
+
+    def get_source_path(self):
+        if self.source_path is None:
+            self.source_path = get_local_path(self.file, self.temp_dir.name)
+        return self.source_path
+
+    @property
+    def media_type(self):
+        return self.file.name.split(".")[-1]
+
+    def open(self, path, name) -> File:
+        opened_file = open(path, "rb")
+        self.opened_files.append(opened_file)
+        return File(opened_file, name=name)
+
+    def cut(
+        self, start_time: float, end_time: float, with_thumbnail: bool
+    ) -> tuple[File, File | None]:
+        source_path = self.get_source_path()
+        token = secrets.token_hex(3)
+        clip_name = f"clip_{start_time}_{end_time}_{token}.{self.media_type}"
+        clip_path = os.path.join(self.temp_dir.name, clip_name)
         (
-            ffmpeg.concat(*input_files, v=1, a=1)
-            .output(temp_file.name, movflags="faststart")
+            ffmpeg.input(source_path, ss=start_time, to=end_time)
+            .output(clip_path, codec="copy", movflags="faststart")
             .overwrite_output()
             .run(quiet=True)
         )
-        temp_file.seek(0)
-        file = ContentFile(temp_file.read(), os.path.basename(temp_file.name))
-    return file
+        thumbnail = None
+        if with_thumbnail:
+            thumbnail_name = f"thumbnail_{token}.jpg"
+            thumbnail_path = os.path.join(self.temp_dir.name, thumbnail_name)
+            (
+                ffmpeg.input(source_path, ss=start_time)
+                .output(thumbnail_path, vframes=1, format="image2")
+                .overwrite_output()
+                .run(quiet=True)
+            )
+            thumbnail = self.open(thumbnail_path, thumbnail_name)
+        return self.open(clip_path, clip_name), thumbnail
+
+    def cut_all(
+        self, segments: list[tuple[float, float]], with_thumbnails: bool
+    ) -> list[tuple[File, File | None]]:
+        """Cut the (start_time, end_time) segments, in seconds, in input order."""
+        if not segments:
+            return []
+        # Prepare the source before starting the workers so it is copied only once.
+        self.get_source_path()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(
+                executor.map(
+                    lambda segment: self.cut(*segment, with_thumbnails), segments
+                )
+            )
+
+
+def normalize_media_file(file: FieldFile, output_path: str):
+    """
+    Re-encode the video into the common format of the playbook segments,
+    letterboxed to the same size, frame rate and audio layout,
+    so that segments of any source can be joined without re-encoding.
+    """
+    file_url = file.url if settings.USE_S3 else file.path
+    source = ffmpeg.input(file_url)
+    video = (
+        source.video.filter(
+            "scale",
+            segment_width,
+            segment_height,
+            force_original_aspect_ratio="decrease",
+        )
+        .filter("pad", segment_width, segment_height, "(ow-iw)/2", "(oh-ih)/2")
+        .filter("setsar", 1)
+        .filter("fps", fps=segment_frame_rate)
+    )
+    audio = source.audio.filter("aresample", segment_sample_rate)
+    (
+        ffmpeg.output(
+            video,
+            audio,
+            output_path,
+            vcodec="libx264",
+            preset="veryfast",
+            pix_fmt="yuv420p",
+            acodec="aac",
+            ac=2,
+            ar=segment_sample_rate,
+            video_track_timescale=90000,
+            movflags="faststart",
+        )
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def concat_media_files(paths: list[str], output_path: str):
+    """
+    Join the local files, which must share their codecs and parameters
+    like the normalized segments, with the concat demuxer and stream copy.
+    """
+    list_path = f"{output_path}.txt"
+    with open(list_path, "w") as list_file:
+        for path in paths:
+            escaped_path = path.replace("'", "'\\''")
+            list_file.write(f"file '{escaped_path}'\n")
+    (
+        ffmpeg.input(list_path, format="concat", safe=0)
+        .output(output_path, codec="copy", movflags="faststart")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def replace_file(file: FieldFile, path: str):
+    """
+    Overwrite the stored file with the local file, under the same name
+    so that the urls already returned keep working.
+    """
+    if settings.USE_S3:
+        # The put replaces the object at once
+        with open(path, "rb") as content:
+            file.storage._save(file.name, File(content))
+    else:
+        # Copied next to the file then renamed over it, readers never see it partly
+        temp_path = f"{file.path}.part"
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, file.path)
 
 
-def process_mp4_for_streaming(file, output):
-    with tempfile.NamedTemporaryFile(suffix=".mp4") as input:
-        # We need to write the input to file and reading it again,
-        # because ffmpeg expects a seekable file stream
-        input.write(file.read()),
+def process_mp4_for_streaming(file: FieldFile):
+    """
+    Remux the stored mp4 file with movflags faststart so that it can be streamed,
+    and replace it in the storage. The file is streamed from and to the storage.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, "output.mp4")
         (
-            ffmpeg.input(input.name)
-            .output(output.name, movflags="faststart", codec="copy")
+            ffmpeg.input(get_local_path(file, temp_dir))
+            .output(output_path, movflags="faststart", codec="copy")
             .overwrite_output()
             .run(quiet=True)
         )
-        output.seek(0)
-        file = File(output, name=file.name)
-    return file
+        replace_file(file, output_path)
@@ -0,0 +1,86 @@
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from api.models.keyword import Keyword
+from api.models.note import Note
+from api.models.organization import Organization
+from api.models.tag import Tag
+from api.models.takeaway import Takeaway
+
+
+def delete_orphan_keywords(ids=None):
+    notes = Note.keywords.through.objects.filter(keyword=OuterRef("pk"))
+    keywords = Keyword.objects.filter(~Exists(notes))
+    if ids is not None:
+        keywords = keywords.filter(id__in=ids)
+    keywords.delete()
+
+
+def delete_orphan_organizations(ids=None):
+    notes = Note.organizations.through.objects.filter(organization=OuterRef("pk"))
+    organizations = Organization.objects.filter(~Exists(notes))
+    if ids is not None:
+        organizations = organizations.filter(id__in=ids)
+    organizations.delete()
+
+
+def delete_orphan_tags(ids=None):
+    takeaways = Takeaway.tags.through.objects.filter(tag=OuterRef("pk"))
+    tags = Tag.objects.filter(~Exists(takeaways))
+    if ids is not None:
+        tags = tags.filter(id__in=ids)
+    tags.delete()
+
+
+orphan_deleters = {
+    "keyword": delete_orphan_keywords,
+    "organization": delete_orphan_organizations,
+    "tag": delete_orphan_tags,
+}
+
+
+def delete_orphans(candidates: dict[str, list[str]]):
+    """Delete the candidates that are not related to any note or takeaway anymore."""
+    for name, ids in candidates.items():
+        orphan_deleters[name](ids)
+
+
+class OrphanCollector:
+    """
+    Collect the keywords, organizations and tags that may have become orphans,
+    and delete them in a celery task once the transaction is committed.
+
+    The flush is registered on every add, so the candidates left behind by a
+    rolled back transaction are sent with the next commit, where the orphan
+    check skips the ones that are still in use.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @property
+    def candidates(self) -> dict[str, set]:
+        if not hasattr(self.local, "candidates"):
+            self.local.candidates = defaultdict(set)
+        return self.local.candidates
+
+    def add(self, name: str, ids):
+        ids = set(ids)
+        if not ids:
+            return
+        self.candidates[name].update(ids)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        candidates = {name: list(ids) for name, ids in self.candidates.items() if ids}
+        self.candidates.clear()
+        if candidates:
+            from api.tasks import delete_orphans
+
+            delete_orphans.delay(candidates)
+
+
+orphan_collector = OrphanCollector()
@@ -0,0 +1,157 @@
+import threading
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate, TruncDay
+from django.utils import timezone
+
+from api.models.note import Note
+from api.models.project import Project
+from api.models.takeaway import Takeaway
+from api.models.takeaway_rollup import TakeawayRollup
+
+# The rollup fields with the takeaway fields they are grouped by
+dimensions = {
+    "takeaway_type_id": "type",
+    "priority": "priority",
+    "note_type_id": "note__type",
+    "note_sentiment": "note__sentiment",
+    "creator_id": "created_by",
+}
+
+
+def get_days(takeaways) -> set[date]:
+    """Return the days, in the current timezone, the takeaways were created on."""
+    days = takeaways.annotate(day=TruncDate("created_at")).values_list("day", flat=True)
+    return set(days.distinct())
+
+
+def refresh_takeaway_rollups(project_id: str, days: list[date] | None = None):
+    """Roll up the takeaways of the project again, only the given days if any."""
+    takeaways = Takeaway.objects.filter(note__project=project_id)
+    rollups = TakeawayRollup.objects.filter(project=project_id)
+    if days is not None:
+        takeaways = takeaways.filter(created_at__date__in=days)
+        rollups = rollups.filter(day__date__in=days)
+    takeaways = takeaways.annotate(
+        day=TruncDay("created_at"),
+        **{name: F(field) for name, field in dimensions.items() if name != field},
+    )
+    fields = ["day", *dimensions]
+
+    with transaction.atomic():
+        # Refreshes of the same project wait for each other
+        Project.objects.select_for_update().filter(id=project_id).first()
+        rows = takeaways.values(*fields).annotate(count=Count("id"))
+        tag_rows = (
+            takeaways.annotate(takeaway_tag_id=F("tags"))
+            .values(*fields, "takeaway_tag_id")
+            .annotate(count=Count("id"))
+        )
+        rollups.delete()
+        TakeawayRollup.objects.bulk_create(
+            [TakeawayRollup(project_id=project_id, by_tag=False, **row) for row in rows]
+            + [
+                TakeawayRollup(project_id=project_id, by_tag=True, **row)
+                for row in tag_rows
+            ]
+        )
+
+
+def refresh_rollups(projects: dict[str, list[str] | None]):
+    """
+    Refresh the rollups of the days, in iso format, of each project,
+    or all the days of the project for None.
+    """
+    for project_id, days in projects.items():
+        if days is not None:
+            days = [date.fromisoformat(day) for day in days]
+        refresh_takeaway_rollups(project_id, days)
+    # The charts answered from the previous rollups are outdated
+    Project.objects.filter(id__in=list(projects)).update(
+        data_version=F("data_version") + 1
+    )
+
+
+class RollupCollector:
+    """
+    Collect the projects whose chart data changed, with the days to roll up again.
+    Once the transaction is committed, the data versions of the projects are
+    incremented, which invalidates their cached charts, and the rollups are
+    refreshed in a celery task.
+
+    Takeaways are collected with their note, the notes are resolved to their
+    project in a single query on commit. The notes deleted meanwhile are skipped,
+    the deletion of a note collects the days of its takeaways with the project.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    @property
+    def projects(self) -> dict[str, set | None]:
+        if not hasattr(self.local, "projects"):
+            self.local.projects = {}
+        return self.local.projects
+
+    @property
+    def notes(self) -> dict[str, set]:
+        if not hasattr(self.local, "notes"):
+            self.local.notes = defaultdict(set)
+        return self.local.notes
+
+    def add(self, project_id: str, days=None):
+        """Roll up the days of the project again, all of them when days is None."""
+        if days is None:
+            self.projects[project_id] = None
+        elif self.projects.get(project_id, ()) is not None:
+            self.projects.setdefault(project_id, set()).update(days)
+        transaction.on_commit(self.flush)
+
+    def touch(self, project_id: str):
+        """Invalidate the charts of the project, without rolling up any day."""
+        self.add(project_id, [])
+
+    def add_takeaways(self, takeaways):
+        """Roll up again the days of the takeaways, given as (note_id, created_at)."""
+        for note_id, created_at in takeaways:
+            self.notes[note_id].add(timezone.localdate(created_at))
+        transaction.on_commit(self.flush)
+
+    def touch_notes(self, note_ids):
+        """Invalidate the charts of the projects of the notes."""
+        for note_id in note_ids:
+            self.notes.setdefault(note_id, set())
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        projects = self.projects
+        notes = self.notes
+        self.local.projects = {}
+        self.local.notes = defaultdict(set)
+        if notes:
+            for note_id, project_id in Note.objects.filter(
+                id__in=list(notes)
+            ).values_list("id", "project"):
+                if projects.get(project_id, ()) is not None:
+                    projects.setdefault(project_id, set()).update(notes[note_id])
+        if not projects:
+            return
+
+        Project.objects.filter(id__in=list(projects)).update(
+            data_version=F("data_version") + 1
+        )
+        refreshes = {
+            project_id: None if days is None else sorted(map(date.isoformat, days))
+            for project_id, days in projects.items()
+            if days is None or days
+        }
+        if refreshes:
+            from api.tasks import refresh_chart_rollups
+
+            refresh_chart_rollups.delay(refreshes)
+
+
+rollup_collector = RollupCollector()
@@ -13,6 +13,7 @@ from api.models.note import Note
 from api.models.project import Project
 from api.serializers.note import NoteSerializer
 from api.serializers.takeaway import TakeawaySerializer
+from api.tasks import process_note_file_for_streaming
 
 
 @extend_schema(request=NoteSerializer, responses={200: TakeawaySerializer(many=True)})
@@ -82,6 +83,9 @@ class DemoGenerateTakeawaysCreateView(generics.CreateAPIView):
         project = Project.objects.get(id=demo_project_id)
         user = project.users.get(id=demo_user_id)
         note = serializer.save(author=user, project=project)
+        if note.file_type == Note.FileType.MP4:
+            # Done by analyze_new_note_on_commit elsewhere, the demo analyzes in place
+            process_note_file_for_streaming(note.id)
         if note.file or note.url:
             analyzer = NewNoteAnalyzer()
             analyzer.analyze(note, user)
@@ -3,7 +3,6 @@ from urllib.parse import urlparse
 
 import requests
 from django.conf import settings
-from django.core.files.base import File
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import exceptions, generics, permissions, response
@@ -13,7 +12,8 @@ from api.integrations.recall import recall
 from api.models.integrations.recall.bot import RecallBot
 from api.models.note import Note
 from api.models.user import User
-from api.tasks import analyze_new_note
+from api.tasks import analyze_new_note_on_commit
+from api.utils import media
 
 
 @extend_schema_view(
@@ -78,14 +78,14 @@ class RecallWebhookCreateView(generics.CreateAPIView):
                 parsed_url = urlparse(video_url)
                 file_extension = os.path.splitext(parsed_url.path)[1]
 
-                # Save the streamed content to a file-like object
                 if bot.event and bot.event.summary:
                     title = bot.event.summary
                     file_name = f"{bot.event.summary}{file_extension}"
                 else:
                     title = f"Meeting recorded by Kizunna bot"
                     file_name = f"meeting_video{file_extension}"
-                video_content = File(res.raw, name=file_name)
+                # Stream the video to a temporary file, the raw response is not seekable
+                video_content = media.download_file(res, file_name)
 
                 note = Note.objects.create(
                     project_id=project_id,
@@ -101,6 +101,6 @@ class RecallWebhookCreateView(generics.CreateAPIView):
                 bot.meeting_participants = meeting_participants
                 bot.save()
 
-                analyze_new_note.delay_on_commit(note.id, user.id)
+                analyze_new_note_on_commit(note, user.id)
 
         return response.Response(status=200)
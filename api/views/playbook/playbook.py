@@ -1,4 +1,4 @@
-from rest_framework import generics
+from rest_framework import generics, response, status
 from api.serializers.playbook import PlaybookSerializer
 
 
@@ -9,3 +9,17 @@ class PlaybookRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         return self.request.playbook.project.playbooks.prefetch_related(
             "takeaways"
         ).all()
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        The ETag changes once the video of the last changes is rendered,
+        clients poll with If-None-Match to know when to reload the video.
+        """
+        playbook = self.get_object()
+        etag = playbook.get_etag()
+        if etag in request.headers.get("If-None-Match", ""):
+            return response.Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+        serializer = self.get_serializer(playbook)
+        return response.Response(serializer.data, headers={"ETag": etag})
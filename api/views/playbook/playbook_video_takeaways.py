@@ -10,7 +10,9 @@ class PlaybookVideoTakeawaysListCreateView(generics.ListCreateAPIView):
     ordering = ["order"]
 
     def get_queryset(self):
-        return self.request.playbook.playbook_takeaways.all()
+        return self.request.playbook.playbook_takeaways.select_related(
+            "playbook", "takeaway"
+        )
 
 
 class PlaybookVideoTakeawaysUpdateDestroyView(
@@ -25,4 +27,4 @@ class PlaybookVideoTakeawaysUpdateDestroyView(
     def perform_destroy(self, instance: PlaybookTakeaway):
         super().perform_destroy(instance)
         instance.playbook.update_playbook_takeaway_times()
-        instance.playbook.create_playbook_clip_and_thumbnail()
+        instance.playbook.schedule_video_render()
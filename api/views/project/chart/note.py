@@ -16,8 +16,7 @@ class ChartNoteCreateView(generics.CreateAPIView):
         return self.request.project.notes.all()
 
     def create(self, request, project_id):
-        queryset = self.get_queryset()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        queryset = serializer.query(queryset)
-        return response.Response(queryset)
+        results = serializer.get_results(request.project, self.get_queryset())
+        return response.Response(results)
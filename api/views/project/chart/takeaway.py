@@ -16,8 +16,11 @@ class ChartTakeawayCreateView(generics.CreateAPIView):
         return Takeaway.objects.filter(note__project=self.request.project)
 
     def create(self, request, project_id):
-        queryset = self.get_queryset()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        queryset = serializer.query(queryset)
-        return response.Response(queryset)
+        results = serializer.get_results(
+            request.project,
+            self.get_queryset(),
+            rollups=request.project.takeaway_rollups.all(),
+        )
+        return response.Response(results)
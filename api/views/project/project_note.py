@@ -1,5 +1,7 @@
 import json
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import UploadedFile
 from django.db.models import Count
 from django.http.request import QueryDict
@@ -11,7 +13,7 @@ from api.filters.note import NoteFilter
 from api.models.feature import Feature
 from api.models.note import Note
 from api.serializers.note import ProjectNoteSerializer
-from api.tasks import analyze_new_note
+from api.tasks import analyze_new_note_on_commit
 
 
 class ProjectNoteListCreateView(generics.ListCreateAPIView):
@@ -89,17 +91,28 @@ class ProjectNoteListCreateView(generics.ListCreateAPIView):
                 f"You have reached the limit of {notes_limit} Knowledge sources."
             )
 
-        if serializer.validated_data["file"] is None:
+        upload = serializer.validated_data.get("upload")
+        if upload is not None:
+            file_name = upload.name
+            file_size_in_bytes = upload.size
+            file_path = (
+                default_storage.url(upload.name)
+                if settings.USE_S3
+                else default_storage.path(upload.name)
+            )
+        elif serializer.validated_data["file"] is not None:
+            file = serializer.validated_data["file"].file
+            file_name = file_path = file.name
+            file_size_in_bytes = serializer.validated_data["file"].size
+        else:
             # Skip checking if no file uploaded
             return
 
-        file = serializer.validated_data["file"].file
-        file_type = file.name.split(".")[-1]
+        file_type = file_name.split(".")[-1]
         if file_type not in assemblyai_transcriber.supported_filetypes:
             # Skip checking for transcription limit if not audio file
             return
 
-        file_size_in_bytes = serializer.validated_data["file"].size
         file_size_in_mb = file_size_in_bytes / 1024 / 1024
         mb_limit = workspace.get_feature_value(Feature.Code.STORAGE_MB_SINGLE_FILE)
         if file_size_in_mb > mb_limit:
@@ -116,7 +129,7 @@ class ProjectNoteListCreateView(generics.ListCreateAPIView):
             )
 
         # Extract audio info
-        audio_info = mediainfo(file.name)
+        audio_info = mediainfo(file_path)
         if audio_info.get("duration") is None:
             raise exceptions.ValidationError("Failed to get audio file information.")
 
@@ -150,4 +163,4 @@ class ProjectNoteListCreateView(generics.ListCreateAPIView):
         self.check_eligibility(serializer)
         note = serializer.save(author=self.request.user, project=self.request.project)
         if note.file or note.url:
-            analyze_new_note.delay_on_commit(note.id, self.request.user.id)
+            analyze_new_note_on_commit(note, self.request.user.id)
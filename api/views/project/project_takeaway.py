@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVector
 from rest_framework import generics
 
 from api.filters.takeaway import TakeawayFilter
@@ -24,6 +25,11 @@ class ProjectTakeawayListView(generics.ListAPIView):
         "created_by__last_name",
     ]
     query_field = "vector"
+    # Same expressions as the takeaway-search-index and highlight-search-index
+    query_search_vectors = [
+        SearchVector("title", "description", config="simple"),
+        SearchVector("highlight__quote", config="simple"),
+    ]
 
     def get_queryset(self):
         return TakeawaySerializer.optimize_query(
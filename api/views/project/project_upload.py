@@ -0,0 +1,95 @@
+import re
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework import exceptions, generics, parsers, status
+from rest_framework.response import Response
+
+from api.models.upload import Upload
+from api.serializers.upload import UploadSerializer
+
+
+class ChunkParser(parsers.FileUploadParser):
+    """
+    Parse a raw chunk of a file.
+    The upload handlers stream the chunk to a temporary file instead of memory.
+    """
+
+    media_type = "application/octet-stream"
+
+    def get_filename(self, stream, media_type, parser_context):
+        return "chunk"
+
+
+class ProjectUploadCreateView(generics.CreateAPIView):
+    serializer_class = UploadSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(project=self.request.project, created_by=self.request.user)
+
+
+@extend_schema_view(
+    put=extend_schema(
+        description=(
+            "Append a chunk to the upload. "
+            "The `Content-Range: bytes <start>-<end>/<size>` header is required "
+            "and `start` must match the current offset of the upload. "
+            "Every chunk but the last must be at least 5 MB. "
+            "If the offset does not match, 409 is returned with the current upload "
+            "so that the client can resume from `offset`."
+        ),
+        request={"application/octet-stream": OpenApiTypes.BINARY},
+    )
+)
+class ProjectUploadRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = UploadSerializer
+    parser_classes = [ChunkParser]
+    lookup_url_kwarg = "upload_id"
+    http_method_names = ["get", "put", "delete"]
+    content_range_pattern = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+    def get_queryset(self):
+        queryset = self.request.project.uploads.filter(created_by=self.request.user)
+        if self.request.method == "PUT":
+            # Lock the upload so that concurrent retries cannot append the same part
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def get_range_start(self, upload: Upload, chunk):
+        match = self.content_range_pattern.match(
+            self.request.headers.get("Content-Range", "")
+        )
+        if match is None:
+            raise exceptions.ValidationError("Missing or invalid Content-Range header.")
+        start, end, size = (int(value) for value in match.groups())
+        if end - start + 1 != chunk.size or size != upload.size:
+            raise exceptions.ValidationError("Content-Range does not match the chunk.")
+        return start
+
+    def update(self, request, *args, **kwargs):
+        # Requests are atomic, so the upload stays locked until the chunk is stored
+        chunk = request.data.get("file")
+        if chunk is None:
+            raise exceptions.ValidationError("Missing chunk.")
+
+        upload = self.get_object()
+        start = self.get_range_start(upload, chunk)
+        if start != upload.offset:
+            serializer = self.get_serializer(upload)
+            return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+
+        end = upload.offset + chunk.size
+        if end > upload.size:
+            raise exceptions.ValidationError("Chunk exceeds the file size.")
+        if chunk.size > Upload.max_part_size:
+            raise exceptions.ValidationError("Chunk cannot exceed 64 MB.")
+        if chunk.size < Upload.min_part_size and end != upload.size:
+            raise exceptions.ValidationError("Chunk must be at least 5 MB.")
+        upload.append(chunk)
+
+        serializer = self.get_serializer(upload)
+        return Response(serializer.data)
+
+    def perform_destroy(self, upload: Upload):
+        upload.abort()
+        upload.delete()
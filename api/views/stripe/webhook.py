@@ -8,6 +8,7 @@ from rest_framework.views import APIView
 from api.models.stripe_price import StripePrice
 from api.models.stripe_product import StripeProduct
 from api.models.stripe_subscription import StripeSubscription
+from api.models.workspace_quota import WorkspaceQuota
 from api.stripe import stripe
 
 
@@ -43,6 +44,11 @@ class StripeWebhookView(APIView):
         except stripe.error.SignatureVerificationError as e:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        def invalidate_features(subscription_id):
+            WorkspaceQuota.objects.filter(
+                workspace__subscription=subscription_id
+            ).invalidate_features()
+
         # Handling events
         match event["type"]:
             case "customer.subscription.created":
@@ -58,6 +64,7 @@ class StripeWebhookView(APIView):
                         "end_at": get_date(subscription["current_period_end"]),
                     },
                 )
+                invalidate_features(subscription["id"])
             case "customer.subscription.updated":
                 # This will be called from billing portal
                 subscription = event["data"]["object"]
@@ -70,6 +77,7 @@ class StripeWebhookView(APIView):
                         "is_free_trial": is_free_trial(subscription["trial_end"]),
                     },
                 )
+                invalidate_features(subscription["id"])
 
                 # TODO: will send this to mixpanel
                 if subscription["cancel_at_period_end"]:
@@ -80,6 +88,7 @@ class StripeWebhookView(APIView):
             case "customer.subscription.deleted":
                 subscription = event["data"]["object"]
                 if not subscription["cancel_at_period_end"]:
+                    invalidate_features(subscription["id"])
                     StripeSubscription.objects.filter(id=subscription["id"]).delete()
             case "customer.subscription.resumed":
                 subscription = event["data"]["object"]
@@ -90,6 +99,7 @@ class StripeWebhookView(APIView):
                     end_at=get_date(subscription["current_period_end"]),
                     is_free_trial=is_free_trial(subscription["trial_end"]),
                 )
+                invalidate_features(subscription["id"])
             case "customer.subscription.paused":
                 subscription = event["data"]["object"]
                 # Attempt to update an existing subscription
@@ -99,6 +109,7 @@ class StripeWebhookView(APIView):
                     end_at=get_date(subscription["current_period_end"]),
                     is_free_trial=is_free_trial(subscription["trial_end"]),
                 )
+                invalidate_features(subscription["id"])
             case "customer.subscription.trial_will_end":
                 pass
             case "checkout.session.completed":
@@ -108,6 +119,9 @@ class StripeWebhookView(APIView):
             case "product.updated":
                 StripeProduct.update_or_create(event["data"]["object"])
             case "product.deleted":
+                WorkspaceQuota.objects.filter(
+                    workspace__subscription__product=event["data"]["object"]["id"]
+                ).invalidate_features()
                 StripeProduct.objects.filter(id=event["data"]["object"]["id"]).delete()
             case "price.created":
                 StripePrice.update_or_create(event["data"]["object"])
@@ -16,6 +16,7 @@ class TakeawayTagCreateView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         tag = serializer.save()
         request.takeaway.tags.add(tag)
+        tag.refresh_from_db(fields=["takeaway_count"])
         return Response(serializer.data)
 
 
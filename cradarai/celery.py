@@ -21,6 +21,14 @@ app.conf.beat_schedule = {
         "task": "api.tasks.refresh_google_calendar_channel",
         "schedule": crontab(minute=0, hour=0),
     },
+    "cull-embeddings": {
+        "task": "api.tasks.cull_embeddings",
+        "schedule": crontab(minute=30, hour=0),
+    },
+    "delete-stale-uploads": {
+        "task": "api.tasks.delete_stale_uploads",
+        "schedule": crontab(minute=15),
+    },
     "process_slack_messages_daily": {
         "task": "api.tasks.process_slack_messages",
         "schedule": crontab(hour=23, minute=59),